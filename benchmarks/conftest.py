@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import tracemalloc
+import pytest
+
+# the synthetic frames are shared with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from _frames import make_frame  # noqa: E402
+
+# (rows, feature columns) benchmarked for every --bench-size
+SIZES = {
+    "small": [(1_000, 10), (10_000, 100)],
+    "medium": [(100_000, 500), (1_000_000, 100)],
+    "large": [(1_000_000, 5_000), (10_000_000, 100)],
+}
+
+_results = {}
+# benchmarks without a baseline entry, whose regression check was skipped
+_unchecked = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("eosframes benchmarks")
+    group.addoption("--bench-size", default="small", choices=sorted(SIZES), help="Size of the synthetic frames (default: small)")
+    group.addoption("--bench-baseline", default=os.path.join(os.path.dirname(__file__), "baseline.json"), help="Baseline file with wall time and peak memory per benchmark")
+    group.addoption("--update-baseline", action="store_true", help="Store the results of this run as the new baseline")
+    group.addoption("--require-baseline", action="store_true", help="Fail benchmarks without a baseline instead of skipping their regression check")
+    group.addoption("--regression-tolerance", type=float, default=0.25, help="Allowed slowdown or memory growth over the baseline (default: 0.25 = 25%%)")
+
+
+def pytest_generate_tests(metafunc):
+    if "shape" in metafunc.fixturenames:
+        shapes = SIZES[metafunc.config.getoption("--bench-size")]
+        metafunc.parametrize("shape", shapes, ids=["{0}x{1}".format(r, c) for r, c in shapes], scope="module")
+
+
+@pytest.fixture(scope="module")
+def frame(shape):
+    # unrounded continuous features, as in real model outputs
+    return make_frame(*shape, decimals=None)
+
+
+@pytest.fixture
+def bench(benchmark, request):
+    """
+    Run a benchmark: wall time with pytest-benchmark, peak traced memory with tracemalloc.
+    Fails when the result regresses beyond the tolerance against the stored baseline.
+    Without a baseline the check is skipped, unless --require-baseline is given.
+    """
+    config = request.config
+
+    def run(fn, setup=None, rounds=3):
+        args = setup() if setup is not None else ()
+        tracemalloc.start()
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 1024 ** 2
+        benchmark.extra_info["peak_memory_mb"] = peak_mb
+        result = benchmark.pedantic(
+            fn,
+            setup=(lambda: (setup(), {})) if setup is not None else None,
+            args=() if setup is not None else args,
+            rounds=rounds,
+            iterations=1,
+        )
+        seconds = benchmark.stats.stats.median
+        _results[request.node.nodeid] = {"seconds": seconds, "peak_memory_mb": peak_mb}
+        _check_regression(config, request.node.nodeid, seconds, peak_mb)
+        return result
+
+    return run
+
+
+def _load_baseline(config) -> dict:
+    path = config.getoption("--bench-baseline")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _check_regression(config, nodeid: str, seconds: float, peak_mb: float):
+    if config.getoption("--update-baseline"):
+        return
+    path = config.getoption("--bench-baseline")
+    baseline = _load_baseline(config)
+    base = baseline.get(nodeid) if baseline is not None else None
+    if base is None:
+        if config.getoption("--require-baseline"):
+            pytest.fail("No baseline for {0} in {1}. Store one with --update-baseline on the reference machine".format(nodeid, path))
+        # reported in the terminal summary, so that a missing baseline is not mistaken for a passed check
+        _unchecked.append(nodeid)
+        return
+    tolerance = 1.0 + config.getoption("--regression-tolerance")
+    failures = []
+    if seconds > base["seconds"] * tolerance:
+        failures += ["wall time {0:.4f}s vs baseline {1:.4f}s".format(seconds, base["seconds"])]
+    # small absolute slack so that tiny allocations do not make the check flaky
+    if peak_mb > base["peak_memory_mb"] * tolerance + 1.0:
+        failures += ["peak memory {0:.1f}MB vs baseline {1:.1f}MB".format(peak_mb, base["peak_memory_mb"])]
+    if failures:
+        pytest.fail("Regression in {0}: {1}".format(nodeid, "; ".join(failures)))
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _unchecked:
+        return
+    terminalreporter.write_sep("=", "benchmark regression checks skipped", yellow=True)
+    terminalreporter.write_line(
+        "No baseline in {0} for {1} benchmark(s): their regression check was skipped. "
+        "Store one with --update-baseline on the reference machine, or pass --require-baseline to fail instead.".format(config.getoption("--bench-baseline"), len(_unchecked))
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if not config.getoption("--update-baseline", default=False) or not _results:
+        return
+    baseline = _load_baseline(config) or {}
+    baseline.update(_results)
+    with open(config.getoption("--bench-baseline"), "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
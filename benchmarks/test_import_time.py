@@ -0,0 +1,41 @@
+import sys
+import json
+import subprocess
+
+import pytest
+
+HEAVY = ["pandas", "sklearn", "h5py", "boto3", "joblib", "dotenv", "requests"]
+
+# module -> heavy dependencies that must not be loaded by importing it
+LAZY = {
+    "eosframes": HEAVY,
+    "eosframes.cli": HEAVY,
+    "eosframes.read.read": ["h5py", "requests", "sklearn", "boto3"],
+    "eosframes.write.write": ["h5py", "requests", "sklearn", "boto3"],
+    "eosframes.transformers.scale": ["boto3", "dotenv", "h5py"],
+    "eosframes.transformers.quantize": ["boto3", "dotenv", "h5py"],
+}
+
+
+def _import_in_subprocess(module: str) -> dict:
+    code = (
+        "import sys, json, time\n"
+        "t = time.perf_counter()\n"
+        "import {0}\n"
+        "print(json.dumps({{'seconds': time.perf_counter() - t, 'modules': sorted(m.split('.')[0] for m in sys.modules)}}))\n"
+    ).format(module)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", sorted(LAZY))
+def test_import_is_lazy(module):
+    loaded = set(_import_in_subprocess(module)["modules"])
+    eager = [m for m in LAZY[module] if m in loaded]
+    assert not eager, "Importing {0} loads {1}".format(module, eager)
+
+
+@pytest.mark.parametrize("module", ["eosframes", "eosframes.transformers.quantize"])
+def test_import_time(bench, module):
+    # a fresh interpreter per round: the cold import is what users pay for
+    bench(lambda: _import_in_subprocess(module), rounds=5)
@@ -0,0 +1,123 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+
+from eosframes.read.read import iter_h5, read_csv, read_h5, read_chunked_csvs
+from eosframes.write.write import H5Writer, write_csv, write_h5, write_chunked_csvs
+
+from _frames import MODEL_ID
+
+
+@pytest.fixture(scope="module")
+def files(frame, tmp_path_factory):
+    """
+    The benchmark frame written once in every supported format.
+    """
+    folder = tmp_path_factory.mktemp("files")
+    paths = {
+        "csv": str(folder / "{0}.csv".format(MODEL_ID)),
+        "h5": str(folder / "{0}.h5".format(MODEL_ID)),
+        "h5_fixed": str(folder / "fixed" / "{0}.h5".format(MODEL_ID)),
+        "chunks": str(folder / "{0}_chunks".format(MODEL_ID)),
+        "chunks_zstd": str(folder / "{0}_chunks_zstd".format(MODEL_ID)),
+    }
+    write_csv(frame, paths["csv"])
+    write_h5(frame, paths["h5"], dtype="float32")
+    os.makedirs(os.path.dirname(paths["h5_fixed"]))
+    write_h5(frame, paths["h5_fixed"], dtype="float32", strings="fixed")
+    write_chunked_csvs(frame, paths["chunks"], chunksize=max(1, min(100000, len(frame) // 4)))
+    write_chunked_csvs(frame, paths["chunks_zstd"], chunksize=max(1, min(100000, len(frame) // 4)), compression="zstd")
+    return paths
+
+
+@pytest.fixture(scope="module")
+def run_columns(frame):
+    """
+    run_columns table of the benchmark frame: binary and small integer features are integers.
+    """
+    names = [c for c in frame.columns if c not in ("key", "input")]
+    types = ["float" if i % 3 == 2 else "integer" for i in range(len(names))]
+    return pd.DataFrame({"name": names, "type": types})
+
+
+def _remove(path):
+    def setup():
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        return ()
+    return setup
+
+
+def test_read_csv(bench, files):
+    bench(lambda: read_csv(files["csv"]))
+
+
+def test_read_csv_typed(bench, files, run_columns):
+    bench(lambda: read_csv(files["csv"], schema=run_columns))
+
+
+def test_read_csv_typed_pyarrow(bench, files, run_columns):
+    pytest.importorskip("pyarrow")
+    bench(lambda: read_csv(files["csv"], schema=run_columns, engine="pyarrow"))
+
+
+def test_read_h5(bench, files):
+    bench(lambda: read_h5(files["h5"]))
+
+
+def test_read_h5_frame(bench, files):
+    bench(lambda: read_h5(files["h5"], frame=True))
+
+
+@pytest.mark.parametrize("strings", ["object", "pyarrow", "category"])
+def test_read_h5_fixed_strings(bench, files, strings):
+    if strings != "object":
+        pytest.importorskip("pyarrow")
+    bench(lambda: read_h5(files["h5_fixed"], strings=strings))
+
+
+def test_read_chunked_csvs(bench, files):
+    bench(lambda: read_chunked_csvs(files["chunks"]))
+
+
+def test_read_chunked_csvs_zstd(bench, files):
+    bench(lambda: read_chunked_csvs(files["chunks_zstd"]))
+
+
+def test_write_csv(bench, frame, tmp_path):
+    path = str(tmp_path / "{0}.csv".format(MODEL_ID))
+    bench(lambda: write_csv(frame, path), setup=_remove(path))
+
+
+def test_write_h5(bench, frame, tmp_path):
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+    bench(lambda: write_h5(frame, path, dtype="float32"), setup=_remove(path))
+
+
+def test_write_h5_fixed_strings(bench, frame, tmp_path):
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+    bench(lambda: write_h5(frame, path, dtype="float32", strings="fixed"), setup=_remove(path))
+
+
+def test_write_chunked_csvs(bench, frame, tmp_path):
+    path = str(tmp_path / "{0}_chunks".format(MODEL_ID))
+    chunksize = max(1, min(100000, len(frame) // 4))
+    bench(lambda: write_chunked_csvs(frame, path, chunksize=chunksize), setup=_remove(path))
+
+
+def test_run_pipeline(bench, files, tmp_path):
+    from eosframes.pipeline.pipeline import run_pipeline
+
+    batch_size = max(1, len(read_h5(files["h5"])) // 4)
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+
+    def run():
+        if os.path.exists(path):
+            os.remove(path)
+        with H5Writer(path, dtype="float32") as writer:
+            run_pipeline(iter_h5(files["h5"], batch_size=batch_size, frame=True), None, writer.write)
+
+    bench(run)
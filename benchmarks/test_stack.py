@@ -0,0 +1,53 @@
+import warnings
+
+from eosframes.manipulate.stack import hstack, vstack
+
+from _frames import make_frame
+
+
+def _with_model_id(df, model_id):
+    df = df.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        df.model_id = model_id
+    return df
+
+
+def test_hstack(bench, shape):
+    n_rows, n_cols = shape
+    frames = [make_frame(n_rows, max(1, n_cols // 3), model_id=model_id, seed=i) for i, model_id in enumerate(["eos0aaa", "eos0bbb", "eos0ccc"])]
+    bench(lambda: hstack(frames))
+
+
+def test_vstack(bench, frame):
+    n = len(frame) // 4
+    frames = [_with_model_id(frame.iloc[i * n:(i + 1) * n], frame.model_id) for i in range(4)]
+    bench(lambda: vstack(frames))
+
+
+def test_model_store_columns(bench, shape, tmp_path):
+    from eosframes.store.store import ModelStore
+
+    n_rows, n_cols = shape
+    store = ModelStore(str(tmp_path / "store.h5"))
+    for i, model_id in enumerate(["eos0aaa", "eos0bbb", "eos0ccc"]):
+        store.add(make_frame(n_rows, max(1, n_cols // 3), model_id=model_id, seed=i))
+    columns = ["feature_0000.eos0aaa", "feature_0000.eos0ccc"]
+    bench(lambda: store[columns])
+
+
+def test_transform_models(bench, shape, tmp_path):
+    from eosframes.transformers.scale import Scale
+    from eosframes.transformers.transform_models import ModelTransformers
+
+    n_rows, n_cols = shape
+    frames = [make_frame(n_rows, max(1, n_cols // 3), model_id=model_id, seed=i) for i, model_id in enumerate(["eos0aaa", "eos0bbb", "eos0ccc"])]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for df in frames:
+            scaler = Scale(model_id=df.model_id)
+            scaler.fit(df)
+            scaler.save(dir_name=str(tmp_path / df.model_id / "scale"), local=True, upload=False)
+    transformers = ModelTransformers(str(tmp_path), kind="scale")
+    stacked = hstack(frames)
+    bench(lambda: transformers.transform(stacked))
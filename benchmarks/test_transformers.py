@@ -0,0 +1,76 @@
+import warnings
+import pytest
+
+from eosframes.transformers.scale import Scale
+from eosframes.transformers.quantize import Quantize
+
+from _frames import MODEL_ID
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+@pytest.fixture(scope="module")
+def fitted(frame):
+    scaler = Scale(model_id=MODEL_ID)
+    scaler.fit(frame)
+    quantizer = Quantize(model_id=MODEL_ID)
+    quantizer.fit(frame)
+    return scaler, quantizer
+
+
+def test_scale_fit(bench, frame):
+    bench(lambda: Scale(model_id=MODEL_ID).fit(frame), rounds=1)
+
+
+def test_scale_transform(bench, frame, fitted):
+    bench(lambda: fitted[0].transform(frame))
+
+
+def test_quantize_fit(bench, frame):
+    bench(lambda: Quantize(model_id=MODEL_ID).fit(frame), rounds=1)
+
+
+def test_quantize_transform(bench, frame, fitted):
+    bench(lambda: fitted[1].transform(frame))
+
+
+def test_scale_transform_drift(bench, frame, fitted):
+    drift = fitted[0].drift_monitor()
+    bench(lambda: fitted[0].transform(frame, drift=drift))
+
+
+def test_quantize_transform_columns(bench, frame, fitted):
+    columns = fitted[1].feature_cols[: max(1, len(fitted[1].feature_cols) // 20)]
+    bench(lambda: fitted[1].transform(frame, columns=columns))
+
+
+def test_quantize_transform_cached(bench, frame, fitted, tmp_path):
+    from eosframes.transformers.cache import TransformCache
+
+    cache = TransformCache(str(tmp_path / "cache.db"))
+    fitted[1].transform(frame, cache=cache)
+    bench(lambda: fitted[1].transform(frame, cache=cache))
+
+
+def test_scale_update(bench, frame):
+    half = len(frame) // 2
+
+    def setup():
+        scaler = Scale(model_id=MODEL_ID)
+        scaler.fit(frame.iloc[:half])
+        return (scaler,)
+
+    bench(lambda scaler: scaler.update(frame.iloc[half:]), setup=setup, rounds=1)
+
+
+def test_column_quantiles(bench, frame):
+    from eosframes.transformers.build_typed_transformer import quantile_levels
+    from eosframes.transformers.quantile_kernel import column_quantiles
+
+    values = frame.drop(columns=["key", "input"]).to_numpy()
+    bench(lambda: column_quantiles(values, quantile_levels(len(values)), impute_median=True))
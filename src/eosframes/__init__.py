@@ -0,0 +1,56 @@
+"""
+Ersilia utilities for working with tabular output data.
+
+The public API is loaded lazily: `import eosframes` is instant and has no side effects,
+and heavy dependencies (pandas, scikit-learn, h5py, boto3...) are only imported the first
+time a function or class that needs them is accessed.
+"""
+import importlib
+
+# public name -> module that defines it
+_LAZY = {
+    "read_csv": "eosframes.read.read",
+    "read_h5": "eosframes.read.read",
+    "read_chunked_csvs": "eosframes.read.read",
+    "read_any": "eosframes.read.read",
+    "read_bits": "eosframes.read.read",
+    "dequantize": "eosframes.read.read",
+    "lookup": "eosframes.read.read",
+    "iter_h5": "eosframes.read.read",
+    "iter_chunked_csvs": "eosframes.read.read",
+    "write_csv": "eosframes.write.write",
+    "write_h5": "eosframes.write.write",
+    "write_chunked_csvs": "eosframes.write.write",
+    "write_xlsx": "eosframes.write.write",
+    "H5Writer": "eosframes.write.write",
+    "ChunkedCsvWriter": "eosframes.write.write",
+    "run_pipeline": "eosframes.pipeline.pipeline",
+    "ErsiliaFrame": "eosframes.frame.frame",
+    "hstack": "eosframes.manipulate.stack",
+    "vstack": "eosframes.manipulate.stack",
+    "ModelStore": "eosframes.store.store",
+    "Scale": "eosframes.transformers.scale",
+    "Quantize": "eosframes.transformers.quantize",
+    "fit_models": "eosframes.transformers.fit_models",
+    "transform_models": "eosframes.transformers.transform_models",
+    "ModelTransformers": "eosframes.transformers.transform_models",
+    "TransformCache": "eosframes.transformers.cache",
+    "DriftMonitor": "eosframes.transformers.drift",
+    "publish_parameters": "eosframes.transformers.shared",
+    "attach_parameters": "eosframes.transformers.shared",
+    "unpublish_parameters": "eosframes.transformers.shared",
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module 'eosframes' has no attribute {0!r}".format(name))
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+
+# Commands import what they need when they run, so that the CLI starts instantly
+
+
+def _parse_sources(items: list) -> dict:
+    """
+    Build the model_id -> source mapping from the command line.
+    Each item is either a JSON file with the mapping, a model_id=path pair, or a path containing the model_id.
+    """
+    from eosframes.utils.utils import get_model_id_from_path
+
+    sources = {}
+    for item in items:
+        if item.endswith(".json") and os.path.isfile(item):
+            with open(item, "r") as f:
+                sources.update(json.load(f))
+            continue
+        if "=" in item:
+            model_id, path = item.split("=", 1)
+        else:
+            path = item
+            model_id = get_model_id_from_path(os.path.normpath(path))
+            if model_id is None:
+                raise Exception("Could not extract model_id from {0}. Use the model_id=path syntax".format(path))
+        sources[model_id] = path
+    return sources
+
+
+def _fit(args):
+    from eosframes.transformers.fit_models import fit_models
+    from eosframes.utils.utils import parse_memory_size
+
+    def progress(report):
+        print(
+            "{0}: {1} ({2} rows, {3:.1f}s scale, {4} quantize, {5:.0f} MB peak)".format(
+                report["model_id"],
+                report["status"],
+                report["num_rows"],
+                report["scale_seconds"] or 0.0,
+                "{0:.1f}s".format(report["quantize_seconds"]) if report["quantize_seconds"] is not None else "-",
+                report["peak_memory_mb"] if report["peak_memory_mb"] is not None else float("nan"),
+            )
+        )
+
+    sources = _parse_sources(args.sources)
+    memory_limit = parse_memory_size(args.memory_limit) if args.memory_limit else None
+    report = fit_models(
+        sources,
+        output_dir=args.output_dir,
+        n_workers=args.workers,
+        memory_limit=memory_limit,
+        quantize=not args.no_quantize,
+        progress=progress,
+    )
+    report_path = args.report or os.path.join(args.output_dir, "fit_report.csv")
+    report.to_csv(report_path, index=False)
+    print("Report saved to {0}".format(report_path))
+    if (report["status"] != "ok").any():
+        return 1
+    return 0
+
+
+def _serve(args):
+    from eosframes.serve.server import serve
+
+    serve(
+        args.model_dir,
+        host=args.host,
+        port=args.port,
+        max_batch_rows=args.max_batch_rows,
+        max_delay_ms=args.max_delay_ms,
+    )
+    return 0
+
+
+def _convert(args):
+    from eosframes.pipeline.convert import convert
+    from eosframes.utils.utils import parse_memory_size
+
+    def progress(rows, seconds):
+        sys.stderr.write("\r{0:,} rows, {1:,.0f} rows/s".format(rows, rows / max(seconds, 1e-9)))
+        sys.stderr.flush()
+
+    memory_budget = parse_memory_size(args.memory_budget) if args.memory_budget else None
+    report = convert(
+        args.source,
+        args.destination,
+        memory_budget=memory_budget,
+        batch_size=args.batch_size,
+        dtype=args.dtype,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        progress=None if args.quiet else progress,
+    )
+    if not args.quiet:
+        sys.stderr.write("\n")
+    print(
+        "Converted {0:,} rows in {1:.1f}s ({2:,.0f} rows/s, {3} batches). Slowest stage: {4}".format(
+            report.rows, report.seconds, report.rows / max(report.seconds, 1e-9), report.batches, report.bottleneck
+        )
+    )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="eosframes", description="Ersilia output dataframes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit = subparsers.add_parser("fit", help="Fit Scale and Quantize transformers for many models in parallel")
+    fit.add_argument("sources", nargs="+", help="model_id=path pairs, paths containing the model_id, or a JSON file mapping model_id to path")
+    fit.add_argument("-o", "--output-dir", required=True, help="Directory where the fitted artifacts are saved")
+    fit.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    fit.add_argument("--memory-limit", default=None, help="Memory cap per worker, e.g. 8G")
+    fit.add_argument("--no-quantize", action="store_true", help="Only fit the Scale transformer")
+    fit.add_argument("--report", default=None, help="Path of the CSV report (default: <output-dir>/fit_report.csv)")
+    fit.set_defaults(func=_fit)
+
+    serve = subparsers.add_parser("serve", help="Serve fitted transformers over HTTP with micro-batching")
+    serve.add_argument("model_dir", help="Directory with fitted artifacts in the <model_id>/<scale|quantize> layout")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    serve.add_argument("--max-batch-rows", type=int, default=4096, help="Maximum rows merged into one transform call")
+    serve.add_argument("--max-delay-ms", type=float, default=5.0, help="Maximum time a request waits for a batch to fill")
+    serve.set_defaults(func=_serve)
+
+    convert = subparsers.add_parser("convert", help="Convert an output between HDF5, CSV, chunked CSV and Parquet, batch by batch")
+    convert.add_argument("source", help="Path of the output: .h5, .csv, .parquet or a directory of chunked CSV files, containing the model_id")
+    convert.add_argument("destination", help="Path of the converted output, with the same model_id. The format is inferred from the extension")
+    convert.add_argument("--memory-budget", default=None, help="Memory for the batches in flight, e.g. 2G. Sets the batch size from the number of columns (default: a quarter of the available memory)")
+    convert.add_argument("--batch-size", type=int, default=None, help="Rows per batch (overrides --memory-budget)")
+    convert.add_argument("--dtype", default="float32", help="Data type of the values of an HDF5 destination (default: float32)")
+    convert.add_argument("--compression", choices=["gzip", "zstd"], default=None, help="Compress the chunks of a chunked CSV destination")
+    convert.add_argument("--compression-level", type=int, default=None, help="Compression level of the chunks (default: 6 for gzip, 3 for zstd)")
+    convert.add_argument("-q", "--quiet", action="store_true", help="Do not show progress")
+    convert.set_defaults(func=_convert)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,4 +5,14 @@ VALID_DATATYPES = [
     np.int8,
     np.float32,
     str,
-]
\ No newline at end of file
+]
+
+# statistics of the chunks written by write_chunked_csvs
+CHUNKS_MANIFEST_FILE = "manifest.json"
+
+# file extension of the chunks written by write_chunked_csvs for every compression
+CHUNK_EXTENSIONS = {
+    None: ".csv",
+    "gzip": ".csv.gz",
+    "zstd": ".csv.zst",
+}
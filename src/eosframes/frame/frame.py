@@ -0,0 +1,178 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+
+class ErsiliaFrame:
+    """
+    Compact Ersilia output: key and input arrays, one contiguous 2D feature matrix and the model_id.
+
+    Unlike a pandas DataFrame, the model_id is an attribute of the class and is never dropped, and the
+    features are a single float32 or int8 matrix instead of many pandas blocks, so wide outputs are not
+    copied by block consolidation. Columns are the same as in the pandas layout: key (if present), input
+    and the features. frame["feature"] returns a Series view on the matrix and to_pandas() does not copy it.
+    """
+
+    __slots__ = ("model_id", "key", "input", "values", "features", "_positions")
+
+    def __init__(self, values: np.ndarray, features: list, model_id: str = None, key: np.ndarray = None, input: np.ndarray = None):
+        values = np.asarray(values)
+        if values.ndim != 2:
+            raise Exception("Feature values must be a 2D array, got {0} dimensions".format(values.ndim))
+        features = list(features)
+        if len(features) != values.shape[1]:
+            raise Exception("{0} feature names for {1} feature columns".format(len(features), values.shape[1]))
+        if input is None:
+            raise Exception("ErsiliaFrame requires an input column")
+        input = np.asarray(input, dtype=object)
+        key = np.asarray(key, dtype=object) if key is not None else None
+        for name, column in (("input", input), ("key", key)):
+            if column is not None and len(column) != values.shape[0]:
+                raise Exception("Column {0} has {1} rows, the features have {2}".format(name, len(column), values.shape[0]))
+        self.model_id = model_id
+        self.key = key
+        self.input = input
+        self.values = values
+        self.features = features
+        self._positions = {c: i for i, c in enumerate(features)}
+
+    @classmethod
+    def from_pandas(cls, df: pd.DataFrame, dtype: any = None, model_id: str = None) -> "ErsiliaFrame":
+        """
+        Build an ErsiliaFrame from an Ersilia DataFrame.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame with key (optional), input and feature columns
+        dtype: data type
+            Data type of the feature matrix. By default int8 if every feature is int8, float32 otherwise
+        model_id: str
+            Model identifier. By default the model_id attribute of the DataFrame
+
+        Returns
+        -------
+        ErsiliaFrame
+        """
+        if "input" not in df.columns:
+            raise Exception("DataFrame does not contain a column named 'input'")
+        features = [c for c in df.columns if c not in {"key", "input"}]
+        if dtype is None:
+            dtype = np.int8 if features and all(df[c].dtype == np.int8 for c in features) else np.float32
+        values = np.ascontiguousarray(df[features].to_numpy(dtype=dtype))
+        key = df["key"].to_numpy(dtype=object) if "key" in df.columns else None
+        model_id = model_id if model_id is not None else getattr(df, "model_id", None)
+        return cls(values, features, model_id=model_id, key=key, input=df["input"].to_numpy(dtype=object))
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Ersilia DataFrame with the same columns and the model_id attribute. The feature matrix is not copied.
+        """
+        df = pd.DataFrame(self.values, columns=self.features, copy=False)
+        df.insert(0, "input", self.input)
+        if self.key is not None:
+            df.insert(0, "key", self.key)
+        _set_model_id(df, self.model_id)
+        return df
+
+    @property
+    def columns(self) -> list:
+        return (["key", "input"] if self.key is not None else ["input"]) + self.features
+
+    @property
+    def shape(self) -> tuple:
+        return (self.values.shape[0], len(self.columns))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._positions or (column == "input") or (column == "key" and self.key is not None)
+
+    def __getitem__(self, columns):
+        if isinstance(columns, str):
+            if columns == "input":
+                return pd.Series(self.input, name="input", copy=False)
+            if columns == "key" and self.key is not None:
+                return pd.Series(self.key, name="key", copy=False)
+            if columns not in self._positions:
+                raise KeyError(columns)
+            return pd.Series(self.values[:, self._positions[columns]], name=columns, copy=False)
+        return self.select(list(columns))
+
+    def select(self, features: list) -> "ErsiliaFrame":
+        """
+        Frame with a subset of the features, in the given order. key and input are kept.
+        """
+        features = [c for c in features if c not in {"key", "input"}]
+        missing = [c for c in features if c not in self._positions]
+        if missing:
+            raise KeyError(missing)
+        idx = [self._positions[c] for c in features]
+        if idx == list(range(len(self.features))):
+            values = self.values
+        else:
+            values = self.values[:, idx]
+        return ErsiliaFrame(values, features, model_id=self.model_id, key=self.key, input=self.input)
+
+    def take(self, rows) -> "ErsiliaFrame":
+        """
+        Frame with a subset of the rows: a slice (no copy), an array of positions or a boolean mask.
+        """
+        key = self.key[rows] if self.key is not None else None
+        return ErsiliaFrame(self.values[rows], self.features, model_id=self.model_id, key=key, input=self.input[rows])
+
+    @classmethod
+    def concat(cls, frames: list) -> "ErsiliaFrame":
+        """
+        Concatenate the rows of frames with the same features. The model_id of the first frame is kept.
+        """
+        if len(frames) == 1:
+            return frames[0]
+        key = np.concatenate([frame.key for frame in frames]) if frames[0].key is not None else None
+        values = np.concatenate([frame.values for frame in frames], axis=0)
+        inputs = np.concatenate([frame.input for frame in frames])
+        return cls(values, frames[0].features, model_id=frames[0].model_id, key=key, input=inputs)
+
+    def astype(self, dtype: any) -> "ErsiliaFrame":
+        values = self.values if self.values.dtype == np.dtype(dtype) else self.values.astype(dtype)
+        return ErsiliaFrame(values, self.features, model_id=self.model_id, key=self.key, input=self.input)
+
+    def feature_matrix(self, features: list) -> pd.DataFrame:
+        """
+        Numeric DataFrame with the given features only, without copying when they are all the features in order.
+        """
+        selected = self.select(features)
+        return pd.DataFrame(selected.values, columns=selected.features, copy=False)
+
+    def __repr__(self) -> str:
+        return "ErsiliaFrame(model_id={0}, rows={1}, features={2}, dtype={3})".format(self.model_id, len(self), len(self.features), self.dtype)
+
+
+def _set_model_id(df: pd.DataFrame, model_id: str) -> None:
+    with warnings.catch_warnings():
+        # pandas warns when setting an attribute that is not a column
+        warnings.simplefilter("ignore", UserWarning)
+        df.model_id = model_id
+
+
+def as_pandas(df) -> pd.DataFrame:
+    """
+    Pandas DataFrame for an ErsiliaFrame or a DataFrame, which is returned unchanged.
+    """
+    return df.to_pandas() if isinstance(df, ErsiliaFrame) else df
+
+
+def feature_matrix(df, features: list) -> pd.DataFrame:
+    """
+    Numeric DataFrame with the given features, as the transformers expect it.
+    Values of DataFrames are coerced to numbers; ErsiliaFrames are numeric already.
+    """
+    if isinstance(df, ErsiliaFrame):
+        return df.feature_matrix(features)
+    return df.reindex(columns=features).apply(pd.to_numeric, errors="coerce")
+
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 from typing import List
 
+from ..frame.frame import ErsiliaFrame, as_pandas
 from ..utils.utils import is_model_id_valid
+from ..utils.instrument import span
 
 
 def hstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
@@ -11,13 +14,16 @@ def hstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
     Parameters
     ----------
     df_list: List[pd.DataFrame]
-        List of dataframes to stack
+        List of dataframes to stack. If they are all ErsiliaFrames, an ErsiliaFrame is returned
     
     Returns
     -------
     df: pd.DataFrame
         Horizontally stacked dataframe
     """
+    if all(isinstance(df, ErsiliaFrame) for df in df_list):
+        return _hstack_frames(df_list)
+    df_list = [as_pandas(df) for df in df_list]
     prev_input_list = None
     for df in df_list:
         cur_input_list = df["input"].tolist()
@@ -47,10 +53,11 @@ def hstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
     else:
         do = pd.DataFrame({"key": key_list, "input": input_list})
 
-    for model_id, df in zip(model_ids, df_list):
-        columns = [c for c in df.columns.tolist() if c not in {"key", "input"}]
-        rename = {c: c + "." + model_id for c in columns}
-        do = pd.concat([do, df[columns].reset_index(drop=True).rename(columns=rename)], axis=1)
+    with span("hstack", rows=len(do), frames=len(df_list)):
+        for model_id, df in zip(model_ids, df_list):
+            columns = [c for c in df.columns.tolist() if c not in {"key", "input"}]
+            rename = {c: c + "." + model_id for c in columns}
+            do = pd.concat([do, df[columns].reset_index(drop=True).rename(columns=rename)], axis=1)
 
     return do
 
@@ -62,13 +69,16 @@ def vstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
     Parameters
     ----------
     df_list: List[pd.DataFrame]
-        List of dataframes to stack
+        List of dataframes to stack. If they are all ErsiliaFrames, an ErsiliaFrame is returned
 
     Returns
     -------
     df: pd.DataFrame
         Vertically stacked dataframe
     """
+    if all(isinstance(df, ErsiliaFrame) for df in df_list):
+        return _vstack_frames(df_list)
+    df_list = [as_pandas(df) for df in df_list]
     prev_cols = None
     for df in df_list:
         if prev_cols is None:
@@ -78,11 +88,13 @@ def vstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
             raise Exception("Columns do not match")
         prev_cols = cur_cols
     do = None
-    for df in df_list:
-        if do is None:
-            do = df
-            continue
-        do = pd.concat([do, df], axis=0)
+    with span("vstack", frames=len(df_list)) as s:
+        for df in df_list:
+            if do is None:
+                do = df
+                continue
+            do = pd.concat([do, df], axis=0)
+        s.rows = len(do)
     model_ids = [getattr(df, "model_id", None) for df in df_list]
     for model_id in model_ids:
         if model_id is None:
@@ -91,3 +103,41 @@ def vstack(df_list: List[pd.DataFrame]) -> pd.DataFrame:
     do.model_id = model_id
     return do
 
+
+def _hstack_frames(frames: List[ErsiliaFrame]) -> ErsiliaFrame:
+    """
+    Stack ErsiliaFrames horizontally, with columns renamed to feature.model_id as in hstack.
+    """
+    for frame in frames:
+        if frame.model_id is None:
+            raise Exception("One of the dataframes does not have a model_id attribute")
+        if not is_model_id_valid(frame.model_id):
+            raise Exception("Invalid model_id: {0}".format(frame.model_id))
+    inputs = frames[0].input
+    for frame in frames[1:]:
+        if not (frame.input is inputs or np.array_equal(frame.input, inputs)):
+            raise Exception("Input columns do not match!")
+    key = next((frame.key for frame in frames if frame.key is not None), None)
+    with span("hstack", rows=len(inputs), frames=len(frames)):
+        dtype = np.result_type(*[frame.values.dtype for frame in frames])
+        values = np.empty((len(inputs), sum(len(frame.features) for frame in frames)), dtype=dtype)
+        features = []
+        for frame in frames:
+            values[:, len(features):len(features) + len(frame.features)] = frame.values
+            features += [c + "." + frame.model_id for c in frame.features]
+    return ErsiliaFrame(values, features, key=key, input=inputs)
+
+
+def _vstack_frames(frames: List[ErsiliaFrame]) -> ErsiliaFrame:
+    """
+    Stack ErsiliaFrames vertically. All of them must have the same columns.
+    """
+    for frame in frames:
+        if frame.columns != frames[0].columns:
+            raise Exception("Columns do not match")
+        if frame.model_id is None:
+            raise Exception("One of the dataframes does not have a model_id attribute")
+    with span("vstack", frames=len(frames)) as s:
+        do = ErsiliaFrame.concat(frames)
+        s.rows = len(do)
+    return do
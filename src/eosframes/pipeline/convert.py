@@ -0,0 +1,209 @@
+import os
+import time
+import pandas as pd
+
+from ..utils.utils import get_model_id_from_path, plan_batch_size
+from .pipeline import run_pipeline
+
+FORMATS = ("h5", "csv", "chunks", "parquet")
+
+# copies made while converting a batch (parsing, casting, encoding)
+_COPIES = 2
+
+
+def _format(path: str) -> str:
+    extension = os.path.splitext(path.rstrip(os.sep))[1].lower()
+    if extension in (".h5", ".hdf5"):
+        return "h5"
+    if extension == ".csv":
+        return "csv"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    if extension == "" or os.path.isdir(path):
+        return "chunks"
+    raise Exception("Unknown format of {0}. Use .h5, .csv, .parquet or a directory of chunked CSV files".format(path))
+
+
+def _n_columns(path: str, fmt: str) -> int:
+    """
+    Number of columns of a source, read from its metadata or header only.
+    """
+    if fmt == "h5":
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            n = f["values"].shape[1] + 2
+            if "bit_features" in f.keys():
+                n += len(f["bit_features"])
+            return n
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return len(pq.ParquetFile(path).schema_arrow)
+    if fmt == "chunks":
+        from ..read.read import _chunk_files
+
+        path = os.path.join(path, _chunk_files(path)[0])
+    return len(pd.read_csv(path, nrows=0).columns)
+
+
+def _batch_rows(n_columns: int, memory_budget, prefetch: int) -> int:
+    """
+    Rows per batch such that the batches in flight fit in the memory budget, with float64 values.
+    """
+    # run_pipeline holds the queues of both background stages plus one batch in every stage
+    in_flight = 2 * prefetch + 3
+    return plan_batch_size(n_columns, memory_budget=memory_budget, copies=_COPIES * in_flight)
+
+
+def _csv_batches(paths: list, batch_rows: int, model_id: str):
+    for path in paths:
+        for df in pd.read_csv(path, chunksize=batch_rows):
+            df.model_id = model_id
+            yield df
+
+
+def _parquet_batches(path: str, batch_rows: int, model_id: str):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+        df = batch.to_pandas()
+        df.model_id = model_id
+        yield df
+
+
+def _batches(path: str, fmt: str, batch_rows: int, model_id: str):
+    if fmt == "h5":
+        from ..read.read import iter_h5
+
+        return iter_h5(path, batch_size=batch_rows)
+    if fmt == "parquet":
+        return _parquet_batches(path, batch_rows, model_id)
+    if fmt == "chunks":
+        from ..read.read import _chunk_files
+
+        return _csv_batches([os.path.join(path, fn) for fn in _chunk_files(path)], batch_rows, model_id)
+    return _csv_batches([path], batch_rows, model_id)
+
+
+class _CsvWriter:
+    """
+    Append batches to a single CSV file.
+    """
+
+    def __init__(self, path: str):
+        if os.path.exists(path):
+            raise Exception("File {0} exists. Please remove it before saving".format(path))
+        self.path = path
+        self._header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+
+    def close(self) -> None:
+        pass
+
+
+class _ParquetWriter:
+    """
+    Append batches to a Parquet file, one row group per batch. The model_id is kept in the schema metadata.
+    """
+
+    def __init__(self, path: str, model_id: str):
+        if os.path.exists(path):
+            raise Exception("File {0} exists. Please remove it before saving".format(path))
+        self.path = path
+        self.model_id = model_id
+        self._writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            schema = table.schema.with_metadata({**(table.schema.metadata or {}), b"eosframes.model_id": self.model_id.encode()})
+            self._writer = pq.ParquetWriter(self.path, schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _writer(path: str, fmt: str, dtype, model_id: str, compression: str = None, compression_level: int = None):
+    if fmt == "h5":
+        from ..write.write import H5Writer
+
+        return H5Writer(path, dtype=dtype)
+    if fmt == "chunks":
+        from ..write.write import ChunkedCsvWriter
+
+        return ChunkedCsvWriter(path, compression=compression, compression_level=compression_level)
+    if fmt == "parquet":
+        return _ParquetWriter(path, model_id)
+    return _CsvWriter(path)
+
+
+def convert(source: str, destination: str, memory_budget: int = None, batch_size: int = None, dtype: any = "float32", compression: str = None, compression_level: int = None, prefetch: int = 2, progress=None):
+    """
+    Convert an Ersilia output between formats batch by batch, without loading it whole.
+    Formats are inferred from the paths: .h5 (HDF5 as write_h5), .csv, .parquet (requires pyarrow)
+    or a directory of chunked CSV files (as write_chunked_csvs).
+
+    Parameters
+    ----------
+    source: str
+        Path of the output to convert. It must contain the model_id
+    destination: str
+        Path of the converted output, with the same model_id. It must not exist
+    memory_budget: int or str
+        Approximate memory for the batches in flight, in bytes or as "2G". Batch sizes are derived from it and
+        the number of columns of the source. By default a quarter of the available memory (see utils.plan_batch_size)
+    batch_size: int
+        Rows per batch, instead of planning it from the memory budget
+    dtype: data type
+        Data type of the feature values of an HDF5 destination (default float32)
+    compression: str
+        Compression of the chunks of a chunked CSV destination: "gzip" or "zstd" (see write_chunked_csvs)
+    compression_level: int
+        Compression level of the chunks
+    prefetch: int
+        Batches waiting between reading, converting and writing (see run_pipeline)
+    progress: callable
+        Called after every written batch with the number of rows written so far and the elapsed seconds
+
+    Returns
+    -------
+    PipelineReport
+    """
+    if not os.path.exists(source):
+        raise Exception("Source {0} does not exist".format(source))
+    if os.path.exists(destination):
+        raise Exception("Destination {0} exists. Please remove it before converting".format(destination))
+    model_id = get_model_id_from_path(os.path.normpath(source))
+    if model_id is None:
+        raise Exception("Could not extract model_id from source {0}".format(source))
+    model_id_1 = get_model_id_from_path(os.path.normpath(destination))
+    if model_id_1 != model_id:
+        raise Exception("Model_id from source ({0}) does not match model_id from destination ({1})".format(model_id, model_id_1))
+    source_format, destination_format = _format(source), _format(destination)
+    if batch_size is None:
+        batch_size = _batch_rows(_n_columns(source, source_format), memory_budget, prefetch)
+    if compression is not None and destination_format != "chunks":
+        raise Exception("Compression is only available for chunked CSV destinations")
+    writer = _writer(destination, destination_format, dtype, model_id, compression, compression_level)
+    start = time.perf_counter()
+    written = [0]
+
+    def write(df):
+        writer.write(df)
+        written[0] += len(df)
+        if progress is not None:
+            progress(written[0], time.perf_counter() - start)
+
+    try:
+        return run_pipeline(_batches(source, source_format, batch_size, model_id), None, write, prefetch=prefetch)
+    finally:
+        writer.close()
@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+
+from ..utils.instrument import span
+
+STAGES = ("read", "transform", "write")
+
+# end of the batches
+_DONE = object()
+# how often blocked stages check whether another stage failed
+_POLL_SECONDS = 0.05
+
+
+class PipelineReport:
+    """
+    Time spent by every stage of a pipeline run, in seconds: busy doing its work, starved waiting for a batch
+    from the previous stage and blocked waiting for room in the queue of the next stage.
+    The stage with the largest busy time is the bottleneck; the run takes about as long as that stage.
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.busy = {stage: 0.0 for stage in STAGES}
+        self.starved = {stage: 0.0 for stage in STAGES}
+        self.blocked = {stage: 0.0 for stage in STAGES}
+
+    @property
+    def bottleneck(self) -> str:
+        return max(STAGES, key=lambda stage: self.busy[stage])
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "bottleneck": self.bottleneck,
+            "busy": dict(self.busy),
+            "starved": dict(self.starved),
+            "blocked": dict(self.blocked),
+        }
+
+    def __repr__(self) -> str:
+        stages = ", ".join(
+            "{0}: {1:.2f}s busy {2:.2f}s starved {3:.2f}s blocked".format(s, self.busy[s], self.starved[s], self.blocked[s]) for s in STAGES
+        )
+        return "PipelineReport({0} batches, {1} rows in {2:.2f}s; {3})".format(self.batches, self.rows, self.seconds, stages)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def run_pipeline(batches, transform=None, write=None, prefetch: int = 2) -> PipelineReport:
+    """
+    Run read -> transform -> write over batches with the three stages overlapped: the next batches are
+    read and the previous results are written on background threads while the current batch is transformed.
+    Bounded queues of prefetch batches between the stages limit memory to a few batches.
+
+    Reading (h5py, CSV parsing), numpy/scikit-learn transforms and writing spend most of their time
+    outside the GIL, so the run is limited by the slowest stage instead of the sum of the stages.
+
+    Parameters
+    ----------
+    batches: iterable
+        Input batches, e.g. read.iter_h5(path) or read.iter_chunked_csvs(dir_path)
+    transform: callable
+        Function of a batch returning the output batch, e.g. Scale(...).transform. By default batches are not changed
+    write: callable
+        Function called with every output batch, in input order, e.g. write.H5Writer(path, dtype).write.
+        By default the output batches are dropped
+    prefetch: int
+        Maximum number of batches waiting between two stages (default 2)
+
+    Returns
+    -------
+    PipelineReport
+        Busy and stall times of every stage. Errors of any stage stop the pipeline and are raised.
+    """
+    if prefetch < 1:
+        raise Exception("prefetch must be at least 1, got {0}".format(prefetch))
+    report = PipelineReport()
+    stop = threading.Event()
+    errors = []
+    inputs = queue.Queue(maxsize=prefetch)
+    outputs = queue.Queue(maxsize=prefetch)
+
+    def read():
+        try:
+            it = iter(batches)
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    batch = next(it)
+                except StopIteration:
+                    break
+                t1 = time.perf_counter()
+                report.busy["read"] += t1 - t0
+                _put(inputs, batch, stop)
+                report.blocked["read"] += time.perf_counter() - t1
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(inputs, _DONE, stop)
+
+    def write_batches():
+        try:
+            while True:
+                t0 = time.perf_counter()
+                batch = _get(outputs, stop)
+                t1 = time.perf_counter()
+                report.starved["write"] += t1 - t0
+                if batch is _DONE:
+                    break
+                if write is not None:
+                    write(batch)
+                report.busy["write"] += time.perf_counter() - t1
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    reader = threading.Thread(target=read, name="eosframes-pipeline-read", daemon=True)
+    writer = threading.Thread(target=write_batches, name="eosframes-pipeline-write", daemon=True)
+    start = time.perf_counter()
+    with span("run_pipeline", prefetch=prefetch) as s:
+        reader.start()
+        writer.start()
+        try:
+            while True:
+                t0 = time.perf_counter()
+                batch = _get(inputs, stop)
+                t1 = time.perf_counter()
+                report.starved["transform"] += t1 - t0
+                if batch is _DONE:
+                    break
+                output = transform(batch) if transform is not None else batch
+                t2 = time.perf_counter()
+                report.busy["transform"] += t2 - t1
+                report.batches += 1
+                report.rows += len(output)
+                _put(outputs, output, stop)
+                report.blocked["transform"] += time.perf_counter() - t2
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(outputs, _DONE, stop)
+        writer.join()
+        stop.set()
+        reader.join()
+        s.rows = report.rows
+    report.seconds = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return report
@@ -1,11 +1,75 @@
 import os
-import h5py
+import csv
+import json
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
-from ..utils.utils import get_model_id_from_path
+from ..default import VALID_DATATYPES, CHUNKS_MANIFEST_FILE, CHUNK_EXTENSIONS
+from ..frame.frame import ErsiliaFrame
+from ..utils.utils import get_model_id_from_path, get_column_schema, plan_batch_size
+from ..utils.instrument import span
+from ..utils.predicates import validate_where, blocks_may_match, row_mask
 
 
-def read_csv(file_path: str) -> pd.DataFrame:
+def _downcast_integers(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """
+    Convert integer columns parsed as float32 to int8 when no value is missing or out of the int8 range.
+    """
+    if not columns:
+        return df
+    values = df[columns].to_numpy(dtype=np.float32)
+    fits = np.isfinite(values).all(axis=0) & (values >= -128).all(axis=0) & (values <= 127).all(axis=0) & (values == np.rint(values)).all(axis=0)
+    int_cols = [c for c, ok in zip(columns, fits) if ok]
+    if int_cols:
+        df[int_cols] = pd.DataFrame(values[:, fits].astype(np.int8), index=df.index, columns=int_cols)
+    return df
+
+
+def _read_typed_csv(file_path: str, schema=None, usecols: list = None, engine: str = None) -> pd.DataFrame:
+    """
+    Read a CSV file parsing columns straight to the datatypes of the schema.
+    Integer columns are parsed as float32 and downcast to int8 afterwards, since int8 cannot hold
+    missing values and pandas wraps around out-of-range integers silently.
+    """
+    if schema is None and usecols is None and engine is None:
+        return pd.read_csv(file_path)
+    if schema is not None and not isinstance(schema, dict):
+        schema = get_column_schema(schema)
+    if file_path.endswith(".csv"):
+        with open(file_path, "r", newline="") as f:
+            header = next(csv.reader(f), [])
+    else:
+        # compressed chunk
+        header = pd.read_csv(file_path, nrows=0).columns.tolist()
+    if usecols is not None:
+        missing = [c for c in usecols if c not in header]
+        if missing:
+            raise Exception("File {0} does not contain the columns {1}".format(file_path, missing))
+        wanted = set(usecols) | {"key", "input"}
+        header = [c for c in header if c in wanted]
+    dtype = {}
+    int_cols = []
+    for c in header:
+        datatype = schema.get(c) if schema is not None else None
+        if datatype is None:
+            continue
+        if datatype not in VALID_DATATYPES:
+            raise Exception("Column {0} has datatype {1}. Valid datatypes are {2}".format(c, datatype, VALID_DATATYPES))
+        if datatype is np.int8:
+            int_cols += [c]
+            datatype = np.float32
+        dtype[c] = datatype
+    df = pd.read_csv(
+        file_path,
+        usecols=header if usecols is not None else None,
+        dtype=dtype or None,
+        engine=engine or "c",
+    )
+    return _downcast_integers(df, int_cols)
+
+
+def read_csv(file_path: str, schema=None, usecols: list = None, engine: str = None, where=None) -> pd.DataFrame:
     """
     Read CSV file into a Pandas DataFrame
     This file is assumed to have the standard Ersilia format, containing columns "key", "input", and feature columns.
@@ -14,6 +78,17 @@ def read_csv(file_path: str) -> pd.DataFrame:
     ----------
     file_path: str
         Path to the CSV file
+    schema: dict, pd.DataFrame or str
+        Optional column schema. Either a mapping of column names to datatypes in default.VALID_DATATYPES,
+        the run_columns table of the model (see utils.get_run_columns) or the path to a run_columns.csv file.
+        Features are then parsed straight to float32/int8 instead of letting pandas infer the types.
+        Integer columns with missing or out-of-range values are kept as float32.
+    usecols: list
+        Optional feature columns to read. "key" and "input" are always read.
+    engine: str
+        CSV parser passed to pandas, e.g. "pyarrow" for multithreaded parsing (default "c")
+    where: list
+        Optional predicates, e.g. [("score", ">", 0.9)]. Only the matching rows are returned.
     
     Returns
     -------
@@ -25,7 +100,12 @@ def read_csv(file_path: str) -> pd.DataFrame:
     model_id = get_model_id_from_path(file_path)
     if model_id is None:
         raise Exception("Could not extract model_id from file name {0}".format(file_path))
-    df = pd.read_csv(file_path)
+    where = validate_where(where)
+    with span("read_csv", model_id=model_id) as s:
+        df = _read_typed_csv(file_path, schema=schema, usecols=usecols, engine=engine)
+        if where:
+            df = df[row_mask(df, where)].reset_index(drop=True)
+        s.rows = len(df)
     if "key" not in df.columns:
         raise Exception("File {0} does not contain a column named 'key'".format(file_path))
     if "input" not in df.columns:
@@ -34,7 +114,116 @@ def read_csv(file_path: str) -> pd.DataFrame:
     return df
 
 
-def read_h5(h5_path: str) -> pd.DataFrame:
+def _read_strings(dataset, strings: str, rows: slice = slice(None)):
+    """
+    Read a string dataset in bulk.
+    "object" decodes with h5py into an array of str. "pyarrow" and "category" read the raw UTF-8 bytes
+    and decode them with pyarrow or only once per distinct value, so no Python object is created per row
+    when the dataset has fixed-width strings.
+    """
+    if strings == "object":
+        return dataset.asstr()[rows]
+    raw = dataset[rows]
+    if raw.dtype == object:
+        # variable-length strings come out of h5py as bytes objects
+        raw = raw.astype("S")
+    if strings == "pyarrow":
+        import pyarrow as pa
+
+        return pd.arrays.ArrowStringArray(pa.array(raw, type=pa.large_binary()).cast(pa.large_string()))
+    try:
+        import pyarrow as pa
+    except ImportError:
+        categories, codes = np.unique(raw, return_inverse=True)
+        return pd.Categorical.from_codes(codes.reshape(-1), np.char.decode(categories, "utf-8").astype(object))
+    encoded = pa.array(raw, type=pa.large_binary()).dictionary_encode()
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    categories = encoded.dictionary.cast(pa.large_string()).to_numpy(zero_copy_only=False)
+    return pd.Categorical.from_codes(encoded.indices.to_numpy(), categories)
+
+
+def _unpack_bits(dataset, dtype, rows: slice = slice(None), chunksize: int = None) -> np.ndarray:
+    """
+    Unpack rows of a "bits" dataset into 0/1 values of the given dtype, one block of rows at a time.
+    """
+    n_features = int(dataset.attrs["n_features"])
+    chunksize = chunksize or plan_batch_size(n_features, np.uint8, copies=2)
+    first, last, _ = rows.indices(dataset.shape[0])
+    out = np.empty((max(0, last - first), n_features), dtype=dtype)
+    for start in range(first, last, chunksize):
+        stop = min(start + chunksize, last)
+        out[start - first:stop - first] = np.unpackbits(dataset[start:stop], axis=1, count=n_features)
+    return out
+
+
+def _read_h5_rows(f, rows: slice, strings: str, unpack_bits: bool) -> pd.DataFrame:
+    """
+    Read a range of rows of an open Ersilia HDF5 file.
+    """
+    values = f["values"][rows]
+    columns = f["features"].asstr()[:].tolist()
+    if "key" in f.keys():
+        df = pd.DataFrame({"key": _read_strings(f["key"], strings, rows), "input": _read_strings(f["input"], strings, rows)})
+    else:
+        df = pd.DataFrame({"input": _read_strings(f["input"], strings, rows)})
+    df_ = pd.DataFrame(values, columns=columns)
+    if "bits" in f.keys() and unpack_bits:
+        bits = _unpack_bits(f["bits"], np.dtype(f["bits"].attrs["dtype"]), rows)
+        bit_columns = f["bit_features"].asstr()[:].tolist()
+        order = np.argsort(np.concatenate([f["value_positions"][:], f["bit_positions"][:]]), kind="stable")
+        df_ = pd.concat([df_, pd.DataFrame(bits, columns=bit_columns)], axis=1).iloc[:, order]
+    return pd.concat([df, df_], axis=1)
+
+
+def _read_h5_frame(f, rows: slice, strings: str, unpack_bits: bool) -> ErsiliaFrame:
+    """
+    Read a range of rows of an open Ersilia HDF5 file into an ErsiliaFrame, with a single feature matrix.
+    """
+    values = f["values"][rows]
+    columns = f["features"].asstr()[:].tolist()
+    if "bits" in f.keys() and unpack_bits:
+        bits = _unpack_bits(f["bits"], np.dtype(f["bits"].attrs["dtype"]), rows)
+        bit_columns = f["bit_features"].asstr()[:].tolist()
+        value_positions, bit_positions = f["value_positions"][:], f["bit_positions"][:]
+        merged = np.empty((values.shape[0], len(columns) + len(bit_columns)), dtype=np.result_type(values.dtype, bits.dtype))
+        merged[:, value_positions] = values
+        merged[:, bit_positions] = bits
+        names = [None] * merged.shape[1]
+        for i, c in zip(value_positions, columns):
+            names[i] = c
+        for i, c in zip(bit_positions, bit_columns):
+            names[i] = c
+        values, columns = merged, names
+    key = np.asarray(_read_strings(f["key"], strings, rows), dtype=object) if "key" in f.keys() else None
+    return ErsiliaFrame(values, columns, key=key, input=np.asarray(_read_strings(f["input"], strings, rows), dtype=object))
+
+
+def _h5_blocks(f, where: list) -> list:
+    """
+    Row ranges of an open HDF5 file that can contain rows matching the predicates, according to
+    the per-block statistics written by write_h5. Files without statistics are a single block.
+    """
+    n_rows = f["values"].shape[0]
+    if "stats" not in f.keys():
+        return [(0, n_rows)]
+    stats = f["stats"]
+    block_size = int(stats.attrs["block_size"])
+    n_blocks = stats["rows"].shape[0]
+    minimum, maximum = {}, {}
+    columns = f["features"].asstr()[:].tolist()
+    wanted = set(c for c, _, _ in where)
+    for j, c in enumerate(columns):
+        if c in wanted:
+            minimum[c], maximum[c] = stats["min"][:, j], stats["max"][:, j]
+    if "key" in wanted and "key_min" in stats.keys():
+        minimum["key"] = stats["key_min"].asstr()[:].astype(str)
+        maximum["key"] = stats["key_max"].asstr()[:].astype(str)
+    keep = blocks_may_match(where, minimum, maximum, n_blocks)
+    return [(b * block_size, min((b + 1) * block_size, n_rows)) for b in np.flatnonzero(keep)]
+
+
+def read_h5(h5_path: str, strings: str = "object", unpack_bits: bool = True, where=None, frame: bool = False) -> pd.DataFrame:
     """
     Read HDF5 file into a Pandas DataFrame
     This file is assumed to have the standard Ersilia format, containing values, features, key (optional), and input datasets.
@@ -43,6 +232,17 @@ def read_h5(h5_path: str) -> pd.DataFrame:
     ----------
     h5_path: str
         Path to the HDF5 file
+    strings: str
+        How key and input are returned: "object" for Python strings (default), "pyarrow" for Arrow-backed
+        strings or "category" for categoricals. The last two keep far fewer Python objects in memory.
+    unpack_bits: bool
+        Unpack binary features stored as bits (see write_h5 pack_binary) into columns (default).
+        If False they are left out of the DataFrame; use read_bits to get them packed.
+    where: list
+        Optional predicates, e.g. [("score", ">", 0.9)] or [("key", "in", keys)]. Only the matching rows are returned,
+        and blocks of rows that cannot match according to the statistics written by write_h5 are not read.
+    frame: bool
+        Return an ErsiliaFrame, with the features in a single contiguous matrix, instead of a DataFrame
 
     Returns
     -------
@@ -54,35 +254,322 @@ def read_h5(h5_path: str) -> pd.DataFrame:
     model_id = get_model_id_from_path(h5_path)
     if model_id is None:
         raise Exception("Could not extract model_id from file name {0}".format(h5_path))
+    if strings not in ("object", "pyarrow", "category"):
+        raise Exception("Unknown string type {0}. Use 'object', 'pyarrow' or 'category'".format(strings))
+    where = validate_where(where)
+    import h5py
+
+    with span("read_h5", model_id=model_id) as s:
+        with h5py.File(h5_path, "r") as f:
+            if "values" not in f.keys():
+                raise Exception("File {0} does not contain a dataset named 'values'".format(h5_path))
+            if f.attrs.get("layout") == "quantized":
+                raise Exception("File {0} contains quantized values. Use dequantize to read it".format(h5_path))
+            reader = _read_h5_frame if frame else _read_h5_rows
+            if not where:
+                df = reader(f, slice(None), strings, unpack_bits)
+            else:
+                frames = []
+                for start, stop in _h5_blocks(f, where):
+                    block = reader(f, slice(start, stop), strings, unpack_bits)
+                    mask = row_mask(block, where)
+                    frames += [block.take(mask) if frame else block[mask]]
+                if not frames:
+                    frames = [reader(f, slice(0, 0), strings, unpack_bits)]
+                if frame:
+                    df = ErsiliaFrame.concat(frames)
+                else:
+                    df = pd.concat(frames, axis=0, ignore_index=True)
+                if strings == "category" and not frame:
+                    # blocks have their own categories
+                    for c in ("key", "input"):
+                        if c in df.columns:
+                            df[c] = df[c].astype("category")
+        s.rows = len(df)
+    df.model_id = model_id
+    return df
+
+
+def iter_h5(h5_path: str, batch_size: int = None, strings: str = "object", unpack_bits: bool = True, frame: bool = False):
+    """
+    Read an Ersilia HDF5 file one batch of rows at a time, so that a large output can be processed
+    without holding it all in memory.
+
+    Parameters
+    ----------
+    h5_path: str
+        Path to the HDF5 file
+    batch_size: int
+        Number of rows per batch. By default planned from the number of features, their data type
+        and the available memory (see utils.plan_batch_size)
+    strings: str
+        How key and input are returned, as in read_h5
+    unpack_bits: bool
+        Unpack binary features stored as bits, as in read_h5
+    frame: bool
+        Yield ErsiliaFrames instead of DataFrames
+
+    Yields
+    ------
+    pd.DataFrame
+        Batch of rows, with the model_id attribute
+    """
+    if not os.path.exists(h5_path):
+        raise Exception("File {0} does not exist".format(h5_path))
+    model_id = get_model_id_from_path(h5_path)
+    if model_id is None:
+        raise Exception("Could not extract model_id from file name {0}".format(h5_path))
+    if strings not in ("object", "pyarrow", "category"):
+        raise Exception("Unknown string type {0}. Use 'object', 'pyarrow' or 'category'".format(strings))
+    import h5py
+
     with h5py.File(h5_path, "r") as f:
         if "values" not in f.keys():
             raise Exception("File {0} does not contain a dataset named 'values'".format(h5_path))
-        values = f["values"][:]
-        columns = [x.decode("utf-8") for x in f["features"][:]]
-        if "key" in f.keys():
-            keys = [x.decode("utf-8") for x in f["key"][:]]
-        else:
-            keys = None
-        inputs = [x.decode("utf-8") for x in f["input"][:]]
-    if keys is None:
-        df = pd.DataFrame({"input": inputs})
-    else:
-        df = pd.DataFrame({"key": keys, "input": inputs})
-    df_ = pd.DataFrame(values, columns=columns)
-    df = pd.concat([df, df_], axis=1)
+        if f.attrs.get("layout") == "quantized":
+            raise Exception("File {0} contains quantized values. Use dequantize to read it".format(h5_path))
+        reader = _read_h5_frame if frame else _read_h5_rows
+        if batch_size is None:
+            n_features = f["values"].shape[1] + (int(f["bits"].attrs["n_features"]) if "bits" in f.keys() and unpack_bits else 0)
+            batch_size = plan_batch_size(n_features, f["values"].dtype)
+        for start in range(0, f["values"].shape[0], batch_size):
+            with span("iter_h5", model_id=model_id) as s:
+                df = reader(f, slice(start, start + batch_size), strings, unpack_bits)
+                s.rows = len(df)
+            df.model_id = model_id
+            yield df
+
+
+def read_bits(h5_path: str, rows=None) -> tuple:
+    """
+    Read the binary features of an HDF5 file written with pack_binary=True, still packed
+    8 per byte (big bit order), e.g. for popcount or Tanimoto similarity on fingerprints.
+
+    Parameters
+    ----------
+    h5_path: str
+        Path to the HDF5 file
+    rows: slice or array of int
+        Optional rows to read (increasing positions), instead of the whole dataset
+
+    Returns
+    -------
+    features: list
+        Names of the binary features, in bit order
+    bits: np.ndarray
+        uint8 array of shape (rows, ceil(features / 8)). Unpack with np.unpackbits(bits, axis=1, count=len(features))
+    """
+    if not os.path.exists(h5_path):
+        raise Exception("File {0} does not exist".format(h5_path))
+    import h5py
+
+    with h5py.File(h5_path, "r") as f:
+        if "bits" not in f.keys():
+            raise Exception("File {0} does not contain binary features stored as bits".format(h5_path))
+        features = f["bit_features"].asstr()[:].tolist()
+        bits = f["bits"][rows if rows is not None else slice(None)]
+    return features, bits
+
+
+def _find_rows(index, keys: list) -> np.ndarray:
+    """
+    Row of every key in a key index written by write_h5(..., key_index=True), or -1 if the key is not found.
+    Only the fences and the blocks of sorted keys that can contain the searched keys are read.
+    """
+    query = np.array([str(k).encode("utf-8") for k in keys], dtype=object).astype("S")
+    rows = np.full(len(query), -1, dtype=np.int64)
+    if len(query) == 0 or index["keys"].shape[0] == 0:
+        return rows
+    block_size = int(index.attrs["block_size"])
+    keys_dataset, rows_dataset = index["keys"], index["rows"]
+    blocks = np.maximum(np.searchsorted(index["fences"][:], query, side="right") - 1, 0)
+    for block in np.unique(blocks):
+        selected = np.flatnonzero(blocks == block)
+        start = int(block) * block_size
+        sorted_keys = keys_dataset[start:start + block_size]
+        positions = np.minimum(np.searchsorted(sorted_keys, query[selected]), len(sorted_keys) - 1)
+        hits = sorted_keys[positions] == query[selected]
+        if hits.any():
+            block_rows = rows_dataset[start:start + block_size]
+            rows[selected[hits]] = block_rows[positions[hits]]
+    return rows
+
+
+def lookup(h5_path: str, keys: list) -> pd.DataFrame:
+    """
+    Read the rows of the given keys from an HDF5 file written with write_h5(..., key_index=True).
+    Only the matching rows are read from disk. Keys are assumed to be unique in the file.
+    The features of quantized files (see write_h5 quantizer) are dequantized as in dequantize.
+
+    Parameters
+    ----------
+    h5_path: str
+        Path to the HDF5 file
+    keys: list
+        Keys to fetch (e.g. InChIKeys)
+
+    Returns
+    -------
+    df: pd.DataFrame
+        DataFrame with the rows of the keys that were found, in the order of the keys
+    """
+    if not os.path.exists(h5_path):
+        raise Exception("File {0} does not exist".format(h5_path))
+    model_id = get_model_id_from_path(h5_path)
+    import h5py
+
+    with span("lookup", model_id=model_id) as s:
+        with h5py.File(h5_path, "r") as f:
+            if "key_index" not in f.keys():
+                raise Exception("File {0} does not have a key index. Write it with write_h5(..., key_index=True)".format(h5_path))
+            rows = _find_rows(f["key_index"], list(keys))
+            rows = rows[rows >= 0]
+            # h5py reads increasing row selections; restore the order of the keys afterwards
+            unique_rows, inverse = np.unique(rows, return_inverse=True)
+            n_rows = len(unique_rows)
+            columns = f["features"].asstr()[:].tolist()
+            values = f["values"][unique_rows] if n_rows else np.empty((0, len(columns)), dtype=f["values"].dtype)
+            if f.attrs.get("layout") == "quantized":
+                values = _code_decoder(f)(values) if n_rows else values.astype(np.float32)
+            inputs = f["input"].asstr()[unique_rows] if n_rows else np.empty(0, dtype=object)
+            found_keys = f["key"].asstr()[unique_rows] if n_rows else np.empty(0, dtype=object)
+            if "bits" in f.keys():
+                bits = f["bits"]
+                bit_columns = f["bit_features"].asstr()[:].tolist()
+                packed = bits[unique_rows] if n_rows else np.empty((0, bits.shape[1]), dtype=np.uint8)
+                unpacked = np.unpackbits(packed, axis=1, count=int(bits.attrs["n_features"])).astype(np.dtype(bits.attrs["dtype"]))
+                order = np.argsort(np.concatenate([f["value_positions"][:], f["bit_positions"][:]]), kind="stable")
+            else:
+                unpacked = None
+        df_ = pd.DataFrame(values, columns=columns)
+        if unpacked is not None:
+            df_ = pd.concat([df_, pd.DataFrame(unpacked, columns=bit_columns)], axis=1).iloc[:, order]
+        df = pd.concat([pd.DataFrame({"key": found_keys, "input": inputs}), df_], axis=1)
+        df = df.iloc[inverse.reshape(-1)].reset_index(drop=True)
+        s.rows = len(df)
     df.model_id = model_id
     return df
 
 
-def read_chunked_csvs(dir_path: str) -> pd.DataFrame:
+def _code_decoder(f):
+    """
+    Function mapping the int8 codes of an open quantized HDF5 file to their float32 dequantized values.
+    """
+    table = f["code_values"][:]
+    missing_code = f["code_values"].attrs.get("missing_code")
+    # index of (column, code) in the flattened table
+    offsets = np.arange(table.shape[0], dtype=np.int64) * table.shape[1] + int(f["code_values"].attrs["code_offset"])
+    table = table.ravel()
+
+    def decode(codes: np.ndarray) -> np.ndarray:
+        if missing_code is None:
+            return np.take(table, codes + offsets)
+        missing = codes == missing_code
+        values = np.take(table, np.where(missing, 0, codes + offsets))
+        values[missing] = np.nan
+        return values
+
+    return decode
+
+
+def dequantize(h5_path: str, batch_size: int = None):
+    """
+    Reconstruct approximate feature values from an HDF5 file written with write_h5(..., quantizer=...),
+    one batch of rows at a time. Every int8 code is replaced by the mean original value of its column and code.
+    Values that were missing when written are NaN (in files written before missing codes were stored,
+    they have the value of the code of their imputed value).
+
+    Parameters
+    ----------
+    h5_path: str
+        Path to the quantized HDF5 file
+    batch_size: int
+        Number of rows per batch. By default planned from the number of features and the available memory
+
+    Yields
+    ------
+    pd.DataFrame
+        Batch with the key (if present), input and float32 feature columns
+    """
+    if not os.path.exists(h5_path):
+        raise Exception("File {0} does not exist".format(h5_path))
+    model_id = get_model_id_from_path(h5_path)
+    import h5py
+
+    with h5py.File(h5_path, "r") as f:
+        if f.attrs.get("layout") != "quantized":
+            raise Exception("File {0} does not contain quantized values".format(h5_path))
+        columns = f["features"].asstr()[:].tolist()
+        decode = _code_decoder(f)
+        has_key = "key" in f.keys()
+        # int64 code indices and float32 values
+        batch_size = batch_size or plan_batch_size(len(columns), np.int64, copies=3)
+        for start in range(0, f["values"].shape[0], batch_size):
+            stop = start + batch_size
+            with span("dequantize", model_id=model_id) as s:
+                values = decode(f["values"][start:stop])
+                df = pd.DataFrame({"input": f["input"].asstr()[start:stop]})
+                if has_key:
+                    df.insert(0, "key", f["key"].asstr()[start:stop])
+                df = pd.concat([df, pd.DataFrame(values, columns=columns)], axis=1)
+                s.rows = len(df)
+            df.model_id = model_id
+            yield df
+
+
+def _read_manifest(dir_path: str) -> dict:
+    path = os.path.join(dir_path, CHUNKS_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _chunks_may_match(manifest: dict, file_names: list, where: list) -> list:
+    """
+    Chunk files that can contain rows matching the predicates according to the manifest.
+    Chunks missing from the manifest are always read.
+    """
+    entries = {c["file"]: c for c in manifest.get("chunks", [])}
+    described = [fn for fn in file_names if fn in entries]
+    if not described:
+        return file_names
+    columns = manifest.get("columns", [])
+    wanted = set(c for c, _, _ in where)
+    minimum, maximum = {}, {}
+    for j, c in enumerate(columns):
+        if c in wanted:
+            minimum[c] = np.array([np.nan if entries[fn]["min"][j] is None else entries[fn]["min"][j] for fn in described])
+            maximum[c] = np.array([np.nan if entries[fn]["max"][j] is None else entries[fn]["max"][j] for fn in described])
+    if "key" in wanted and all(entries[fn].get("key_min") is not None for fn in described):
+        minimum["key"] = np.array([entries[fn]["key_min"] for fn in described], dtype=str)
+        maximum["key"] = np.array([entries[fn]["key_max"] for fn in described], dtype=str)
+    keep = set(fn for fn, k in zip(described, blocks_may_match(where, minimum, maximum, len(described))) if k)
+    return [fn for fn in file_names if fn not in entries or fn in keep]
+
+
+def read_chunked_csvs(dir_path: str, schema=None, usecols: list = None, engine: str = None, where=None, n_jobs: int = None) -> pd.DataFrame:
     """
     Read CSV files from a folder, assuming they have a suffix that determines their order.
     Files must be in the standard Ersilia format, containing columns "key" (optional), "input", and feature columns.
+    Chunks compressed by write_chunked_csvs (.csv.gz, .csv.zst) are decompressed transparently, and chunks are
+    read in parallel threads.
     
     Parameters
     ----------
     dir_path: str
         Path to the directory containing the CSV files
+    schema: dict, pd.DataFrame or str
+        Optional column schema, as in read_csv
+    usecols: list
+        Optional feature columns to read, as in read_csv
+    engine: str
+        CSV parser passed to pandas, e.g. "pyarrow" (default "c")
+    where: list
+        Optional predicates, e.g. [("score", ">", 0.9)]. Only the matching rows are returned, and chunks that cannot
+        match according to the statistics in the manifest written by write_chunked_csvs are not read.
+    n_jobs: int
+        Number of chunks read at once (default: number of CPUs)
     
     Returns
     -------
@@ -94,27 +581,112 @@ def read_chunked_csvs(dir_path: str) -> pd.DataFrame:
     model_id = get_model_id_from_path(dir_path)
     if model_id is None:
         raise Exception("Could not extract model_id from directory name {0}".format(dir_path))
-    batch_ids = []
-    zfill = 0
+    if schema is not None and not isinstance(schema, dict):
+        schema = get_column_schema(schema)
+    file_names = _chunk_files(dir_path)
+    where = validate_where(where)
+    manifest = _read_manifest(dir_path) if where else None
+    if manifest is not None:
+        file_names = _chunks_may_match(manifest, file_names, where) or file_names[:1]
+
+    def read_chunk(fn):
+        df_ = _read_typed_csv(os.path.join(dir_path, fn), schema=schema, usecols=usecols, engine=engine)
+        if where:
+            df_ = df_[row_mask(df_, where)].reset_index(drop=True)
+        return df_
+
+    n_threads = min(n_jobs or os.cpu_count() or 1, len(file_names))
+    with span("read_chunked_csvs", model_id=model_id, chunks=len(file_names), n_jobs=n_threads) as s:
+        # decompression and parsing release the GIL for most of their time
+        if n_threads > 1:
+            with ThreadPoolExecutor(n_threads) as pool:
+                frames = list(pool.map(read_chunk, file_names))
+        else:
+            frames = [read_chunk(fn) for fn in file_names]
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, axis=0, ignore_index=True)
+        s.rows = len(df)
+    df.model_id = model_id
+    return df
+
+
+def _chunk_files(dir_path: str) -> list:
+    """
+    Names of the chunk files of a folder written by write_chunked_csvs, in chunk order.
+    """
+    extensions = tuple(CHUNK_EXTENSIONS.values())
+    files = {}
     prefixes = []
     for fn in os.listdir(dir_path):
-        if not fn.endswith(".csv") and not fn.startswith("chunk"):
-            raise Exception("The folder contains files that are not CSV. Please use a clean folder containing only CSV files in the format chunk_000000.csv")
+        if fn == CHUNKS_MANIFEST_FILE:
+            continue
+        if not fn.endswith(extensions) and not fn.startswith("chunk"):
+            raise Exception("The folder contains files that are not CSV. Please use a clean folder containing only CSV files in the format chunk_000000.csv (or .csv.gz, .csv.zst)")
         batch_id = fn.split("_")[-1].split(".")[0]
-        zfill = len(batch_id)
-        batch_ids += [int(batch_id)]
+        if int(batch_id) in files:
+            raise Exception("Chunk {0} is stored twice, as {1} and {2}".format(batch_id, files[int(batch_id)], fn))
+        files[int(batch_id)] = fn
         prefix = "_".join(fn.split("_")[0:-1])
         prefixes += [prefix]
     if len(set(prefixes)) > 1:
         raise Exception("Multiple file prefixes specified. It is not save to merge them.")
-    prefix = list(prefixes)[0]
-    df = None
-    batch_ids = sorted(batch_ids)
-    for batch_id in batch_ids:
-        fn = "{0}_{1}.csv".format(prefix, str(batch_id).zfill(zfill))
-        if df is None:
-            df = pd.read_csv(os.path.join(dir_path, fn))
-            continue
-        df = pd.concat([df, pd.read_csv(os.path.join(dir_path, fn))], axis=0).reset_index(drop=True)
-    df.model_id = model_id
-    return df
\ No newline at end of file
+    return [files[batch_id] for batch_id in sorted(files)]
+
+
+def iter_chunked_csvs(dir_path: str, schema=None, usecols: list = None, engine: str = None):
+    """
+    Read the CSV files of a folder written by write_chunked_csvs one chunk at a time, in order,
+    so that a large output can be processed without holding it all in memory. Compressed chunks are
+    decompressed transparently.
+
+    Parameters
+    ----------
+    dir_path: str
+        Path to the directory containing the CSV files
+    schema: dict, pd.DataFrame or str
+        Optional column schema, as in read_csv
+    usecols: list
+        Optional feature columns to read, as in read_csv
+    engine: str
+        CSV parser passed to pandas, e.g. "pyarrow" (default "c")
+
+    Yields
+    ------
+    pd.DataFrame
+        One chunk, with the model_id attribute
+    """
+    if not os.path.exists(dir_path):
+        raise Exception("Directory {0} does not exist".format(dir_path))
+    model_id = get_model_id_from_path(dir_path)
+    if model_id is None:
+        raise Exception("Could not extract model_id from directory name {0}".format(dir_path))
+    if schema is not None and not isinstance(schema, dict):
+        schema = get_column_schema(schema)
+    for fn in _chunk_files(dir_path):
+        with span("iter_chunked_csvs", model_id=model_id) as s:
+            df = _read_typed_csv(os.path.join(dir_path, fn), schema=schema, usecols=usecols, engine=engine)
+            s.rows = len(df)
+        df.model_id = model_id
+        yield df
+
+def read_any(path: str) -> pd.DataFrame:
+    """
+    Read an Ersilia output of any supported format into a Pandas DataFrame
+    The format is determined from the path: a directory is read as chunked CSVs, a .h5 file as HDF5 and a .csv file as CSV.
+
+    Parameters
+    ----------
+    path: str
+        Path to the CSV file, HDF5 file or directory of chunked CSV files
+
+    Returns
+    -------
+    df: pd.DataFrame
+        DataFrame containing the data from the source
+    """
+    if os.path.isdir(path):
+        return read_chunked_csvs(path)
+    if path.endswith(".h5") or path.endswith(".hdf5"):
+        return read_h5(path)
+    if path.endswith(".csv"):
+        return read_csv(path)
+    raise Exception("Could not determine the format of {0}. Use a .csv file, a .h5 file or a directory of chunked CSV files".format(path))
@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+
+from eosframes.utils.utils import is_model_id_valid
+
+TRANSFORMER_KINDS = ("scale", "quantize")
+
+# upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float("inf"))
+
+
+class ServerStats:
+    """
+    Latency and throughput counters of the transform server.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_batch_rows = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.compute_seconds = 0.0
+
+    def record_batch(self, n_rows: int, seconds: float):
+        self.batches += 1
+        self.max_batch_rows = max(self.max_batch_rows, n_rows)
+        self.compute_seconds += seconds
+
+    def record_request(self, n_rows: int, latency_ms: float, ok: bool = True):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+            return
+        self.rows += n_rows
+        self.latency_sum_ms += latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.latency_buckets[i] += 1
+                break
+
+    def to_dict(self) -> dict:
+        uptime = time.time() - self.started
+        ok = self.requests - self.errors
+        return {
+            "uptime_seconds": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rows": self.rows,
+            "batches": self.batches,
+            "rows_per_second": self.rows / uptime if uptime > 0 else 0.0,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_rows": self.max_batch_rows,
+            "mean_latency_ms": self.latency_sum_ms / ok if ok else 0.0,
+            "max_latency_ms": self.latency_max_ms,
+            "latency_histogram_ms": {
+                ("le_" + str(b) if b != float("inf") else "le_inf"): n
+                for b, n in zip(LATENCY_BUCKETS_MS, self.latency_buckets)
+            },
+            "compute_seconds": self.compute_seconds,
+        }
+
+
+class _Batcher:
+    """
+    Merges concurrent requests for one transformer into micro-batches.
+    """
+
+    def __init__(self, transformer, max_batch_rows: int, max_delay: float, stats: ServerStats):
+        self.transformer = transformer
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.stats = stats
+        self.queue = asyncio.Queue()
+        self.columns = list(transformer.feature_cols)
+        self._column_maps = {}
+        self._task = asyncio.ensure_future(self._run())
+
+    def _to_matrix(self, columns: list, rows: list) -> np.ndarray:
+        """
+        Reorder the rows of a request to the trained column order, as a float matrix.
+        """
+        key = tuple(columns)
+        if key not in self._column_maps:
+            position = {c: i for i, c in enumerate(columns)}
+            missing = [c for c in self.columns if c not in position]
+            if missing:
+                raise ValueError(f"Inference data is missing trained columns: {missing}.")
+            self._column_maps[key] = np.array([position[c] for c in self.columns], dtype=int)
+        try:
+            values = np.asarray(rows, dtype=np.float64)
+        except (TypeError, ValueError):
+            values = pd.DataFrame(rows).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError("Every row must have one value per column.")
+        return values[:, self._column_maps[key]]
+
+    async def submit(self, columns: list, rows: list) -> np.ndarray:
+        X = self._to_matrix(columns, rows)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            n_rows = len(items[0][0])
+            deadline = loop.time() + self.max_delay
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items += [item]
+                n_rows += len(item[0])
+            try:
+                t0 = time.perf_counter()
+                X = np.concatenate([x for x, _ in items], axis=0)
+                df = pd.DataFrame(X, columns=self.columns, copy=False)
+                # transformers are CPU bound: keep the event loop free to accept requests
+                result = await loop.run_in_executor(None, self.transformer.transform, df)
+                self.stats.record_batch(len(X), time.perf_counter() - t0)
+                values = result.to_numpy()
+                start = 0
+                for x, future in items:
+                    if not future.done():
+                        future.set_result(values[start:start + len(x)])
+                    start += len(x)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def close(self):
+        self._task.cancel()
+
+
+class TransformServer:
+    """
+    Local asyncio HTTP server that keeps Scale/Quantize transformers warm and micro-batches requests.
+
+    Transformers are loaded on first use from model_dir/<model_id>/<kind>, the layout written by
+    fit_models, where kind is "scale" or "quantize".
+
+    Endpoints:
+        POST /transform/<model_id>/<kind>  body {"columns": [...], "data": [[...], ...]}
+        GET /metrics                       latency and throughput counters
+        GET /health
+    """
+
+    def __init__(self, model_dir: str, max_batch_rows: int = 4096, max_delay_ms: float = 5.0):
+        self.model_dir = model_dir
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self.stats = ServerStats()
+        self._batchers = {}
+        self._loading = {}
+
+    def _load(self, model_id: str, kind: str):
+        from eosframes.transformers.scale import Scale
+        from eosframes.transformers.quantize import Quantize
+
+        if not is_model_id_valid(model_id):
+            raise ValueError("Invalid model_id: {0}".format(model_id))
+        cls = Scale if kind == "scale" else Quantize
+        return cls.load(model_id, model_dir=os.path.join(self.model_dir, model_id, kind))
+
+    async def get_batcher(self, model_id: str, kind: str) -> _Batcher:
+        """
+        Batcher of a transformer, loading the transformer once on first use.
+        """
+        key = (model_id, kind)
+        if key in self._batchers:
+            return self._batchers[key]
+        if key not in self._loading:
+            loop = asyncio.get_running_loop()
+            self._loading[key] = loop.run_in_executor(None, self._load, model_id, kind)
+        try:
+            transformer = await self._loading[key]
+        finally:
+            self._loading.pop(key, None)
+        if key not in self._batchers:
+            self._batchers[key] = _Batcher(transformer, self.max_batch_rows, self.max_delay, self.stats)
+        return self._batchers[key]
+
+    async def transform(self, model_id: str, kind: str, columns: list, rows: list) -> dict:
+        batcher = await self.get_batcher(model_id, kind)
+        values = await batcher.submit(columns, rows)
+        return {"columns": batcher.columns, "data": values.tolist()}
+
+    async def _handle_request(self, method: str, path: str, body: bytes):
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if method == "GET" and parts == ["health"]:
+            return 200, {"status": "ok"}
+        if method == "GET" and parts == ["metrics"]:
+            return 200, self.stats.to_dict()
+        if method != "POST" or len(parts) != 3 or parts[0] != "transform":
+            return 404, {"error": "Not found"}
+        model_id, kind = parts[1], parts[2]
+        # the model_id becomes a path under model_dir: only accept valid identifiers
+        if not is_model_id_valid(model_id):
+            return 404, {"error": "Invalid model_id: {0}".format(model_id)}
+        if kind not in TRANSFORMER_KINDS:
+            return 404, {"error": "Unknown transformer {0}. Use one of {1}".format(kind, TRANSFORMER_KINDS)}
+        t0 = time.perf_counter()
+        rows = []
+        try:
+            payload = json.loads(body or b"{}")
+            columns, rows = payload["columns"], payload["data"]
+            result = await self.transform(model_id, kind, columns, rows)
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            self.stats.record_request(len(rows), 0.0, ok=False)
+            return 400, {"error": "{0}: {1}".format(type(e).__name__, e)}
+        except Exception as e:
+            self.stats.record_request(len(rows), 0.0, ok=False)
+            return 500, {"error": "{0}: {1}".format(type(e).__name__, e)}
+        self.stats.record_request(len(rows), (time.perf_counter() - t0) * 1000.0)
+        return 200, result
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._handle_request(method.upper(), path, body)
+                data = json.dumps(payload).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+                writer.write(
+                    "HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\nConnection: {3}\r\n\r\n".format(
+                        status, reason, len(data), "keep-alive" if keep_alive else "close"
+                    ).encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000):
+        """
+        Serve forever on host:port.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print("Serving transformers from {0} on http://{1}:{2}".format(self.model_dir, host, port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for batcher in self._batchers.values():
+                batcher.close()
+
+
+def serve(model_dir: str, host: str = "127.0.0.1", port: int = 8000, max_batch_rows: int = 4096, max_delay_ms: float = 5.0) -> None:
+    """
+    Run a micro-batching transform server until interrupted.
+
+    Parameters
+    ----------
+    model_dir: str
+        Directory with fitted artifacts in the <model_id>/<scale|quantize> layout
+    host: str
+        Interface to listen on (default 127.0.0.1)
+    port: int
+        Port to listen on (default 8000)
+    max_batch_rows: int
+        Maximum number of rows merged into one transform call
+    max_delay_ms: float
+        Maximum time a request waits for other requests to join its batch
+
+    Returns
+    -------
+    None
+    """
+    server = TransformServer(model_dir, max_batch_rows=max_batch_rows, max_delay_ms=max_delay_ms)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,215 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+from ..frame.frame import as_pandas
+from ..utils.utils import is_model_id_valid
+from ..utils.instrument import span
+from ..write.write import _encode_strings
+
+# target size of the HDF5 chunks of every model, so that reading a few columns does not read the whole model
+_CHUNK_BYTES = 1024 ** 2
+
+
+def _input_hash(inputs: pd.Series) -> str:
+    """
+    Fingerprint of the input column, used to check that every model of the store has the same rows.
+    """
+    hashes = pd.util.hash_pandas_object(inputs.astype(str).reset_index(drop=True), index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def _split_column(column: str) -> tuple:
+    """
+    Split a feature.model_id column name, as produced by hstack, into (feature, model_id).
+    """
+    if "." not in column:
+        raise Exception("Column {0} must be named feature.model_id".format(column))
+    feature, model_id = column.rsplit(".", 1)
+    return feature, model_id
+
+
+class ModelStore:
+    """
+    Outputs of many models for the same inputs in one HDF5 file, as a virtual hstack.
+
+    The key and input columns are stored once, and every model has its own group with its features and values,
+    so adding a model writes one group instead of rewriting a combined table. Columns are named feature.model_id,
+    as in hstack, and reading a selection of columns only touches the models and columns it contains.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def add(self, df: pd.DataFrame, dtype: any = np.float32, overwrite: bool = False) -> None:
+        """
+        Add the output of a model to the store. The first model added sets the key and input columns of the store.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            Ersilia output with a model_id attribute, or an ErsiliaFrame
+        dtype: data type
+            Data type for the feature values (default float32)
+        overwrite: bool
+            Replace the model if it is already in the store
+
+        Returns
+        -------
+        None
+        """
+        df = as_pandas(df)
+        model_id = getattr(df, "model_id", None)
+        if model_id is None:
+            raise Exception("DataFrame does not have a model_id attribute")
+        if not is_model_id_valid(model_id):
+            raise Exception("Invalid model_id: {0}".format(model_id))
+        if "input" not in df.columns:
+            raise Exception("DataFrame does not contain a column named 'input'")
+        import h5py
+
+        input_hash = _input_hash(df["input"])
+        with span("ModelStore.add", rows=len(df), model_id=model_id), h5py.File(self.path, "a") as f:
+            if "input" not in f.keys():
+                if "key" in df.columns:
+                    keys, dt = _encode_strings(df["key"], "variable")
+                    f.create_dataset("key", data=keys, dtype=dt)
+                inputs, dt = _encode_strings(df["input"], "variable")
+                f.create_dataset("input", data=inputs, dtype=dt)
+                f.attrs["layout"] = "model_store"
+                f.attrs["input_hash"] = input_hash
+            elif f.attrs["input_hash"] != input_hash:
+                raise Exception("Input columns do not match!")
+            models = f.require_group("models")
+            if model_id in models.keys():
+                if not overwrite:
+                    raise Exception("Model {0} is already in the store. Use overwrite=True to replace it".format(model_id))
+                del models[model_id]
+            features = [c for c in df.columns if c not in {"key", "input"}]
+            group = models.create_group(model_id)
+            group.create_dataset("features", data=features, dtype=h5py.string_dtype(encoding="utf-8"))
+            values = df[features].to_numpy(dtype=dtype)
+            chunks = None
+            if values.size:
+                n_cols = min(values.shape[1], 64)
+                n_rows = max(1, min(values.shape[0], _CHUNK_BYTES // (n_cols * values.itemsize)))
+                chunks = (n_rows, n_cols)
+            group.create_dataset("values", data=values, dtype=dtype, chunks=chunks)
+            # groups are listed alphabetically: keep the order in which the models were added
+            order = self._model_order(f)
+            if model_id not in order:
+                order += [model_id]
+            models.attrs["order"] = np.array(order, dtype=h5py.string_dtype(encoding="utf-8"))
+
+    @property
+    def models(self) -> list:
+        """
+        Identifiers of the models in the store, in the order they were added.
+        """
+        if not os.path.exists(self.path):
+            return []
+        import h5py
+
+        with h5py.File(self.path, "r") as f:
+            return self._model_order(f)
+
+    @property
+    def columns(self) -> list:
+        """
+        Combined column names, as in hstack: key (if present), input and feature.model_id for every model.
+        """
+        import h5py
+
+        with h5py.File(self.path, "r") as f:
+            columns = ["key", "input"] if "key" in f.keys() else ["input"]
+            for model_id in self._model_order(f):
+                columns += [c + "." + model_id for c in f["models"][model_id]["features"].asstr()[:]]
+        return columns
+
+    def __len__(self) -> int:
+        import h5py
+
+        with h5py.File(self.path, "r") as f:
+            return f["input"].shape[0] if "input" in f.keys() else 0
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self.models
+
+    def __getitem__(self, columns) -> pd.DataFrame:
+        if isinstance(columns, str):
+            columns = [columns]
+        return self.read(columns=list(columns))
+
+    def read(self, columns: list = None, models: list = None, rows: slice = None) -> pd.DataFrame:
+        """
+        Read a combined DataFrame, equivalent to hstack of the selected models, reading only what is selected.
+
+        Parameters
+        ----------
+        columns: list
+            feature.model_id columns to read. key and input are always returned
+        models: list
+            Models whose columns are all read. If neither columns nor models are given, all models are read
+        rows: slice
+            Optional range of rows to read
+
+        Returns
+        -------
+        df: pd.DataFrame
+            DataFrame with key (if present), input and the selected columns, in the requested order
+        """
+        import h5py
+
+        rows = rows if rows is not None else slice(None)
+        with span("ModelStore.read") as s, h5py.File(self.path, "r") as f:
+            if "input" not in f.keys():
+                raise Exception("The store {0} is empty".format(self.path))
+            available = self._model_order(f)
+            # model_id -> requested features, in order of appearance
+            selection = {}
+            if columns is None and models is None:
+                models = available
+            for model_id in models or []:
+                if model_id not in available:
+                    raise Exception("Model {0} is not in the store".format(model_id))
+                selection[model_id] = None
+            for column in columns or []:
+                feature, model_id = _split_column(column)
+                if model_id not in available:
+                    raise Exception("Model {0} is not in the store".format(model_id))
+                if selection.get(model_id, []) is not None:
+                    selection.setdefault(model_id, []).append(feature)
+            df = pd.DataFrame({"input": f["input"].asstr()[rows]})
+            if "key" in f.keys():
+                df.insert(0, "key", f["key"].asstr()[rows])
+            frames = [df]
+            for model_id, features in selection.items():
+                group = f["models"][model_id]
+                names = group["features"].asstr()[:].tolist()
+                if features is None:
+                    values = group["values"][rows]
+                    features = names
+                else:
+                    position = {c: i for i, c in enumerate(names)}
+                    missing = [c for c in features if c not in position]
+                    if missing:
+                        raise Exception("Model {0} does not have the features {1}".format(model_id, missing))
+                    # h5py reads increasing column selections; restore the requested order afterwards
+                    idx = np.array([position[c] for c in features])
+                    unique_idx, inverse = np.unique(idx, return_inverse=True)
+                    values = group["values"][rows, unique_idx.tolist()][:, inverse.reshape(-1)]
+                frames += [pd.DataFrame(values, columns=[c + "." + model_id for c in features])]
+            df = pd.concat(frames, axis=1)
+            if columns is not None and models is None:
+                ordered = [c for c in ("key", "input") if c in df.columns]
+                df = df[ordered + list(dict.fromkeys(columns))]
+            s.rows = len(df)
+        return df
+
+    @staticmethod
+    def _model_order(f) -> list:
+        if "models" not in f.keys():
+            return []
+        order = [m.decode("utf-8") if isinstance(m, bytes) else str(m) for m in f["models"].attrs.get("order", [])]
+        return [m for m in order if m in f["models"].keys()]
@@ -4,6 +4,7 @@ from sklearn.pipeline import Pipeline
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import FunctionTransformer, QuantileTransformer
+from eosframes.transformers.build_typed_transformer import n_quantiles
 
 # -------- helpers (pickle-safe, no lambdas) --------
 def _unit_to_int255(x: np.ndarray) -> np.ndarray:
@@ -68,7 +69,7 @@ def _quantile_uniform_then_int(n_rows: int) -> Pipeline:
     """
     Equal-frequency transform to uniform [0,1], then map to [-127,127].
     """
-    n_q = int(min(1000, max(10, n_rows // 3)))  # stable default
+    n_q = n_quantiles(n_rows)  # stable default
     return Pipeline([
         ("qt", QuantileTransformer(
             output_distribution="uniform",
@@ -108,11 +109,9 @@ def build_quantizer(df: pd.DataFrame):
     # bounded_cols = [c for c in numeric_cols
     #                 if df[c].min() >= 0 and df[c].max() <= 1 and c not in bin_cols]
 
-    # The rest of continuous numerics (floats etc.)
-    continuous_cols = list(
-        set(numeric_cols)
-         - set(bin_cols)
-         - set(small_int_cols))
+    # The rest of continuous numerics (floats etc.), kept in input order
+    continuous_cols = [c for c in numeric_cols
+                       if c not in set(bin_cols) | set(small_int_cols)]
         #  - set(count_cols) - set(bounded_cols))
 
     
@@ -13,6 +13,22 @@ def identity(x):
 
 # -------------------------------------------------------------------------
 
+ROBUST_QUANTILE_RANGE = (25.0, 75.0)
+
+
+def n_quantiles(n_rows: int) -> int:
+    return int(min(1000, max(10, n_rows // 3)))
+
+
+def quantile_levels(n_rows: int) -> list:
+    """
+    Quantile levels used to fit the typed transformers on n_rows rows (see quantile_kernel):
+    minimum, maximum, median, the RobustScaler range and the QuantileTransformer references.
+    """
+    references = np.linspace(0, 1, n_quantiles(n_rows), endpoint=True) * 100 / 100
+    return [0.0, ROBUST_QUANTILE_RANGE[0] / 100, 0.5, ROBUST_QUANTILE_RANGE[1] / 100, 1.0] + references.tolist()
+
+
 def build_typed_transformer(df: pd.DataFrame):
 
     # Replace constant columns with 0
@@ -42,13 +58,9 @@ def build_typed_transformer(df: pd.DataFrame):
         if df[c].min() >= 0 and df[c].max() <= 1 and c not in bin_cols
     ]
 
-    # Continuous numerics
-    continuous_cols = list(
-        set(numeric_cols)
-        - set(bin_cols)
-        - set(count_cols)
-        - set(bounded_cols)
-    )
+    # Continuous numerics (kept in input order so that fitted artifacts are reproducible)
+    grouped = set(bin_cols) | set(count_cols) | set(bounded_cols)
+    continuous_cols = [c for c in numeric_cols if c not in grouped]
 
     # Transformers
    
@@ -57,13 +69,14 @@ def build_typed_transformer(df: pd.DataFrame):
     ])
     
     robust_scaler = Pipeline([
-    ("rs", RobustScaler(with_centering=True, with_scaling=True, quantile_range=(25.0, 75.0)))
+    ("rs", RobustScaler(with_centering=True, with_scaling=True, quantile_range=ROBUST_QUANTILE_RANGE))
     ])
 
     quantile_normal = Pipeline([
         ("qt", QuantileTransformer(
             output_distribution="normal",
-            n_quantiles=min(1000, max(10, len(df) // 3))
+            n_quantiles=n_quantiles(len(df)),
+            random_state=0
         ))
     ])
 
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+# Transform results are cached row by row in a local sqlite database.
+# namespace = model_id / transformer class / artifact version / row identity ("key" or "input")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (namespace TEXT PRIMARY KEY, dtype TEXT, n_cols INTEGER);
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT, row_id, value BLOB, size INTEGER, last_used REAL,
+    PRIMARY KEY (namespace, row_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+# granularity of the least recently used eviction
+_TOUCH_SECONDS = 24 * 3600
+
+
+def _artifact_version(transformer) -> str:
+    """
+    Version of a fitted transformer: its fit timestamp and trained columns.
+    Refitting the transformer changes the version, so stale results are never returned.
+    """
+    fit_timestamp = getattr(transformer, "fit_timestamp", None)
+    if fit_timestamp is None:
+        raise ValueError("❌ The transformer has no fit_timestamp, its results cannot be cached.")
+    fingerprint = json.dumps([fit_timestamp.isoformat(), list(transformer.feature_cols)])
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def _row_ids(df: pd.DataFrame, on: str) -> list:
+    """
+    Identity of every row: the key, or a 64-bit hash of the input string.
+    """
+    if on not in df.columns:
+        raise ValueError(f"❌ Cannot cache transform results by '{on}': the column is not in the data.")
+    if on == "key":
+        return df["key"].astype(str).tolist()
+    hashes = pd.util.hash_pandas_object(df["input"].astype(str), index=False).to_numpy()
+    return hashes.view(np.int64).tolist()
+
+
+class TransformCache:
+    """
+    Persistent cache of Scale/Quantize transform results, keyed by (model_id, artifact version, row identity).
+
+    Transforming with a cache computes only the rows that are not cached yet and merges
+    them back in row order. When the database grows beyond max_bytes, the least recently
+    used results are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 ** 3, on: str = "key"):
+        """
+        Args:
+            path: sqlite database file. Created if it does not exist.
+            max_bytes: Maximum size of the cached results (default 1 GiB).
+            on: Row identity, "key" or "input" (a hash of the input string).
+        """
+        if on not in ("key", "input"):
+            raise ValueError("❌ on must be 'key' or 'input'.")
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.on = on
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (pos INTEGER PRIMARY KEY, row_id)")
+
+    def transform(self, transformer, df: pd.DataFrame, compute) -> pd.DataFrame:
+        """
+        Transform df with compute(df) for the rows missing from the cache, and the cache for the others.
+
+        Args:
+            transformer: Fitted Scale or Quantize transformer.
+            df: Data to transform.
+            compute: Function transforming a DataFrame, returning a DataFrame with transformer.feature_cols.
+
+        Returns:
+            pd.DataFrame: the transformed data, with the index of df.
+        """
+        namespace = "/".join([transformer.model_id, type(transformer).__name__, _artifact_version(transformer), self.on])
+        row_ids = _row_ids(df, self.on)
+        n_rows, n_cols = len(df), len(transformer.feature_cols)
+        with self._lock:
+            layout = self._conn.execute("SELECT dtype, n_cols FROM namespaces WHERE namespace = ?", (namespace,)).fetchone()
+            positions, blobs = self._get(namespace, row_ids) if layout is not None else ([], [])
+        hit = np.zeros(n_rows, dtype=bool)
+        hit[positions] = True
+        self.hits += len(positions)
+        self.misses += n_rows - len(positions)
+        if len(positions) == n_rows:
+            values = np.empty((n_rows, n_cols), dtype=np.dtype(layout[0]))
+            values[positions] = np.frombuffer(b"".join(blobs), dtype=values.dtype).reshape(len(positions), n_cols)
+            return pd.DataFrame(values, index=df.index, columns=transformer.feature_cols)
+        miss = np.flatnonzero(~hit)
+        computed = np.ascontiguousarray(compute(df.iloc[miss]).to_numpy())
+        values = np.empty((n_rows, n_cols), dtype=computed.dtype)
+        values[miss] = computed
+        if positions:
+            cached = np.frombuffer(b"".join(blobs), dtype=np.dtype(layout[0])).reshape(len(positions), n_cols)
+            values[positions] = cached
+        with self._lock:
+            self._put(namespace, [row_ids[i] for i in miss], computed)
+        return pd.DataFrame(values, index=df.index, columns=transformer.feature_cols)
+
+    def _get(self, namespace: str, row_ids: list) -> tuple:
+        """
+        Positions and cached rows of the requested row ids that are in the cache.
+        """
+        cur = self._conn.cursor()
+        cur.execute("DELETE FROM wanted")
+        cur.executemany("INSERT INTO wanted (pos, row_id) VALUES (?, ?)", enumerate(row_ids))
+        found = cur.execute(
+            "SELECT w.pos, e.value FROM wanted w JOIN entries e ON e.namespace = ? AND e.row_id = w.row_id",
+            (namespace,),
+        ).fetchall()
+        if found:
+            # recency is only refreshed once per _TOUCH_SECONDS, so that repeated hits do not write to the database
+            now = time.time()
+            cur.execute(
+                "UPDATE entries SET last_used = ? WHERE namespace = ? AND last_used < ? AND row_id IN (SELECT row_id FROM wanted)",
+                (now, namespace, now - _TOUCH_SECONDS),
+            )
+        self._conn.commit()
+        return [p for p, _ in found], [v for _, v in found]
+
+    def _put(self, namespace: str, row_ids: list, values: np.ndarray) -> None:
+        """
+        Store the rows of values under their row ids, then evict the least recently used results over max_bytes.
+        Rows are stored in the dtype of the first results of the namespace, which all its entries share.
+        """
+        cur = self._conn.cursor()
+        cur.execute(
+            "INSERT OR IGNORE INTO namespaces (namespace, dtype, n_cols) VALUES (?, ?, ?)",
+            (namespace, values.dtype.str, values.shape[1]),
+        )
+        dtype = cur.execute("SELECT dtype FROM namespaces WHERE namespace = ?", (namespace,)).fetchone()[0]
+        values = values.astype(np.dtype(dtype), copy=False)
+        row_size = values.shape[1] * values.itemsize
+        # a single batch larger than the whole cache would evict everything else
+        if row_size * len(row_ids) > self.max_bytes:
+            self._conn.commit()
+            return
+        now = time.time()
+        cur.executemany(
+            "INSERT OR REPLACE INTO entries (namespace, row_id, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+            ((namespace, row_id, row.tobytes(), row_size, now) for row_id, row in zip(row_ids, values)),
+        )
+        excess = cur.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        if excess > 0:
+            # oldest last_used such that everything used up to it frees enough space
+            threshold = cur.execute(
+                "SELECT last_used FROM (SELECT last_used, SUM(size) OVER (ORDER BY last_used) AS freed FROM entries WHERE last_used < ?) "
+                "WHERE freed >= ? ORDER BY last_used LIMIT 1",
+                (now, excess),
+            ).fetchone()
+            if threshold is None:
+                cur.execute("DELETE FROM entries WHERE last_used < ?", (now,))
+            else:
+                cur.execute("DELETE FROM entries WHERE last_used <= ?", threshold)
+        self._conn.commit()
+
+    def clear(self) -> None:
+        """
+        Remove every cached result.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM namespaces")
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from eosframes.frame.frame import _set_model_id
+
+# Bins of every column are the deciles of the fitted data
+DRIFT_BINS = 10
+DRIFT_LEVELS = np.linspace(0, 1, DRIFT_BINS + 1)
+
+# Every column has DRIFT_BINS bins plus three counters: below the fitted minimum, above the fitted maximum, missing
+_SLOTS = DRIFT_BINS + 3
+_BELOW, _ABOVE, _MISSING = 0, DRIFT_BINS + 1, DRIFT_BINS + 2
+
+# Transform counts one row in SAMPLE_EVERY, which keeps the cost of the counters within a few percent of the transform
+SAMPLE_EVERY = 64
+# Rows of the fitted data counted for the reference distribution
+REFERENCE_ROWS = 10000
+
+# smallest bin frequency in the population stability index, so that empty bins do not give infinite values
+_PSI_EPSILON = 1e-4
+
+DRIFT_FILE = "drift.npz"
+
+
+def _count(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    (p, _SLOTS) counts of the rows of values in the bins given by edges, (DRIFT_BINS + 1, p).
+    Slot 0 holds values below the first edge, slots 1 to DRIFT_BINS the values between edges
+    (a bin includes its upper edge), then values above the last edge and missing values.
+    """
+    n, p = values.shape
+    # one comparison per edge over the whole block, no loop over the columns, in the precision of the values
+    edges = edges.astype(values.dtype)
+    slots = (values >= edges[0]).astype(np.int8)
+    for edge in edges[1:]:
+        slots += values > edge
+    slots[np.isnan(values)] = _MISSING
+    slots = slots.astype(np.intp) + np.arange(p, dtype=np.intp) * _SLOTS
+    return np.bincount(slots.ravel(), minlength=p * _SLOTS).reshape(p, _SLOTS)
+
+
+def _values(X) -> np.ndarray:
+    values = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    return values
+
+
+class DriftMonitor:
+    """
+    Online counters of the distribution of the transformed data, compared to the fitted data.
+
+    For every column, the rows are counted in fixed-size arrays: one bin per decile of the fitted data,
+    values out of the fitted range and missing values. The counts of several monitors of the same
+    artifact (e.g. one per worker process) are merged by adding them.
+
+    Attributes:
+        model_id: Model of the fitted transformer.
+        columns: Feature columns of the fitted transformer.
+        edges: (DRIFT_BINS + 1, p) deciles of every column of the fitted data.
+        reference: (p, DRIFT_BINS + 3) counts of the fitted data.
+        counts: (p, DRIFT_BINS + 3) counts of the sampled transformed rows.
+        rows: Number of transformed rows.
+        sampled: Number of transformed rows that were counted (one in sample_every).
+    """
+
+    def __init__(self, model_id: str, columns: list, edges: np.ndarray, reference: np.ndarray, counts: np.ndarray = None, rows: int = 0, sampled: int = 0, sample_every: int = SAMPLE_EVERY):
+        if sample_every < 1:
+            raise ValueError("❌ sample_every must be at least 1.")
+        self.model_id = model_id
+        self.columns = list(columns)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.reference = np.asarray(reference, dtype=np.int64)
+        self.counts = np.zeros((len(self.columns), _SLOTS), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.rows = int(rows)
+        self.sampled = int(sampled)
+        self.sample_every = int(sample_every)
+        # position of the next counted row in the next batch, so that batches of any size are sampled evenly
+        self._offset = 0
+
+    @classmethod
+    def fit(cls, model_id: str, columns: list, X, edges: np.ndarray, sample_every: int = SAMPLE_EVERY) -> "DriftMonitor":
+        """
+        Monitor of a transformer fitted on X, with the deciles of its columns as bin edges (see quantile_kernel.ColumnQuantiles.at).
+
+        Args:
+            model_id: Model of the fitted transformer.
+            columns: Feature columns, one per column of X.
+            X: Fitted data (before imputation), DataFrame or 2D array.
+            edges: (DRIFT_BINS + 1, p) quantiles of the columns of X at DRIFT_LEVELS.
+            sample_every: Count one transformed row in sample_every.
+
+        Returns:
+            DriftMonitor with empty counts.
+        """
+        values = _values(X)
+        step = max(1, -(-len(values) // REFERENCE_ROWS))
+        return cls(model_id, columns, edges, _count(values[::step], np.asarray(edges, dtype=np.float64)), sample_every=sample_every)
+
+    def empty(self) -> "DriftMonitor":
+        """
+        Monitor of the same artifact with empty counts, e.g. for a worker process.
+        """
+        return DriftMonitor(self.model_id, self.columns, self.edges, self.reference, sample_every=self.sample_every)
+
+    def update(self, X) -> None:
+        """
+        Count a batch of rows with the feature columns, as a DataFrame or 2D array.
+        """
+        n, p = X.shape
+        if p != len(self.columns):
+            raise ValueError(f"❌ Expected {len(self.columns)} columns to monitor, got {p}.")
+        # only the sampled rows are copied (contiguous, which is much faster to compare than a strided view)
+        rows = slice(self._offset, None, self.sample_every)
+        sample = np.ascontiguousarray(_values(X.iloc[rows] if isinstance(X, pd.DataFrame) else np.asarray(X)[rows]))
+        if len(sample):
+            self.counts += _count(sample, self.edges)
+        self.rows += n
+        self.sampled += len(sample)
+        self._offset = (self._offset - n) % self.sample_every
+
+    def merge(self, other: "DriftMonitor") -> "DriftMonitor":
+        """
+        Monitor with the counts of self and other, which must monitor the same artifact.
+        """
+        if other.model_id != self.model_id or other.columns != self.columns or not np.array_equal(other.edges, self.edges, equal_nan=True):
+            raise ValueError("❌ Drift monitors of different artifacts cannot be merged.")
+        return DriftMonitor(
+            self.model_id, self.columns, self.edges, self.reference,
+            self.counts + other.counts, self.rows + other.rows, self.sampled + other.sampled, self.sample_every,
+        )
+
+    @property
+    def histogram(self) -> np.ndarray:
+        """
+        (p, DRIFT_BINS) counts of the sampled rows in the decile bins of the fitted data.
+        """
+        return self.counts[:, 1:DRIFT_BINS + 1]
+
+    def psi(self) -> np.ndarray:
+        """
+        Population stability index of every column between the fitted and the transformed data, over the
+        decile bins, the out of range values and the missing values. Around 0.1 or less means no relevant drift.
+        """
+        if self.sampled == 0:
+            return np.full(len(self.columns), np.nan)
+        expected = np.maximum(self.reference / np.maximum(self.reference.sum(axis=1, keepdims=True), 1), _PSI_EPSILON)
+        actual = np.maximum(self.counts / self.sampled, _PSI_EPSILON)
+        return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+    def report(self) -> pd.DataFrame:
+        """
+        Drift of every column: population stability index and fractions of missing and out of range values
+        of the transformed data. The DataFrame has the model_id of the artifact.
+        """
+        sampled = max(self.sampled, 1)
+        report = pd.DataFrame(
+            {
+                "psi": self.psi(),
+                "missing": self.counts[:, _MISSING] / sampled,
+                "below_range": self.counts[:, _BELOW] / sampled,
+                "above_range": self.counts[:, _ABOVE] / sampled,
+            },
+            index=pd.Index(self.columns, name="column"),
+        )
+        _set_model_id(report, self.model_id)
+        return report
+
+    def as_dict(self) -> dict:
+        """
+        Summary of the counters, for logs and metrics.
+        """
+        psi = self.psi()
+        return {
+            "model_id": self.model_id,
+            "rows": self.rows,
+            "sampled": self.sampled,
+            "max_psi": float(np.nanmax(psi)) if self.sampled else None,
+            "missing": int(self.counts[:, _MISSING].sum()),
+            "out_of_range": int(self.counts[:, _BELOW].sum() + self.counts[:, _ABOVE].sum()),
+        }
+
+    def __repr__(self) -> str:
+        return "DriftMonitor(model_id={0}, columns={1}, rows={2}, sampled={3})".format(self.model_id, len(self.columns), self.rows, self.sampled)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            model_id=np.array(self.model_id, dtype=str),
+            columns=np.array(self.columns, dtype=str),
+            edges=self.edges,
+            reference=self.reference,
+            counts=self.counts,
+            rows=self.rows,
+            sampled=self.sampled,
+            sample_every=self.sample_every,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DriftMonitor":
+        with np.load(path) as data:
+            return cls(
+                str(data["model_id"]), data["columns"].tolist(), data["edges"], data["reference"],
+                data["counts"], int(data["rows"]), int(data["sampled"]), int(data["sample_every"]),
+            )
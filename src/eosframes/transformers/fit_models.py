@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import multiprocessing
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from eosframes.read.read import read_any
+from eosframes.utils.utils import is_model_id_valid
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def _limit_memory(memory_limit: int):
+    """
+    Worker initializer: cap the address space of the worker process (in bytes).
+    """
+    if resource is None or not memory_limit:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _peak_memory_mb() -> float:
+    """
+    Peak resident memory of the current process in megabytes.
+    """
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1024 ** 2  # bytes on macOS
+    return peak / 1024  # kilobytes on Linux
+
+
+def _empty_report(model_id: str, source: str) -> dict:
+    return {
+        "model_id": model_id,
+        "source": source,
+        "status": "ok",
+        "num_rows": None,
+        "read_seconds": None,
+        "scale_seconds": None,
+        "quantize_seconds": None,
+        "peak_memory_mb": None,
+        "error": None,
+    }
+
+
+def _fit_one(task: tuple) -> dict:
+    """
+    Fit Scale (and optionally Quantize) for a single model and save the artifacts locally.
+    Runs inside a worker process, so every failure is reported instead of raised.
+    """
+    from eosframes.transformers.scale import Scale
+    from eosframes.transformers.quantize import Quantize
+
+    model_id, source, output_dir, quantize = task
+    report = _empty_report(model_id, source)
+    try:
+        t0 = time.perf_counter()
+        df = read_any(source)
+        report["num_rows"] = len(df)
+        report["read_seconds"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        scaler = Scale(model_id=model_id)
+        scaler.fit(df)
+        scaler.save(dir_name=os.path.join(output_dir, model_id, "scale"), local=True, upload=False)
+        report["scale_seconds"] = time.perf_counter() - t0
+
+        if quantize:
+            t0 = time.perf_counter()
+            quantizer = Quantize(model_id=model_id)
+            quantizer.fit(df)
+            quantizer.save(model_dir=os.path.join(output_dir, model_id, "quantize"), upload=False)
+            report["quantize_seconds"] = time.perf_counter() - t0
+    except MemoryError:
+        report["status"] = "failed"
+        report["error"] = "MemoryError: worker memory limit exceeded"
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = "{0}: {1}".format(type(e).__name__, e)
+    report["peak_memory_mb"] = _peak_memory_mb()
+    return report
+
+
+def fit_models(
+    sources: dict,
+    output_dir: str,
+    n_workers: int = None,
+    memory_limit: int = None,
+    quantize: bool = True,
+    progress=None,
+) -> pd.DataFrame:
+    """
+    Fit Scale and Quantize transformers for many models in parallel processes.
+
+    Each model is fitted in a fresh worker process, so the reported peak memory belongs to that model only.
+    A worker that dies (e.g. aborted by the allocator under the memory limit) fails its model only.
+    Artifacts are written to output_dir/<model_id>/scale and output_dir/<model_id>/quantize.
+
+    Parameters
+    ----------
+    sources: dict
+        Mapping of model_id to data source (CSV file, HDF5 file or directory of chunked CSV files)
+    output_dir: str
+        Directory where the fitted artifacts are saved
+    n_workers: int
+        Number of worker processes (default: number of CPUs)
+    memory_limit: int
+        Maximum memory per worker in bytes. Models exceeding it are reported as failed (default: no limit)
+    quantize: bool
+        Also fit a Quantize transformer for each model (default True)
+    progress: callable
+        Called with the report (dict) of every model when it finishes
+
+    Returns
+    -------
+    report: pd.DataFrame
+        One row per model with status, fit time (seconds) and peak memory (MB)
+    """
+    for model_id in sources.keys():
+        if not is_model_id_valid(model_id):
+            raise Exception("Invalid model_id: {0}".format(model_id))
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(model_id, source, output_dir, quantize) for model_id, source in sources.items()]
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(tasks)))
+    ctx = multiprocessing.get_context("spawn")
+    reports = []
+    # one single-use executor per model: a fresh process every time, and a worker that dies hard
+    # breaks its own executor (BrokenProcessPool) instead of hanging or failing the other models
+    running = {}
+    pending = list(tasks)
+    while pending or running:
+        while pending and len(running) < n_workers:
+            task = pending.pop(0)
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_limit_memory, initargs=(memory_limit,))
+            running[executor.submit(_fit_one, task)] = (task, executor)
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            task, executor = running.pop(future)
+            try:
+                report = future.result()
+            except BrokenProcessPool:
+                report = _empty_report(task[0], task[1])
+                report["status"] = "failed"
+                report["error"] = "BrokenProcessPool: the worker process died (e.g. memory limit exceeded)"
+            except Exception as e:
+                # e.g. the worker could not import its dependencies under the memory limit
+                report = _empty_report(task[0], task[1])
+                report["status"] = "failed"
+                report["error"] = "{0}: {1}".format(type(e).__name__, e)
+            executor.shutdown()
+            if progress is not None:
+                progress(report)
+            reports += [report]
+    order = {model_id: i for i, model_id in enumerate(sources.keys())}
+    reports = sorted(reports, key=lambda r: order[r["model_id"]])
+    return pd.DataFrame(reports)
@@ -0,0 +1,164 @@
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, QuantileTransformer, RobustScaler
+
+# Quantiles kept for every column. Enough to rebuild the 1000 quantiles of a QuantileTransformer.
+QUANTILE_LEVELS = np.linspace(0, 1, 1001)
+
+FIT_STATS_FILE = "fit_stats.npz"
+
+
+class FitStatistics:
+    """
+    Compact, mergeable fit statistics of a set of columns: quantile summaries of the non-missing values
+    (which include the minimum, maximum and median), number of rows and number of missing values per column.
+
+    Two summaries are merged by mixing their empirical distributions, weighted by their number of non-missing
+    values, so the statistics of the full history can be updated without reading the old rows again.
+    Missing values are only counted: the scalers see them imputed with the median of all the merged rows (see quantile).
+    """
+
+    def __init__(self, columns: list, quantiles: np.ndarray, n_rows: int, missing: np.ndarray):
+        self.columns = list(columns)
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.n_rows = int(n_rows)
+        self.missing = np.asarray(missing, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, columns: list, values: np.ndarray) -> "FitStatistics":
+        """
+        Summarize a 2D array of values, possibly with missing values (NaN).
+
+        Args:
+            columns: Name of every column of values.
+            values: 2D array, one column per name.
+
+        Returns:
+            FitStatistics
+        """
+        from eosframes.transformers.quantile_kernel import column_quantiles
+
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            raise ValueError("❌ Cannot summarize an empty batch.")
+        quantiles = column_quantiles(values, QUANTILE_LEVELS)
+        return cls(columns, quantiles.quantiles, len(values), quantiles.n_missing)
+
+    @property
+    def observed(self) -> np.ndarray:
+        """
+        Number of non-missing values of every column.
+        """
+        return self.n_rows - self.missing
+
+    def merge(self, other: "FitStatistics") -> "FitStatistics":
+        """
+        Statistics of the union of the rows summarized by self and other, which must have the same columns.
+        """
+        if other.columns != self.columns:
+            raise ValueError("❌ Fit statistics of different columns cannot be merged.")
+        quantiles = np.empty_like(self.quantiles)
+        for j in range(len(self.columns)):
+            a, b = self.quantiles[:, j], other.quantiles[:, j]
+            n_a, n_b = self.observed[j], other.observed[j]
+            # a summary without values (all missing) does not change the distribution of the other
+            if n_b == 0 or n_a == 0:
+                quantiles[:, j] = a if n_b == 0 else b
+                continue
+            w = n_a / (n_a + n_b)
+            # mixture CDF evaluated on the quantiles of both summaries, then inverted at the summary levels
+            x = np.sort(np.concatenate([a, b]))
+            cdf = w * _cdf(a, x) + (1 - w) * _cdf(b, x)
+            quantiles[:, j] = np.interp(QUANTILE_LEVELS, cdf, x)
+        return FitStatistics(self.columns, quantiles, self.n_rows + other.n_rows, self.missing + other.missing)
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        Approximate quantile(s) q in [0, 1] of every column after imputing the missing values with the median,
+        which is what the scalers are fitted on. Returns shape (p,) for a scalar q, (len(q), p) otherwise.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        out = np.empty((q.size, len(self.columns)))
+        levels = q.reshape(-1)
+        for j in range(len(self.columns)):
+            observed = self.observed[j] / max(self.n_rows, 1)
+            if observed == 0:
+                out[:, j] = np.nan
+                continue
+            # the imputed values are a point mass at the median, between the lower and upper halves of the observed values
+            median = np.interp(0.5, QUANTILE_LEVELS, self.quantiles[:, j])
+            low, high = observed / 2, 1 - observed / 2
+            below = np.interp(levels / observed, QUANTILE_LEVELS, self.quantiles[:, j])
+            above = np.interp((levels - (1 - observed)) / observed, QUANTILE_LEVELS, self.quantiles[:, j])
+            out[:, j] = np.where(levels < low, below, np.where(levels > high, above, median))
+        return out[0] if q.ndim == 0 else out
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            columns=np.array(self.columns, dtype=str),
+            quantiles=self.quantiles.astype(np.float32),
+            n_rows=self.n_rows,
+            missing=self.missing,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FitStatistics":
+        with np.load(path) as data:
+            return cls(data["columns"].tolist(), data["quantiles"], int(data["n_rows"]), data["missing"])
+
+
+def _cdf(quantiles: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Piecewise linear CDF through (quantiles, QUANTILE_LEVELS), evaluated at x. Ties take the highest level.
+    """
+    upper = np.searchsorted(quantiles, x, side="right")
+    lower = np.maximum(upper - 1, 0)
+    upper = np.minimum(upper, len(quantiles) - 1)
+    q0, q1 = quantiles[lower], quantiles[upper]
+    l0, l1 = QUANTILE_LEVELS[lower], QUANTILE_LEVELS[upper]
+    span = q1 - q0
+    t = np.divide(x - q0, span, out=np.zeros_like(x), where=span > 0)
+    cdf = l0 + np.clip(t, 0, 1) * (l1 - l0)
+    cdf[x < quantiles[0]] = 0.0
+    cdf[x >= quantiles[-1]] = 1.0
+    return cdf
+
+
+def _nonzero_scale(scale: np.ndarray) -> np.ndarray:
+    # as sklearn does for constant features
+    return np.where(scale == 0, 1.0, scale)
+
+
+def apply_statistics(ct: ColumnTransformer, stats: FitStatistics) -> None:
+    """
+    Set the fitted parameters of the scalers of a typed transformer (see build_typed_transformer)
+    from fit statistics, as if they had been fitted on the summarized rows.
+    """
+    positions = {c: j for j, c in enumerate(stats.columns)}
+    for _, est, cols in ct.transformers_:
+        if isinstance(est, str) or len(cols) == 0:
+            continue
+        est = est.steps[-1][1] if isinstance(est, Pipeline) else est
+        idx = [positions[c] for c in cols]
+        if isinstance(est, RobustScaler):
+            low, high = est.quantile_range
+            q = stats.quantile([low / 100, 0.5, high / 100])[:, idx]
+            if est.with_centering:
+                est.center_ = q[1]
+            if est.with_scaling:
+                est.scale_ = _nonzero_scale(q[2] - q[0])
+        elif isinstance(est, MinMaxScaler):
+            low, high = est.feature_range
+            q = stats.quantile([0.0, 1.0])[:, idx]
+            est.data_min_, est.data_max_ = q[0], q[1]
+            est.data_range_ = q[1] - q[0]
+            est.scale_ = (high - low) / _nonzero_scale(est.data_range_)
+            est.min_ = low - est.data_min_ * est.scale_
+            est.n_samples_seen_ = stats.n_rows
+        elif isinstance(est, QuantileTransformer):
+            n_quantiles = min(1000, max(10, stats.n_rows // 3))
+            est.n_quantiles = est.n_quantiles_ = n_quantiles
+            est.references_ = np.linspace(0, 1, n_quantiles, endpoint=True)
+            est.quantiles_ = np.maximum.accumulate(stats.quantile(est.references_)[:, idx], axis=0)
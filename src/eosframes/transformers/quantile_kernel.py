@@ -0,0 +1,206 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, QuantileTransformer, RobustScaler
+
+# -------- batched quantile kernel --------
+# Fitting the typed transformers needs several order statistics of every column: medians for the
+# imputer, percentiles for RobustScaler, minimum and maximum for MinMaxScaler, reference quantiles
+# for QuantileTransformer. Each stage used to sort every column again. The kernel sorts every
+# block of columns once (numpy releases the GIL, so blocks are sorted in parallel threads) and
+# reads all the requested quantiles from the sorted block, with the same linear interpolation
+# as np.nanpercentile.
+
+_BLOCK_COLUMNS = 64
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # same formula as numpy's quantile interpolation, so results match np.nanpercentile
+    diff = b - a
+    out = a + diff * t
+    return np.where(t >= 0.5, b - diff * (1 - t), out)
+
+
+def _take_sorted(block: np.ndarray, n_valid: np.ndarray, levels: np.ndarray, value_at) -> np.ndarray:
+    """
+    Linear-interpolated quantiles at levels of every column, given the number of values of every column
+    and a function returning the i-th smallest value of every column for an array of positions.
+    """
+    virtual = (n_valid[None, :] - 1) * levels[:, None]
+    previous = np.floor(virtual)
+    nxt = np.minimum(previous + 1, n_valid[None, :] - 1)
+    gamma = virtual - previous
+    return _lerp(value_at(previous.astype(np.int64)), value_at(nxt.astype(np.int64)), gamma)
+
+
+class ColumnQuantiles:
+    """
+    Order statistics of every column of a matrix, computed with a single sort per column.
+
+    Attributes:
+        columns: Column names, if X was a DataFrame.
+        levels: Quantile levels in [0, 1].
+        n_missing: Number of NaN values in every column.
+        median: Median of the non-missing values of every column (as np.nanmedian).
+        quantiles: (len(levels), p) quantiles of the non-missing values (as np.nanquantile).
+        imputed: (len(levels), p) quantiles of the columns after replacing NaN with the median,
+            or None if not requested.
+    """
+
+    def __init__(self, levels, n_missing, median, quantiles, imputed, columns=None):
+        self.columns = columns
+        self.levels = levels
+        self.n_missing = n_missing
+        self.median = median
+        self.quantiles = quantiles
+        self.imputed = imputed
+
+    def at(self, levels, columns=None, imputed: bool = False) -> np.ndarray:
+        """
+        Quantiles at the given levels (which must have been computed) for a subset of the column positions.
+        """
+        table = self.imputed if imputed else self.quantiles
+        rows = np.searchsorted(self.levels, np.atleast_1d(levels))
+        if np.any(rows >= len(self.levels)) or np.any(self.levels[np.minimum(rows, len(self.levels) - 1)] != levels):
+            raise ValueError("❌ Some quantile levels were not computed by column_quantiles.")
+        out = table[rows]
+        return out if columns is None else out[:, columns]
+
+
+def column_quantiles(X: np.ndarray, levels, impute_median: bool = False, n_jobs: int = None) -> ColumnQuantiles:
+    """
+    Compute quantiles of every column of X in one sort per column, parallelized over blocks of columns.
+
+    Args:
+        X: 2D numeric array or DataFrame (n_rows, n_columns), possibly with NaN.
+        levels: Quantile levels in [0, 1].
+        impute_median: Also compute the quantiles of the columns with NaN replaced by their median,
+            which is what the scalers see after median imputation.
+        n_jobs: Threads (None = number of CPUs).
+
+    Returns:
+        ColumnQuantiles
+    """
+    columns = list(X.columns) if isinstance(X, pd.DataFrame) else None
+    X = np.asarray(X)
+    if X.dtype.kind not in "f":
+        X = X.astype(np.float64)
+    n, p = X.shape
+    levels = np.unique(np.asarray(levels, dtype=np.float64))
+    n_missing = np.zeros(p, dtype=np.int64)
+    median = np.full(p, np.nan)
+    quantiles = np.full((len(levels), p), np.nan)
+    imputed = np.full((len(levels), p), np.nan) if impute_median else None
+
+    def work(start: int):
+        stop = min(start + _BLOCK_COLUMNS, p)
+        block = np.sort(X[:, start:stop], axis=0)  # NaN sort last
+        n_valid = n - np.isnan(block).sum(axis=0)
+        n_missing[start:stop] = n - n_valid
+        cols = np.arange(stop - start)
+        has_values = n_valid > 0
+        safe_valid = np.maximum(n_valid, 1)
+
+        def raw_at(i):
+            return block[np.minimum(i, safe_valid - 1), cols]
+
+        lo, hi = (safe_valid - 1) // 2, safe_valid // 2
+        med = (block[lo, cols] + block[hi, cols]) / 2
+        median[start:stop] = np.where(has_values, med, np.nan)
+        q = _take_sorted(block, safe_valid, levels, raw_at)
+        quantiles[:, start:stop] = np.where(has_values, q, np.nan)
+        if impute_median:
+            # the imputed column is the sorted values with the missing ones inserted as copies of the median
+            k = n - n_valid
+            insert = np.array([np.searchsorted(block[:v, j], med[j]) for j, v in enumerate(n_valid)], dtype=np.int64)
+
+            def imputed_at(i):
+                from_values = np.where(i < insert, i, i - k)
+                values = block[np.clip(from_values, 0, safe_valid - 1), cols]
+                return np.where((i >= insert) & (i < insert + k), med, values)
+
+            q = _take_sorted(block, np.full(stop - start, n), levels, imputed_at)
+            imputed[:, start:stop] = np.where(has_values, q, np.nan)
+
+    n_threads = min(n_jobs or os.cpu_count() or 1, max(1, (p + _BLOCK_COLUMNS - 1) // _BLOCK_COLUMNS))
+    starts = range(0, p, _BLOCK_COLUMNS)
+    if n_threads > 1:
+        with ThreadPoolExecutor(n_threads) as pool:
+            list(pool.map(work, starts))
+    else:
+        for start in starts:
+            work(start)
+    return ColumnQuantiles(levels, n_missing, median, quantiles, imputed, columns)
+
+
+def fit_column_transformer(ct, X: pd.DataFrame, quantiles: ColumnQuantiles, imputed: bool = False):
+    """
+    Fit a typed ColumnTransformer (see build_typed_transformer and build_quantizer) without sorting the data again.
+
+    The transformer is fitted on a few rows to set up its structure, then the parameters of its
+    RobustScaler, MinMaxScaler and QuantileTransformer stages are set from the precomputed quantiles
+    of X. Other stages are fitted on their columns. Only the first step of every pipeline learns from
+    the data; the next steps must be stateless.
+
+    Args:
+        ct: Unfitted ColumnTransformer.
+        X: Data to fit on.
+        quantiles: column_quantiles of the columns of X that the scalers use, with the levels they need
+            (see build_typed_transformer.quantile_levels).
+        imputed: Use the quantiles of the median-imputed columns (X then holds the imputed values).
+
+    Returns:
+        The fitted ColumnTransformer.
+    """
+    positions = {c: j for j, c in enumerate(quantiles.columns if quantiles.columns is not None else X.columns)}
+    with warnings.catch_warnings():
+        # n_quantiles is larger than the number of probe rows; it is set again below
+        warnings.simplefilter("ignore", UserWarning)
+        ct.fit(X.iloc[:min(len(X), 16)])
+    for _, est, cols in ct.transformers_:
+        if isinstance(est, str) or len(cols) == 0:
+            continue
+        step = est.steps[0][1] if isinstance(est, Pipeline) else est
+        if isinstance(step, (RobustScaler, MinMaxScaler, QuantileTransformer)):
+            idx = [positions[c] for c in cols]
+        if isinstance(step, RobustScaler):
+            low, high = step.quantile_range
+            if step.with_centering:
+                # median imputation does not change the median
+                step.center_ = quantiles.median[idx]
+            if step.with_scaling:
+                q = quantiles.at([low / 100, high / 100], idx, imputed)
+                scale = q[1] - q[0]
+                step.scale_ = np.where(scale < 10 * np.finfo(scale.dtype).eps, 1.0, scale)
+        elif isinstance(step, MinMaxScaler):
+            low, high = step.feature_range
+            q = quantiles.at([0.0, 1.0], idx, imputed)
+            step.data_min_, step.data_max_ = q[0], q[1]
+            step.data_range_ = q[1] - q[0]
+            step.scale_ = (high - low) / np.where(step.data_range_ < 10 * np.finfo(step.data_range_.dtype).eps, 1.0, step.data_range_)
+            step.min_ = low - step.data_min_ * step.scale_
+            step.n_samples_seen_ = len(X)
+        elif isinstance(step, QuantileTransformer) and (step.subsample is None or step.subsample >= len(X)):
+            n_quantiles = min(step.n_quantiles, len(X))
+            step.n_quantiles_ = n_quantiles
+            step.references_ = np.linspace(0, 1, n_quantiles, endpoint=True)
+            q = quantiles.at(step.references_ * 100 / 100, idx, imputed)
+            step.quantiles_ = np.maximum.accumulate(q, axis=0)
+        else:
+            step.fit(X[cols])
+    return ct
+
+
+def fitted_imputer(X: pd.DataFrame, quantiles: ColumnQuantiles) -> SimpleImputer:
+    """
+    SimpleImputer(strategy="median", keep_empty_features=True) fitted on X, with the medians taken
+    from precomputed quantiles. Empty columns are imputed with 0, as SimpleImputer does.
+    """
+    imputer = SimpleImputer(strategy="median", keep_empty_features=True)
+    imputer.fit(X.iloc[:min(len(X), 16)])
+    imputer.statistics_ = np.where(np.isnan(quantiles.median), 0.0, quantiles.median)
+    return imputer
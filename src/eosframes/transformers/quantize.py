@@ -1,25 +1,35 @@
+import functools
 import pandas as pd
-import joblib
 import json
 import os
+import tempfile
 from datetime import datetime
-from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from eosframes.frame.frame import ErsiliaFrame, as_pandas, feature_matrix
 from eosframes.transformers.build_quantize_transformer import build_quantizer
-from eosframes.transformers.build_typed_transformer import build_typed_transformer
+from eosframes.transformers.build_typed_transformer import build_typed_transformer, quantile_levels
+from eosframes.transformers.drift import DRIFT_FILE, DRIFT_LEVELS, DriftMonitor
+from eosframes.transformers.quantile_kernel import column_quantiles, fit_column_transformer, fitted_imputer
 from eosframes.transformers.save_to_s3 import save_to_s3
+from eosframes.transformers.shard import ColumnSubset, batched_transform, output_columns, reorder_output, resolve_n_jobs, sharded_transform, slice_estimator
+from eosframes.utils.instrument import span
 
 # from data_frames.quantizer import bin
 
 
 class Quantize:
     def __init__(
-        self, model_id: str):
+        self, model_id: str, n_jobs: int = None):
         # Store the original parameters for saving/loading
         self.model_id = model_id
+        # Worker processes used to fit/transform column shards (None or 1 = serial, -1 = all CPUs)
+        self.n_jobs = n_jobs
         self.pipeline_ = None
         self.feature_cols: list[str] = []
         self.num_rows = 0  
         self._is_fitted = False 
+        # Deciles and reference counts of the fitted data, to monitor drift during transform
+        self.drift_ = None
     # def __init__(
     #         self, model_id: str
     #         # robust_scaler: bool = False, 
@@ -38,7 +48,7 @@ class Quantize:
 
     def fit(self, df: pd.DataFrame) -> pd.DataFrame:
         # Check if the DataFrame is empty
-        if df.empty:
+        if len(df) == 0:
              raise ValueError("Input DataFrame is empty.")
         
         # Set the number of rows
@@ -48,24 +58,57 @@ class Quantize:
         self.fit_timestamp = datetime.now()
 
         #only transform the columns with numeric values
-        numeric_cols = df.select_dtypes(include="number").columns.tolist()
+        numeric_cols = as_pandas(df).select_dtypes(include="number").columns.tolist()
         if len(numeric_cols) == 0:
             raise ValueError("No numeric columns to transform.")
-        numeric_df = df.select_dtypes(include="number")
-        numeric_df = numeric_df.apply(pd.to_numeric, errors="coerce")
+        n_rows = len(df)
+        with span("Quantize.fit.coerce", rows=n_rows, model_id=self.model_id):
+            numeric_df = feature_matrix(df, numeric_cols)
+
+        # medians and scaler quantiles from one sort per column
+        n_jobs = resolve_n_jobs(self.n_jobs)
+        threads = n_jobs if n_jobs > 1 else None
+        with span("Quantize.fit.quantiles", rows=n_rows, model_id=self.model_id):
+            quantiles = column_quantiles(numeric_df, quantile_levels(n_rows) + DRIFT_LEVELS.tolist(), impute_median=True, n_jobs=threads)
+        with span("Quantize.fit.drift", rows=n_rows, model_id=self.model_id):
+            self.drift_ = DriftMonitor.fit(self.model_id, numeric_cols, numeric_df, quantiles.at(DRIFT_LEVELS))
 
         # impute missing values 
-        imputer = SimpleImputer(strategy="median")
-        X_num = pd.DataFrame(imputer.fit_transform(numeric_df), index=numeric_df.index, columns=numeric_df.columns)
+        with span("Quantize.fit.impute", rows=n_rows, model_id=self.model_id):
+            imputer = fitted_imputer(numeric_df, quantiles)
+            imputer.set_output(transform="pandas")
+            X_num = imputer.transform(numeric_df)
         
         # scale data
-        scaler = build_typed_transformer(X_num)
-        scaled_data = scaler.fit_transform(X_num)
-        scaled_df = pd.DataFrame(scaled_data)
+        with span("Quantize.fit.typing", rows=n_rows, model_id=self.model_id):
+            scaler = build_typed_transformer(X_num)
+        with span("Quantize.fit.scale", rows=n_rows, model_id=self.model_id, n_jobs=n_jobs):
+            fit_column_transformer(scaler, X_num, quantiles, imputed=True)
+            if n_jobs > 1:
+                scaled_data = sharded_transform(scaler, X_num, n_jobs)
+            else:
+                scaled_data = scaler.transform(X_num)
+            scaled_df = pd.DataFrame(scaled_data)
 
         #new code
-        self.pipeline_ = build_quantizer(scaled_df)
-        X_bin = self.pipeline_.fit_transform(scaled_df)
+        with span("Quantize.fit.quantize_typing", rows=n_rows, model_id=self.model_id):
+            quantizer = build_quantizer(scaled_df)
+        with span("Quantize.fit.quantize", rows=n_rows, model_id=self.model_id, n_jobs=n_jobs):
+            # the quantile transformer only sees the continuous columns
+            continuous = {name: cols for name, _, cols in quantizer.transformers}["continuous_quant"]
+            scaled_quantiles = column_quantiles(scaled_df[continuous], quantile_levels(n_rows), n_jobs=threads)
+            fit_column_transformer(quantizer, scaled_df, scaled_quantiles)
+            if n_jobs > 1:
+                X_bin = sharded_transform(quantizer, scaled_df, n_jobs)
+            else:
+                X_bin = quantizer.transform(scaled_df)
+
+        # keep every fitted stage so that transform reuses the training parameters
+        self.pipeline_ = Pipeline([
+            ("impute", imputer),
+            ("scale", scaler),
+            ("quantize", quantizer),
+        ])
 
         #old code
         ###
@@ -90,31 +133,45 @@ class Quantize:
         self._is_fitted = True
         self.feature_cols = list(numeric_cols)
 
-        return pd.DataFrame(
-            X_bin,
-            index=df.index,
-            columns=self.feature_cols
-        )
+        with span("Quantize.fit.output", rows=n_rows, model_id=self.model_id):
+            X_bin = self._reorder(X_bin)
+            return self._output(df, X_bin)
     
-    def save(self, model_dir: str):
+    def _reorder(self, X_bin):
+        """
+        Put the quantized columns back in the training column order.
+        Both ColumnTransformers group their output by column type.
+        """
+        scaled_cols = output_columns(self.pipeline_.named_steps["scale"])
+        return reorder_output(X_bin, self.pipeline_.named_steps["quantize"], self.feature_cols, scaled_cols)
+
+    def save(self, model_dir: str = None, upload: bool = True):
         """
         Save the fitted pipeline and related metadata to a directory.
 
         Args:
             model_dir (str): Directory path where the model files will be saved.
                             If the directory doesn't exist, it will be created.
+                            Defaults to the model_id.
+            upload (bool): Upload the files to S3 (default True).
 
         Raises:
             ValueError: If the model hasn't been fitted yet.
         """
+        if not self._is_fitted:
+            raise ValueError("❌ Model not fitted. Call .fit() before .save().")
+
+        save_dir = model_dir or self.model_id
+
         # Create the model directory if it doesn't exist
-        if not os.path.exists(self.model_id):
-            os.makedirs(self.model_id)
+        os.makedirs(save_dir, exist_ok=True)
+
+        import joblib
 
         # Save the fitted pipeline to a joblib file
         # This serializes the entire pipeline object including all fitted transformers
         pipeline_path = os.path.join(
-            self.model_id, "pipeline.joblib"
+            save_dir, "pipeline.joblib"
         )  # creates a file path
         joblib.dump(
             self.pipeline_, pipeline_path
@@ -137,23 +194,29 @@ class Quantize:
         }
 
         # Save the metadata as a JSON file for easy reading and debugging
-        meta_path = os.path.join(self.model_id, "metadata.json")
+        meta_path = os.path.join(save_dir, "metadata.json")
         with open(meta_path, "w") as f:
             json.dump(metadata, f, indent=2)  # Use indent=2 for pretty formatting
-        save_to_s3(
-            model_id=self.model_id,
-            metadata=metadata,
-            pipeline=self.pipeline_,
-            bucket_name="ersilia-dataframes",
-        )
+
+        # Save the reference distribution used to monitor drift
+        if self.drift_ is not None:
+            self.drift_.save(os.path.join(save_dir, DRIFT_FILE))
+        if upload:
+            save_to_s3(
+                dir_name=save_dir,
+                metadata=metadata,
+                pipeline=self.pipeline_,
+                drift=self.drift_,
+            )
+
     @classmethod
-    
     def load(
         cls,
         model_id: str,
         *,
         bucket_name: str | None = None,
         model_dir: str | None = None,
+        n_jobs: int | None = None,
     ):
         """
         Load a previously saved transformer for a given model and transformer type.
@@ -164,13 +227,16 @@ class Quantize:
             bucket_name: If provided, files are downloaded from
                          s3://<bucket>/<model_id>/<transformer_type>/
             model_dir: If provided (and bucket_name is None), load from this local dir.
+            n_jobs: Worker processes used by transform (None or 1 = serial).
 
         Returns:
-            Scale: instance with pipeline and metadata restored.
+            Quantize: instance with pipeline and metadata restored.
         """
         # Resolve source of metadata/pipeline files
         if bucket_name:
             # Download from S3 into a temp directory
+            import boto3
+
             s3 = boto3.client("s3")
             tmpdir = tempfile.mkdtemp(prefix=f"{model_id}")
             pipeline_path = os.path.join(tmpdir, "pipeline.joblib")
@@ -179,6 +245,12 @@ class Quantize:
             prefix = f"{model_id}"
             s3.download_file(bucket_name, f"{prefix}/pipeline.joblib", pipeline_path)
             s3.download_file(bucket_name, f"{prefix}/metadata.json", meta_path)
+            drift_path = os.path.join(tmpdir, DRIFT_FILE)
+            try:
+                s3.download_file(bucket_name, f"{prefix}/{DRIFT_FILE}", drift_path)
+            except Exception:
+                # artifacts saved before drift monitoring existed
+                pass
 
         elif model_dir:
             pipeline_path = os.path.join(model_dir, "pipeline.joblib")
@@ -187,12 +259,15 @@ class Quantize:
                 raise FileNotFoundError(f"Pipeline file {pipeline_path} not found.")
             if not os.path.exists(meta_path):
                 raise FileNotFoundError(f"Metadata file {meta_path} not found.")
+            drift_path = os.path.join(model_dir, DRIFT_FILE)
         else:
             raise ValueError(
                 "Provide either bucket_name (for S3) or model_dir (for local)."
             )
 
         # Load files
+        import joblib
+
         pipeline = joblib.load(pipeline_path)
         with open(meta_path, "r") as f:
             metadata = json.load(f)
@@ -200,10 +275,14 @@ class Quantize:
         # Instantiate and restore
         obj = cls(
             model_id=model_id,
+            n_jobs=n_jobs,
         )
         obj.pipeline_ = pipeline
         obj.feature_cols = metadata.get("feature_cols", [])
         obj.num_rows = metadata.get("num_rows", 0)
+        obj._is_fitted = True
+        if os.path.exists(drift_path):
+            obj.drift_ = DriftMonitor.load(drift_path).empty()
 
         ts = metadata.get("fit_timestamp")
         if ts:
@@ -211,9 +290,25 @@ class Quantize:
 
         return obj
     
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+    def drift_monitor(self) -> DriftMonitor:
+        """
+        Empty DriftMonitor of the fitted transformer, to count the distribution of the data passed to transform.
+        """
+        if self.drift_ is None:
+            raise RuntimeError("❌ No drift reference. Fit the transformer again to monitor drift.")
+        return self.drift_.empty()
+
+    def transform(self, df: pd.DataFrame, cache=None, drift: DriftMonitor = None, columns: list = None) -> pd.DataFrame:
         """
         Transform new data with the already-fitted pipeline
+
+        Args:
+            df: Data with the trained feature columns.
+            cache: Optional TransformCache. Only the rows that are not cached are transformed.
+            drift: Optional DriftMonitor (see drift_monitor) updated with a sample of the transformed rows.
+                With a cache, only the rows that are not cached are counted.
+            columns: Optional subset of the trained columns to transform, in the order of the output. df only needs
+                these columns, and only the matching parameters of the fitted pipeline are used.
         """
         if not self._is_fitted:
             raise RuntimeError("❌ Model not fitted. Call .fit() before .inference().")
@@ -224,32 +319,90 @@ class Quantize:
             )
 
          # Check for missing trained columns
-        missing = [c for c in self.feature_cols if c not in df.columns]
+        required = self.feature_cols if columns is None else self._subset(columns, cache, drift)
+        present = set(df.columns)
+        missing = [c for c in required if c not in present]
         if missing:
             raise ValueError(
                 f"❌ Inference data is missing trained columns: {missing}. "
-                f"Expected exactly these columns (in order): {self.feature_cols}"
+                f"Expected exactly these columns (in order): {required}"
             )
         
         # numeric_cols = df.select_dtypes(include="number").columns
         # if len(numeric_cols) == 0:
         #     raise ValueError("No numeric columns to transform.")
        
-        X = df.reindex(self.feature_cols)
-        X = X.apply(pd.to_numeric, errors="coerce")
+        if drift is not None and drift.columns != self.feature_cols:
+            raise ValueError("❌ The drift monitor does not have the trained columns. Use .drift_monitor().")
 
-        imputer = SimpleImputer(strategy="median")
-        df = pd.DataFrame(imputer.fit_transform(df), index=df.index, columns=df.columns)
+        if cache is not None:
+            with span("Quantize.transform.cache", rows=len(df), model_id=self.model_id):
+                compute = functools.partial(self._transform, drift=drift)
+                if isinstance(df, ErsiliaFrame):
+                    return self._output(df, cache.transform(self, df.to_pandas(), compute).to_numpy())
+                return cache.transform(self, df, compute)
+        if columns is not None:
+            return self._transform_columns(df, required)
+        return self._transform(df, drift)
 
-        # Apply the same preprocessing(scale/normalize data) that was used during fitting
-        scaler = build_typed_transformer(df)
-        scaled_data = scaler.fit_transform(df)
-        scaled_df = pd.DataFrame(scaled_data)
+    def _subset(self, columns: list, cache, drift) -> list:
+        """
+        Requested subset of the trained columns, checked.
+        """
+        columns = list(columns)
+        trained = set(self.feature_cols)
+        unknown = [c for c in columns if c not in trained]
+        if unknown:
+            raise ValueError(f"❌ Columns were not trained: {unknown}")
+        if cache is not None or drift is not None:
+            raise ValueError("❌ Caches and drift monitors hold every trained column. Transform without columns to use them.")
+        return columns
 
-        X_new = self.pipeline_.transform(scaled_df)
-        
-        return pd.DataFrame(
-            X_new,
-            index=df.index,
-            columns=self.feature_cols
-        )
+    def _transform(self, df: pd.DataFrame, drift: DriftMonitor = None) -> pd.DataFrame:
+        n_rows = len(df)
+        with span("Quantize.transform.coerce", rows=n_rows, model_id=self.model_id):
+            X = feature_matrix(df, self.feature_cols)
+        if drift is not None:
+            with span("Quantize.transform.drift", rows=n_rows, model_id=self.model_id):
+                drift.update(X)
+
+        # Apply the same imputation and scaling that were fitted during training
+        n_jobs = resolve_n_jobs(self.n_jobs)
+        with span("Quantize.transform.pipeline", rows=n_rows, model_id=self.model_id, n_jobs=n_jobs):
+            if n_jobs > 1:
+                X_imp = self.pipeline_.named_steps["impute"].transform(X)
+                X_scaled = sharded_transform(self.pipeline_.named_steps["scale"], X_imp, n_jobs)
+                X_new = sharded_transform(self.pipeline_.named_steps["quantize"], X_scaled, n_jobs)
+            else:
+                X_new = batched_transform(self.pipeline_, X)
+        with span("Quantize.transform.output", rows=n_rows, model_id=self.model_id):
+            X_new = self._reorder(X_new)
+            return self._output(df, X_new)
+
+    def _transform_columns(self, df: pd.DataFrame, columns: list) -> pd.DataFrame:
+        """
+        Transform a subset of the trained columns with every fitted stage restricted to them.
+        """
+        n_rows = len(df)
+        with span("Quantize.transform.coerce", rows=n_rows, model_id=self.model_id, columns=len(columns)):
+            X = feature_matrix(df, columns)
+        with span("Quantize.transform.pipeline", rows=n_rows, model_id=self.model_id, columns=len(columns)):
+            position = {c: i for i, c in enumerate(self.feature_cols)}
+            # the quantizer selects the columns of the scaler output by position
+            scaled_position = {c: i for i, c in enumerate(output_columns(self.pipeline_.named_steps["scale"]))}
+            subset = Pipeline([
+                ("impute", slice_estimator(self.pipeline_.named_steps["impute"], [position[c] for c in columns])),
+                ("scale", ColumnSubset(self.pipeline_.named_steps["scale"], columns).fit(X)),
+                ("quantize", ColumnSubset(self.pipeline_.named_steps["quantize"], [scaled_position[c] for c in columns]).fit(X)),
+            ])
+            X_new = batched_transform(subset, X)
+        return self._output(df, X_new, columns)
+
+    def _output(self, df, values, columns: list = None) -> pd.DataFrame:
+        """
+        Quantized values in the container of the input: an ErsiliaFrame with its key and input, or a DataFrame with its index.
+        """
+        columns = self.feature_cols if columns is None else columns
+        if isinstance(df, ErsiliaFrame):
+            return ErsiliaFrame(values, columns, model_id=df.model_id, key=df.key, input=df.input)
+        return pd.DataFrame(values, index=df.index, columns=columns)
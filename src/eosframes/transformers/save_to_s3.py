@@ -1,17 +1,25 @@
-import boto3
 import json
-import joblib
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+from eosframes.transformers.drift import DRIFT_FILE
+from eosframes.transformers.fit_stats import FIT_STATS_FILE
+
 
 def save_to_s3(
     dir_name,
     metadata,
     pipeline,
+    fit_stats=None,
+    drift=None,
 ):
+    # boto3, joblib and dotenv are slow to import: only load them when uploading
+    import boto3
+    import joblib
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
     # Read bucket name and AWS config from environment
     bucket_name = os.getenv("S3_BUCKET_NAME")
     region = os.getenv("AWS_DEFAULT_REGION")
@@ -28,6 +36,16 @@ def save_to_s3(
 
     joblib.dump(pipeline, pipeline_path)
 
+    # Optional FitStatistics, needed to update the transformer later
+    stats_path = FIT_STATS_FILE
+    if fit_stats is not None:
+        fit_stats.save(stats_path)
+
+    # Optional DriftMonitor with the reference distribution of the fitted data
+    drift_path = DRIFT_FILE
+    if drift is not None:
+        drift.save(drift_path)
+
     # Upload to S3
     s3 = boto3.client(
         "s3",
@@ -38,6 +56,10 @@ def save_to_s3(
 
     s3.upload_file(metadata_path, bucket_name, os.path.join(s3_prefix, metadata_path))
     s3.upload_file(pipeline_path, bucket_name, os.path.join(s3_prefix, pipeline_path))
+    if fit_stats is not None:
+        s3.upload_file(stats_path, bucket_name, os.path.join(s3_prefix, stats_path))
+    if drift is not None:
+        s3.upload_file(drift_path, bucket_name, os.path.join(s3_prefix, drift_path))
 
     print(
         f"✅ Saved {metadata_path} and {pipeline_path} to s3://{bucket_name}/{s3_prefix}"
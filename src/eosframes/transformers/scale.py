@@ -1,42 +1,57 @@
+import functools
+import numpy as np
 import pandas as pd
-import joblib
 import json
 import os
 import tempfile
-import boto3
 from datetime import datetime
-from data_frames.transformers.build_typed_transformer import build_typed_transformer
-from data_frames.transformers.save_to_s3 import save_to_s3
-from sklearn.impute import SimpleImputer
+from eosframes.frame.frame import ErsiliaFrame, as_pandas, feature_matrix
+from eosframes.transformers.build_typed_transformer import build_typed_transformer, quantile_levels
+from eosframes.transformers.drift import DRIFT_FILE, DRIFT_LEVELS, DriftMonitor
+from eosframes.transformers.fit_stats import FIT_STATS_FILE, QUANTILE_LEVELS, FitStatistics, apply_statistics
+from eosframes.transformers.quantile_kernel import column_quantiles, fit_column_transformer
+from eosframes.transformers.save_to_s3 import save_to_s3
+from eosframes.transformers.shard import ColumnSubset, batched_transform, reorder_output, resolve_n_jobs, sharded_transform
+from eosframes.utils.instrument import span
 
 
 class Scale():
     def __init__(
-        self, model_id: str):
+        self, model_id: str, n_jobs: int = None):
         # Store the original parameters for saving/loading
         self.model_id = model_id
+        # Worker processes used to fit/transform column shards (None or 1 = serial, -1 = all CPUs)
+        self.n_jobs = n_jobs
         self.pipeline_ = None
         self.feature_cols: list[str] = []
         self.num_rows = 0
         self._is_fitted = False 
         self.empty: list[str] = []
+        # Mergeable statistics of the fitted rows, used by update
+        self.fit_stats_ = None
+        # Deciles and reference counts of the fitted data, to monitor drift during transform
+        self.drift_ = None
 
     def fit(self, df: pd.DataFrame) -> pd.DataFrame:
         # Check if the DataFrame is empty
-        if df.empty:
+        if len(df) == 0:
             raise ValueError("❌ Input DataFrame is empty.")
+        data = as_pandas(df)
 
         # Set the number of rows
         self.num_rows = len(df)
+        # Refitting starts from scratch
+        self.feature_cols = []
+        self.empty = []
 
         # Capture the timestamp when fit was called
         self.fit_timestamp = datetime.now()
 
         #need to ensure numeric columns before imputing: imputing fails on NaNs
         # Ensure only numeric columns
-        numeric_cols = df.select_dtypes(include="number").columns.tolist()
+        numeric_cols = data.select_dtypes(include="number").columns.tolist()
         for col in numeric_cols:
-            frac_missing = df[col].isna().mean()
+            frac_missing = data[col].isna().mean()
             if frac_missing >= 0.25:
                 self.empty.append(col)
             else:
@@ -45,27 +60,94 @@ class Scale():
         if len(self.feature_cols) == 0:
             raise ValueError("❌ No numeric columns or non empty columns to transform.")
         
-        numeric_df = df.reindex(columns=self.feature_cols)
-        numeric_df = numeric_df.apply(pd.to_numeric, errors="coerce")
+        n_rows = len(df)
+        with span("Scale.fit.coerce", rows=n_rows, model_id=self.model_id):
+            numeric_df = feature_matrix(df, self.feature_cols)
 
-        # impute missing values 
-        imputer = SimpleImputer(strategy="median")
-        X_num = pd.DataFrame(imputer.fit_transform(numeric_df), index=numeric_df.index, columns=numeric_df.columns)
+        # every quantile the fit needs (medians, scaler parameters, fit statistics) from one sort per column
+        n_jobs = resolve_n_jobs(self.n_jobs)
+        with span("Scale.fit.quantiles", rows=n_rows, model_id=self.model_id):
+            levels = quantile_levels(n_rows) + QUANTILE_LEVELS.tolist() + DRIFT_LEVELS.tolist()
+            quantiles = column_quantiles(numeric_df, levels, impute_median=True, n_jobs=n_jobs if n_jobs > 1 else None)
 
-        self.pipeline_ = build_typed_transformer(X_num)
-        transformed = self.pipeline_.fit_transform(X_num)
+        # impute missing values with the median, as SimpleImputer(strategy="median")
+        with span("Scale.fit.impute", rows=n_rows, model_id=self.model_id):
+            values = numeric_df.to_numpy()
+            if values.dtype.kind != "f":
+                values = values.astype(np.float64)
+            values = np.where(np.isnan(values), quantiles.median.astype(values.dtype), values)
+            X_num = pd.DataFrame(values, index=numeric_df.index, columns=numeric_df.columns, copy=False)
+
+        with span("Scale.fit.statistics", rows=n_rows, model_id=self.model_id):
+            self.fit_stats_ = FitStatistics(self.feature_cols, quantiles.at(QUANTILE_LEVELS), n_rows, quantiles.n_missing)
+        with span("Scale.fit.drift", rows=n_rows, model_id=self.model_id):
+            self.drift_ = DriftMonitor.fit(self.model_id, self.feature_cols, numeric_df, quantiles.at(DRIFT_LEVELS))
+
+        with span("Scale.fit.typing", rows=n_rows, model_id=self.model_id):
+            self.pipeline_ = build_typed_transformer(X_num)
+        with span("Scale.fit.pipeline", rows=n_rows, model_id=self.model_id, n_jobs=n_jobs):
+            fit_column_transformer(self.pipeline_, X_num, quantiles, imputed=True)
+            if n_jobs > 1:
+                transformed = sharded_transform(self.pipeline_, X_num, n_jobs)
+            else:
+                transformed = self.pipeline_.transform(X_num)
 
         self._is_fitted = True
 
-        return pd.DataFrame(transformed)
+        # ColumnTransformer groups the output by column type; restore the training column order
+        with span("Scale.fit.output", rows=n_rows, model_id=self.model_id):
+            transformed = reorder_output(transformed, self.pipeline_, self.feature_cols)
+            return self._output(df, transformed)
         
-    def save(self, dir_name=None, local=False):
+    def update(self, df: pd.DataFrame) -> "Scale":
+        """
+        Warm-start the fitted transformer with new rows, without revisiting the rows it was fitted on.
+
+        The new rows are folded into the fit statistics (quantile summaries, minimum/maximum, medians and
+        missing counts) and the parameters of the scalers are derived again from them, with the missing values
+        of all the rows imputed at the merged median, as fit does. Columns keep the type
+        assigned at fit time. The result approximates a fit on all the rows; the cost depends only on the new rows.
+
+        Args:
+            df: New rows with the trained feature columns.
+
+        Returns:
+            Scale: self, updated.
+
+        Raises:
+            RuntimeError: If the transformer is not fitted or has no fit statistics (saved by an older version).
+        """
+        if not self._is_fitted:
+            raise RuntimeError("❌ Model not fitted. Call .fit() before .update().")
+        if self.fit_stats_ is None:
+            raise RuntimeError("❌ The transformer has no fit statistics. Fit it again to enable updates.")
+        if len(df) == 0:
+            raise ValueError("❌ Input DataFrame is empty.")
+        columns = set(df.columns)
+        missing = [c for c in self.feature_cols if c not in columns]
+        if missing:
+            raise ValueError(f"❌ Update data is missing trained columns: {missing}.")
+
+        n_rows = len(df)
+        with span("Scale.update.statistics", rows=n_rows, model_id=self.model_id):
+            # missing values are counted, not imputed: the parameters see them at the median of all the rows
+            X = feature_matrix(df, self.feature_cols).to_numpy(dtype=np.float64)
+            self.fit_stats_ = self.fit_stats_.merge(FitStatistics.from_values(self.feature_cols, X))
+        with span("Scale.update.parameters", rows=n_rows, model_id=self.model_id):
+            apply_statistics(self.pipeline_, self.fit_stats_)
+        self.num_rows += n_rows
+        self.fit_timestamp = datetime.now()
+        return self
+
+    def save(self, dir_name=None, local=False, upload=True):
         """
         Save the fitted pipeline and related metadata to a directory.
 
         Args:
             model_dir (str): Directory path where the model files will be saved.
                             If the directory doesn't exist, it will be created.
+            local (bool): Also write the files to the local directory.
+            upload (bool): Upload the files to S3 (default True).
 
         Raises:
             ValueError: If the model hasn't been fitted yet.
@@ -92,6 +174,8 @@ class Scale():
             # Create the model directory if it doesn't exist
             os.makedirs(save_dir, exist_ok=True)
 
+            import joblib
+
             # Save the fitted pipeline to a joblib file
             # This serializes the entire pipeline object including all fitted transformers
             pipeline_path = os.path.join(save_dir, "pipeline.joblib")  
@@ -102,11 +186,20 @@ class Scale():
             with open(meta_path, "w") as f:
                 json.dump(metadata, f, indent=2)
 
-        save_to_s3(
-            dir_name=save_dir,
-            metadata=metadata,
-            pipeline=self.pipeline_,
-        )
+            # Save the fit statistics used by update
+            if self.fit_stats_ is not None:
+                self.fit_stats_.save(os.path.join(save_dir, FIT_STATS_FILE))
+            if self.drift_ is not None:
+                self.drift_.save(os.path.join(save_dir, DRIFT_FILE))
+
+        if upload:
+            save_to_s3(
+                dir_name=save_dir,
+                metadata=metadata,
+                pipeline=self.pipeline_,
+                fit_stats=self.fit_stats_,
+                drift=self.drift_,
+            )
 
     @classmethod
     def load(
@@ -115,6 +208,7 @@ class Scale():
         *,
         bucket_name: str | None = None,
         model_dir: str | None = None,
+        n_jobs: int | None = None,
     ):
         """
         Load a previously saved transformer for a given model and transformer type.
@@ -125,6 +219,7 @@ class Scale():
             bucket_name: If provided, files are downloaded from
                          s3://<bucket>/<model_id>/<transformer_type>/
             model_dir: If provided (and bucket_name is None), load from this local dir.
+            n_jobs: Worker processes used by transform (None or 1 = serial).
 
         Returns:
             Scale: instance with pipeline and metadata restored.
@@ -132,6 +227,8 @@ class Scale():
         # Resolve source of metadata/pipeline files
         if bucket_name:
             # Download from S3 into a temp directory
+            import boto3
+
             s3 = boto3.client("s3")
             tmpdir = tempfile.mkdtemp(prefix=f"{model_id}")
             pipeline_path = os.path.join(tmpdir, "pipeline.joblib")
@@ -140,6 +237,18 @@ class Scale():
             prefix = f"{model_id}"
             s3.download_file(bucket_name, f"{prefix}/pipeline.joblib", pipeline_path)
             s3.download_file(bucket_name, f"{prefix}/metadata.json", meta_path)
+            stats_path = os.path.join(tmpdir, FIT_STATS_FILE)
+            try:
+                s3.download_file(bucket_name, f"{prefix}/{FIT_STATS_FILE}", stats_path)
+            except Exception:
+                # artifacts saved before fit statistics existed
+                pass
+            drift_path = os.path.join(tmpdir, DRIFT_FILE)
+            try:
+                s3.download_file(bucket_name, f"{prefix}/{DRIFT_FILE}", drift_path)
+            except Exception:
+                # artifacts saved before drift monitoring existed
+                pass
 
         elif model_dir:
             pipeline_path = os.path.join(model_dir, "pipeline.joblib")
@@ -148,12 +257,16 @@ class Scale():
                 raise FileNotFoundError(f"Pipeline file {pipeline_path} not found.")
             if not os.path.exists(meta_path):
                 raise FileNotFoundError(f"Metadata file {meta_path} not found.")
+            stats_path = os.path.join(model_dir, FIT_STATS_FILE)
+            drift_path = os.path.join(model_dir, DRIFT_FILE)
         else:
             raise ValueError(
                 "Provide either bucket_name (for S3) or model_dir (for local)."
             )
 
         # Load files
+        import joblib
+
         pipeline = joblib.load(pipeline_path)
         with open(meta_path, "r") as f:
             metadata = json.load(f)
@@ -161,10 +274,17 @@ class Scale():
         # Instantiate and restore
         obj = cls(
             model_id=model_id,
+            n_jobs=n_jobs,
         )
         obj.pipeline_ = pipeline
         obj.feature_cols = metadata.get("feature_cols", [])
         obj.num_rows = metadata.get("num_rows", 0)
+        obj.empty = metadata.get("empty_skipped_cols") or []
+        obj._is_fitted = True
+        if os.path.exists(stats_path):
+            obj.fit_stats_ = FitStatistics.load(stats_path)
+        if os.path.exists(drift_path):
+            obj.drift_ = DriftMonitor.load(drift_path).empty()
 
         ts = metadata.get("fit_timestamp")
         if ts:
@@ -172,9 +292,25 @@ class Scale():
 
         return obj
 
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+    def drift_monitor(self) -> DriftMonitor:
+        """
+        Empty DriftMonitor of the fitted transformer, to count the distribution of the data passed to transform.
+        """
+        if self.drift_ is None:
+            raise RuntimeError("❌ No drift reference. Fit the transformer again to monitor drift.")
+        return self.drift_.empty()
+
+    def transform(self, df: pd.DataFrame, cache=None, drift: DriftMonitor = None, columns: list = None) -> pd.DataFrame:
         """
         Transform new data with the already-fitted pipeline
+
+        Args:
+            df: Data with the trained feature columns.
+            cache: Optional TransformCache. Only the rows that are not cached are transformed.
+            drift: Optional DriftMonitor (see drift_monitor) updated with a sample of the transformed rows.
+                With a cache, only the rows that are not cached are counted.
+            columns: Optional subset of the trained columns to transform, in the order of the output. df only needs
+                these columns, and only the matching parameters of the fitted pipeline are used.
         """
         if not self._is_fitted:
             raise RuntimeError("❌ Model not fitted. Call .fit() before .inference().")
@@ -185,16 +321,76 @@ class Scale():
             )
 
         # Check for missing trained columns
-        missing = [c for c in self.feature_cols if c not in df.columns]
+        required = self.feature_cols if columns is None else self._subset(columns, cache, drift)
+        present = set(df.columns)
+        missing = [c for c in required if c not in present]
         if missing:
             raise ValueError(
                 f"Inference data is missing trained columns: {missing}. "
-                f"Expected exactly these columns (in order): {self.feature_cols}"
+                f"Expected exactly these columns (in order): {required}"
             )
 
+        if drift is not None and drift.columns != self.feature_cols:
+            raise ValueError("❌ The drift monitor does not have the trained columns. Use .drift_monitor().")
+
         # Build input with the exact schema used for training
-        X = df.reindex(columns=self.feature_cols)
-        X = X.apply(pd.to_numeric, errors="coerce")
+        if cache is not None:
+            with span("Scale.transform.cache", rows=len(df), model_id=self.model_id):
+                compute = functools.partial(self._transform, drift=drift)
+                if isinstance(df, ErsiliaFrame):
+                    return self._output(df, cache.transform(self, df.to_pandas(), compute).to_numpy())
+                return cache.transform(self, df, compute)
+        if columns is not None:
+            return self._transform_columns(df, required)
+        return self._transform(df, drift)
+
+    def _subset(self, columns: list, cache, drift) -> list:
+        """
+        Requested subset of the trained columns, checked.
+        """
+        columns = list(columns)
+        trained = set(self.feature_cols)
+        unknown = [c for c in columns if c not in trained]
+        if unknown:
+            raise ValueError(f"❌ Columns were not trained: {unknown}")
+        if cache is not None or drift is not None:
+            raise ValueError("❌ Caches and drift monitors hold every trained column. Transform without columns to use them.")
+        return columns
+
+    def _transform(self, df: pd.DataFrame, drift: DriftMonitor = None) -> pd.DataFrame:
+        n_rows = len(df)
+        with span("Scale.transform.coerce", rows=n_rows, model_id=self.model_id):
+            X = feature_matrix(df, self.feature_cols)
+        if drift is not None:
+            with span("Scale.transform.drift", rows=n_rows, model_id=self.model_id):
+                drift.update(X)
+
+        n_jobs = resolve_n_jobs(self.n_jobs)
+        with span("Scale.transform.pipeline", rows=n_rows, model_id=self.model_id, n_jobs=n_jobs):
+            if n_jobs > 1:
+                X_new = sharded_transform(self.pipeline_, X, n_jobs)
+            else:
+                X_new = batched_transform(self.pipeline_, X)
+        with span("Scale.transform.output", rows=n_rows, model_id=self.model_id):
+            X_new = reorder_output(X_new, self.pipeline_, self.feature_cols)
+            return self._output(df, X_new)
 
-        X_new = self.pipeline_.transform(X)
-        return pd.DataFrame(X_new, index=df.index, columns=self.feature_cols)
+    def _transform_columns(self, df: pd.DataFrame, columns: list) -> pd.DataFrame:
+        """
+        Transform a subset of the trained columns with the fitted pipeline restricted to them.
+        """
+        n_rows = len(df)
+        with span("Scale.transform.coerce", rows=n_rows, model_id=self.model_id, columns=len(columns)):
+            X = feature_matrix(df, columns)
+        with span("Scale.transform.pipeline", rows=n_rows, model_id=self.model_id, columns=len(columns)):
+            X_new = batched_transform(ColumnSubset(self.pipeline_, columns).fit(X), X)
+        return self._output(df, X_new, columns)
+
+    def _output(self, df, values, columns: list = None) -> pd.DataFrame:
+        """
+        Transformed values in the container of the input: an ErsiliaFrame with its key and input, or a DataFrame with its index.
+        """
+        columns = self.feature_cols if columns is None else columns
+        if isinstance(df, ErsiliaFrame):
+            return ErsiliaFrame(values, columns, model_id=df.model_id, key=df.key, input=df.input)
+        return pd.DataFrame(values, index=df.index, columns=columns)
@@ -0,0 +1,295 @@
+import os
+import copy
+import warnings
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, QuantileTransformer, RobustScaler
+
+from eosframes.transformers.build_quantize_transformer import BinaryToExtremes
+from eosframes.utils.utils import plan_batch_size
+
+# -------- per-column fitted attributes (name, feature axis) --------
+# Estimators listed here act on every column independently, so they can be
+# sliced into column shards and concatenated back without changing results.
+_COLUMN_ATTRIBUTES = {
+    RobustScaler: [("center_", 0), ("scale_", 0)],
+    MinMaxScaler: [("min_", 0), ("scale_", 0), ("data_min_", 0), ("data_max_", 0), ("data_range_", 0)],
+    QuantileTransformer: [("quantiles_", 1)],
+    SimpleImputer: [("statistics_", 0)],
+    FunctionTransformer: [],
+    BinaryToExtremes: [],
+}
+
+
+def is_column_separable(est) -> bool:
+    """
+    Whether a (fitted or unfitted) estimator transforms each column independently.
+    """
+    if isinstance(est, str):
+        return est in ("passthrough", "drop")
+    if isinstance(est, Pipeline):
+        return all(is_column_separable(step) for _, step in est.steps)
+    return type(est) in _COLUMN_ATTRIBUTES
+
+
+def slice_estimator(est, idx):
+    """
+    Restrict a fitted column-separable estimator to the feature positions in idx.
+    Parameter arrays are sliced, so the returned estimator is a light copy of est.
+    """
+    if isinstance(est, str):
+        return est
+    if isinstance(est, Pipeline):
+        sliced = copy.copy(est)
+        sliced.steps = [(name, slice_estimator(step, idx)) for name, step in est.steps]
+        return sliced
+    idx = np.asarray(idx, dtype=int)
+    sliced = copy.copy(est)
+    for attr, axis in _COLUMN_ATTRIBUTES[type(est)]:
+        if hasattr(est, attr):
+            setattr(sliced, attr, np.take(getattr(est, attr), idx, axis=axis))
+    if hasattr(est, "n_features_in_"):
+        sliced.n_features_in_ = len(idx)
+    if hasattr(est, "feature_names_in_"):
+        sliced.feature_names_in_ = est.feature_names_in_[idx]
+    return sliced
+
+
+class ColumnSubset(BaseEstimator, TransformerMixin):
+    """
+    A fitted ColumnTransformer restricted to some of its input columns, given as the labels its branches select.
+    Every branch estimator is sliced to the requested columns (see slice_estimator), so the work and the
+    intermediate arrays of transform are proportional to the number of requested columns.
+    The input has one column per requested column, in that order, and so has the output.
+    """
+
+    def __init__(self, ct, columns: list):
+        self.ct = ct
+        self.columns = columns
+
+    def fit(self, X, y=None):
+        position = {c: j for j, c in enumerate(self.columns)}
+        self.branches_ = []
+        found = set()
+        for name, est, cols in self.ct.transformers_:
+            if name == "remainder" or isinstance(est, str) and est == "drop":
+                continue
+            cols = list(cols)
+            idx = [i for i, c in enumerate(cols) if c in position]
+            if not idx:
+                continue
+            if len(idx) < len(cols) and not is_column_separable(est):
+                raise ValueError(f"❌ Branch {name} does not transform its columns independently, so it cannot be restricted to some of them.")
+            sliced = est if len(idx) == len(cols) else slice_estimator(est, idx)
+            self.branches_.append((sliced, [cols[i] for i in idx], [position[cols[i]] for i in idx]))
+            found.update(cols[i] for i in idx)
+        missing = [c for c in self.columns if c not in found]
+        if missing:
+            raise ValueError(f"❌ Columns not transformed by the fitted transformer: {missing}")
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        values = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+        if values.shape[1] != len(self.columns):
+            raise ValueError(f"❌ Expected {len(self.columns)} columns, got {values.shape[1]}.")
+        results = []
+        for est, names, pos in self.branches_:
+            X_branch = values[:, pos]
+            if isinstance(est, str):
+                results.append(X_branch)
+                continue
+            # branches fitted on named columns expect them by name
+            results.append(np.asarray(est.transform(pd.DataFrame(X_branch, columns=names, copy=False))))
+        Y = np.empty((len(values), len(self.columns)), dtype=np.result_type(*[r.dtype for r in results]))
+        for (_, _, pos), result in zip(self.branches_, results):
+            Y[:, pos] = result
+        return Y
+
+
+def output_columns(ct, input_columns: list = None) -> list:
+    """
+    Input column of every output column of a fitted ColumnTransformer (in output order).
+    ColumnTransformer concatenates its branches, so the output order differs from the input order.
+
+    Args:
+        ct: fitted ColumnTransformer whose branches map one input column to one output column.
+        input_columns: names of the input columns, used when the branches select columns by position.
+
+    Returns:
+        list: input column label for every output column.
+    """
+    columns = []
+    for name, est, cols in ct.transformers_:
+        if name == "remainder" or isinstance(est, str) and est == "drop":
+            continue
+        for c in cols:
+            if input_columns is not None and isinstance(c, (int, np.integer)):
+                columns.append(input_columns[c])
+            else:
+                columns.append(c)
+    return columns
+
+
+def reorder_output(Y: np.ndarray, ct, columns: list, input_columns: list = None) -> np.ndarray:
+    """
+    Reorder the output of a fitted ColumnTransformer so that its columns follow the given column order.
+    """
+    position = {c: i for i, c in enumerate(output_columns(ct, input_columns))}
+    return Y[:, [position[c] for c in columns]]
+
+
+def _create_array(shape: tuple, dtype, order: str = "C"):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, order=order)
+    return shm, arr
+
+
+def _release(shm: shared_memory.SharedMemory):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _run_shard(est, in_spec, in_pos, names, out_spec, out_pos):
+    """
+    Worker task: transform one column shard.
+    The input matrix is read from, and the output written to, shared memory.
+    """
+    in_name, in_shape, in_dtype = in_spec
+    out_name, out_shape, out_dtype = out_spec
+    # workers share the resource tracker of the parent process, which owns (and unlinks) both segments
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        X = np.ndarray(in_shape, dtype=in_dtype, buffer=shm_in.buf, order="F")
+        Y = np.ndarray(out_shape, dtype=out_dtype, buffer=shm_out.buf, order="F")
+        X_shard = X[:, in_pos]
+        if names is not None:
+            X_shard = pd.DataFrame(X_shard, columns=names, copy=False)
+        Y[:, out_pos] = np.asarray(est.transform(X_shard))
+        del X, Y, X_shard
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+def _shard_tasks(ct, X_columns: list, n_jobs: int):
+    """
+    Split every branch of a fitted ColumnTransformer into column shards.
+    Branches that are not column-separable are kept in one shard.
+    """
+    branches = ct.transformers_
+    total = sum(len(cols) for name, est, cols in branches if not (isinstance(est, str) and est == "drop"))
+    shard_size = max(1, -(-total // n_jobs))
+    position = {c: i for i, c in enumerate(X_columns)}
+    tasks = []
+    out_start = 0
+    for name, est, cols in branches:
+        if name == "remainder" or isinstance(est, str) and est == "drop":
+            continue
+        cols = list(cols)
+        size = shard_size if is_column_separable(est) else max(1, len(cols))
+        for start in range(0, len(cols), size):
+            idx = list(range(start, min(start + size, len(cols))))
+            shard_est = est if len(idx) == len(cols) else slice_estimator(est, idx)
+            tasks.append((shard_est, [position[cols[i]] for i in idx], [cols[i] for i in idx], list(range(out_start + idx[0], out_start + idx[-1] + 1))))
+        out_start += len(cols)
+    return tasks, out_start
+
+
+def sharded_transform(ct, X, n_jobs: int) -> np.ndarray:
+    """
+    Transform with a fitted ColumnTransformer, with its columns split into shards across a process pool.
+
+    Args:
+        ct: fitted ColumnTransformer whose branches map one input column to one output column.
+        X: input DataFrame (columns selected by name) or array (columns selected by position).
+        n_jobs: number of worker processes.
+
+    Returns:
+        np.ndarray: the transformed matrix, identical to ct.transform(X).
+    """
+    if isinstance(X, pd.DataFrame):
+        X_columns = list(X.columns)
+        # keep the common dtype of the frame: casting float32 features to float64 changes the results
+        values = X.to_numpy()
+        if values.dtype.kind not in "biuf":
+            values = values.astype(np.float64)
+        use_names = True
+    else:
+        values = np.asarray(X)
+        X_columns = list(range(values.shape[1]))
+        use_names = False
+    tasks, n_out = _shard_tasks(ct, X_columns, n_jobs)
+    n_rows = values.shape[0]
+
+    # probe the output dtype of every shard on a single row (serial and cheap)
+    dtypes = []
+    for est, in_pos, names, out_pos in tasks:
+        probe = values[:1, in_pos]
+        if use_names:
+            probe = pd.DataFrame(probe, columns=names)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            dtypes.append(np.asarray(est.transform(probe)).dtype)
+    out_dtype = np.result_type(*dtypes) if dtypes else np.float64
+
+    shm_in, X_shared = _create_array(values.shape, values.dtype, order="F")
+    shm_out, Y_shared = _create_array((n_rows, n_out), out_dtype, order="F")
+    try:
+        X_shared[:] = values
+        in_spec = (shm_in.name, values.shape, values.dtype.str)
+        out_spec = (shm_out.name, (n_rows, n_out), np.dtype(out_dtype).str)
+        Parallel(n_jobs=n_jobs)(
+            delayed(_run_shard)(est, in_spec, in_pos, names if use_names else None, out_spec, out_pos)
+            for est, in_pos, names, out_pos in tasks
+        )
+        Y = np.array(Y_shared, order="C")
+    finally:
+        del X_shared, Y_shared
+        _release(shm_in)
+        _release(shm_out)
+    return Y
+
+
+def batched_transform(est, X, batch_rows: int = None) -> np.ndarray:
+    """
+    Transform with a fitted estimator one batch of rows at a time, into a single preallocated output,
+    so that the intermediate arrays of the transform only ever hold one batch.
+
+    Args:
+        est: fitted estimator that transforms every row independently, with a dense output.
+        X: input DataFrame.
+        batch_rows: rows per batch (default: planned from the number of columns and the available memory).
+
+    Returns:
+        np.ndarray: the transformed matrix, identical to est.transform(X).
+    """
+    if batch_rows is None:
+        batch_rows = plan_batch_size(X.shape[1])
+    if len(X) <= batch_rows:
+        return est.transform(X)
+    first = np.asarray(est.transform(X.iloc[:batch_rows]))
+    Y = np.empty((len(X),) + first.shape[1:], dtype=first.dtype)
+    Y[:batch_rows] = first
+    for start in range(batch_rows, len(X), batch_rows):
+        Y[start:start + batch_rows] = est.transform(X.iloc[start:start + batch_rows])
+    return Y
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """
+    Number of worker processes for a scikit-learn style n_jobs value (None means 1, -1 means all CPUs).
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
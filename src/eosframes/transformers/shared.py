@@ -0,0 +1,197 @@
+import os
+import sys
+import copy
+import mmap
+import pickle
+import struct
+from multiprocessing import shared_memory, resource_tracker
+
+# -------- segment layout --------
+# header:  magic (8 bytes) | skeleton length (u64) | number of buffers (u64)
+# table:   offset (u64) | length (u64) for every parameter buffer
+# body:    pickled skeleton, then every parameter buffer aligned to 64 bytes
+_MAGIC = b"EOSPARAM"
+_HEADER = struct.Struct("<8sQQ")
+_ENTRY = struct.Struct("<QQ")
+_ALIGN = 64
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _serialize(transformer):
+    """
+    Pickle a transformer with its numpy arrays out-of-band (pickle protocol 5).
+    Returns the layout size and a function that writes the layout into a writable buffer.
+    """
+    transformer = copy.copy(transformer)
+    transformer.__dict__.pop("_shared_handle", None)
+    buffers = []
+    skeleton = pickle.dumps(transformer, protocol=5, buffer_callback=buffers.append)
+    raws = [b.raw() for b in buffers]
+    table_size = _HEADER.size + _ENTRY.size * len(raws)
+    offset = _align(table_size + len(skeleton))
+    entries = []
+    for raw in raws:
+        entries += [(offset, raw.nbytes)]
+        offset = _align(offset + raw.nbytes)
+    size = offset
+
+    def write(buf):
+        _HEADER.pack_into(buf, 0, _MAGIC, len(skeleton), len(raws))
+        for i, (start, length) in enumerate(entries):
+            _ENTRY.pack_into(buf, _HEADER.size + i * _ENTRY.size, start, length)
+        buf[table_size:table_size + len(skeleton)] = skeleton
+        for (start, length), raw in zip(entries, raws):
+            buf[start:start + length] = raw.cast("B")
+
+    return size, write
+
+
+def _deserialize(buf):
+    """
+    Rebuild a transformer whose numpy arrays are read-only views on buf.
+    """
+    magic, skeleton_len, n_buffers = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError("❌ Not a published transformer parameter segment.")
+    table_size = _HEADER.size + _ENTRY.size * n_buffers
+    buffers = []
+    for i in range(n_buffers):
+        start, length = _ENTRY.unpack_from(buf, _HEADER.size + i * _ENTRY.size)
+        buffers += [buf[start:start + length]]
+    skeleton = bytes(buf[table_size:table_size + skeleton_len])
+    return pickle.loads(skeleton, buffers=buffers)
+
+
+# POSIX shared memory segments are files in this folder on Linux
+_SHM_DIR = "/dev/shm"
+
+
+def _tracker_name(shm: shared_memory.SharedMemory) -> str:
+    # the resource tracker knows POSIX segments by their name with the leading slash
+    return "/" + shm.name if os.name == "posix" else shm.name
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """
+    Published segments outlive the processes that create or attach to them,
+    so they must not be unlinked by the resource tracker when a process exits.
+    """
+    if sys.version_info < (3, 13):
+        try:
+            resource_tracker.unregister(_tracker_name(shm), "shared_memory")
+        except Exception:
+            pass
+
+
+def _open_shared_memory(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    _untrack(shm)
+    return shm
+
+
+def publish_parameters(transformer, name: str = None, path: str = None) -> str:
+    """
+    Publish the parameters of a fitted Scale or Quantize once per node, so that worker
+    processes can attach to them instead of each loading their own copy of pipeline.joblib.
+
+    The parameter arrays (quantile tables, centers, scales...) are stored in a named shared
+    memory segment, or in a file that workers memory-map (e.g. under /dev/shm).
+
+    Args:
+        transformer: fitted Scale or Quantize instance.
+        name: name of the shared memory segment to create (e.g. "eos78ao-scale").
+        path: path of the file to create instead of a shared memory segment.
+
+    Returns:
+        str: the name of the segment or the path of the file.
+    """
+    if not getattr(transformer, "_is_fitted", False):
+        raise RuntimeError("❌ Model not fitted. Call .fit() or .load() before publishing it.")
+    if (name is None) == (path is None):
+        raise ValueError("Provide either name (for shared memory) or path (for a memory-mapped file).")
+    size, write = _serialize(transformer)
+    if name is not None:
+        shm = _open_shared_memory(name, create=True, size=size)
+        try:
+            write(shm.buf)
+        finally:
+            shm.close()
+        return name
+    if os.path.exists(path):
+        raise FileExistsError(f"File {path} exists. Please remove it before publishing.")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.truncate(size)
+    with open(tmp_path, "r+b") as f:
+        with mmap.mmap(f.fileno(), size) as mm:
+            write(mm)
+            mm.flush()
+    # workers never see a partially written file
+    os.replace(tmp_path, path)
+    return path
+
+
+def attach_parameters(name: str = None, path: str = None):
+    """
+    Attach to parameters published with publish_parameters.
+
+    The returned Scale or Quantize transforms as usual, but its parameter arrays are read-only
+    views on the shared segment, so all workers on the node share a single copy in memory.
+
+    Args:
+        name: name of the shared memory segment.
+        path: path of the memory-mapped parameter file.
+
+    Returns:
+        Scale or Quantize: fitted instance backed by the shared parameters.
+    """
+    if (name is None) == (path is None):
+        raise ValueError("Provide either name (for shared memory) or path (for a memory-mapped file).")
+    if name is not None:
+        segment = os.path.join(_SHM_DIR, name.lstrip("/"))
+        if os.path.exists(segment):
+            # map the file of the segment: the mapping lives as long as the arrays that view it
+            with open(segment, "rb") as f:
+                handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = memoryview(handle)
+        else:
+            # the segment stays open with the transformer, which releases its arrays before the handle
+            handle = _open_shared_memory(name)
+            buf = handle.buf.toreadonly()
+    else:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Parameter file {path} not found.")
+        with open(path, "rb") as f:
+            handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(handle)
+    transformer = _deserialize(buf)
+    # keep the segment mapped for as long as the transformer is alive
+    transformer._shared_handle = handle
+    return transformer
+
+
+def unpublish_parameters(name: str = None, path: str = None) -> None:
+    """
+    Remove published parameters. Processes that are already attached keep working
+    until they release the transformer.
+
+    Args:
+        name: name of the shared memory segment.
+        path: path of the memory-mapped parameter file.
+    """
+    if (name is None) == (path is None):
+        raise ValueError("Provide either name (for shared memory) or path (for a memory-mapped file).")
+    if name is not None:
+        shm = _open_shared_memory(name)
+        shm.close()
+        if sys.version_info < (3, 13):
+            # unlink() unregisters the segment from the resource tracker, so register it first
+            resource_tracker.register(_tracker_name(shm), "shared_memory")
+        shm.unlink()
+    else:
+        os.remove(path)
@@ -0,0 +1,181 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from eosframes.frame.frame import ErsiliaFrame
+from eosframes.utils.instrument import span
+from eosframes.utils.utils import is_model_id_valid
+
+KINDS = ("scale", "quantize")
+
+
+def model_blocks(columns: list) -> dict:
+    """
+    Columns of every model in an hstacked frame, whose feature columns are named feature.model_id (see hstack).
+
+    Parameters
+    ----------
+    columns: list
+        Columns of the hstacked frame. The key and input columns are skipped
+
+    Returns
+    -------
+    blocks: dict
+        Mapping of model_id to the list of (position in columns, feature name) of its columns, in frame order
+    """
+    blocks = {}
+    for i, c in enumerate(columns):
+        if c in ("key", "input"):
+            continue
+        feature, _, model_id = str(c).rpartition(".")
+        if not feature or not is_model_id_valid(model_id):
+            raise Exception("Column {0} does not end with a model_id. Use the output of hstack".format(c))
+        blocks.setdefault(model_id, []).append((i, feature))
+    return blocks
+
+
+class ModelTransformers:
+    """
+    Fitted Scale or Quantize transformers of many models, to transform hstacked frames in one call.
+
+    Transformers are loaded on first use from model_dir/<model_id>/<kind>, the layout written by fit_models,
+    and kept for the next calls.
+
+    Parameters
+    ----------
+    model_dir: str
+        Directory with the fitted artifacts of the models
+    kind: str
+        "scale" or "quantize"
+    n_jobs: int
+        Threads transforming the blocks of different models (default: number of CPUs)
+    dtype: data type
+        Data type of the output matrix (default float32, which holds the quantized codes exactly)
+    """
+
+    def __init__(self, model_dir: str, kind: str = "scale", n_jobs: int = None, dtype: any = np.float32):
+        if kind not in KINDS:
+            raise Exception("Unknown transformer kind {0}. Use one of {1}".format(kind, ", ".join(KINDS)))
+        self.model_dir = model_dir
+        self.kind = kind
+        self.n_jobs = n_jobs
+        self.dtype = np.dtype(dtype)
+        self._transformers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_id: str):
+        """
+        Fitted transformer of a model, loaded once.
+        """
+        with self._lock:
+            if model_id in self._transformers:
+                return self._transformers[model_id]
+        from eosframes.transformers.scale import Scale
+        from eosframes.transformers.quantize import Quantize
+
+        cls = Scale if self.kind == "scale" else Quantize
+        transformer = cls.load(model_id, model_dir=os.path.join(self.model_dir, model_id, self.kind))
+        with self._lock:
+            return self._transformers.setdefault(model_id, transformer)
+
+    def transform(self, df):
+        """
+        Transform every model block of an hstacked frame with the transformer of its model.
+
+        Blocks are transformed in parallel threads and written into a single preallocated output matrix.
+        Blocks with only some of the trained columns of a model are transformed with those columns only;
+        columns that the transformer skipped when fitting (e.g. mostly empty) are dropped.
+
+        Parameters
+        ----------
+        df: pd.DataFrame or ErsiliaFrame
+            Output of hstack, with columns named feature.model_id
+
+        Returns
+        -------
+        df: pd.DataFrame or ErsiliaFrame
+            Transformed frame with the key and input of df and columns named feature.model_id
+        """
+        frame = isinstance(df, ErsiliaFrame)
+        columns = df.features if frame else list(df.columns)
+        blocks = model_blocks(columns)
+        with span("transform_models.load", models=len(blocks), kind=self.kind):
+            with ThreadPoolExecutor(self._threads(len(blocks))) as pool:
+                transformers = dict(zip(blocks, pool.map(self.get, blocks)))
+
+        # output layout: the trained columns of every block, in frame order
+        tasks, features, start = [], [], 0
+        for model_id, block in blocks.items():
+            trained = set(transformers[model_id].feature_cols)
+            block = [(i, f) for i, f in block if f in trained]
+            if not block:
+                continue
+            tasks.append((model_id, block, start))
+            features += [f + "." + model_id for _, f in block]
+            start += len(block)
+
+        n_rows = len(df)
+        with span("transform_models", rows=n_rows, models=len(tasks), columns=start, kind=self.kind):
+            Y = np.empty((n_rows, start), dtype=self.dtype)
+
+            def work(task):
+                model_id, block, out = task
+                transformer = transformers[model_id]
+                names = [f for _, f in block]
+                with span("transform_models.block", rows=n_rows, model_id=model_id):
+                    X = self._block(df, [i for i, _ in block], names, model_id)
+                    subset = None if names == transformer.feature_cols else names
+                    result = transformer.transform(X, columns=subset)
+                    Y[:, out:out + len(block)] = result.values if frame else result.to_numpy()
+
+            with ThreadPoolExecutor(self._threads(len(tasks))) as pool:
+                list(pool.map(work, tasks))
+
+        if frame:
+            return ErsiliaFrame(Y, features, key=df.key, input=df.input)
+        ids = [c for c in ("key", "input") if c in columns]
+        return pd.concat([df[ids], pd.DataFrame(Y, index=df.index, columns=features, copy=False)], axis=1)
+
+    def _threads(self, n_tasks: int) -> int:
+        return max(1, min(self.n_jobs or os.cpu_count() or 1, n_tasks))
+
+    @staticmethod
+    def _block(df, positions: list, names: list, model_id: str):
+        """
+        Columns of one model, with their feature names, without copying contiguous blocks of an ErsiliaFrame.
+        """
+        if isinstance(df, ErsiliaFrame):
+            contiguous = positions[-1] - positions[0] + 1 == len(positions)
+            cols = slice(positions[0], positions[-1] + 1) if contiguous else positions
+            return ErsiliaFrame(df.values[:, cols], names, model_id=model_id, key=df.key, input=df.input)
+        X = df.iloc[:, positions]
+        X.columns = names
+        return X
+
+
+def transform_models(df, model_dir: str, kind: str = "scale", n_jobs: int = None, dtype: any = np.float32):
+    """
+    Transform an hstacked frame of many models with their fitted transformers (see ModelTransformers).
+    Keep a ModelTransformers to reuse the loaded transformers across calls.
+
+    Parameters
+    ----------
+    df: pd.DataFrame or ErsiliaFrame
+        Output of hstack, with columns named feature.model_id
+    model_dir: str
+        Directory with the fitted artifacts of the models, as written by fit_models
+    kind: str
+        "scale" or "quantize"
+    n_jobs: int
+        Threads transforming the blocks of different models (default: number of CPUs)
+    dtype: data type
+        Data type of the transformed values (default float32)
+
+    Returns
+    -------
+    df: pd.DataFrame or ErsiliaFrame
+        Transformed frame with columns named feature.model_id
+    """
+    return ModelTransformers(model_dir, kind=kind, n_jobs=n_jobs, dtype=dtype).transform(df)
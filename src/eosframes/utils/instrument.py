@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+
+# Instrumentation is disabled by default: span() then returns a shared no-op context manager.
+_state = {"enabled": False, "sinks": [], "memory": False, "started_tracemalloc": False}
+_local = threading.local()
+
+
+def _rss_bytes():
+    """
+    Resident set size of the current process in bytes, or None if it cannot be measured.
+    """
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _NoopSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """
+    Timed stage of work. Set .rows inside the block if the row count is only known at the end.
+    """
+
+    __slots__ = ("name", "rows", "attrs", "_t0", "_rss0", "_mem0")
+
+    def __init__(self, name: str, rows: int = None, **attrs):
+        parent = getattr(_local, "stack", None)
+        self.name = parent[-1].name + "/" + name if parent else name
+        self.rows = rows
+        self.attrs = attrs
+
+    def __enter__(self):
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+        _local.stack.append(self)
+        self._rss0 = _rss_bytes() if _state["memory"] else None
+        self._mem0 = tracemalloc.get_traced_memory()[0] if _state["memory"] and tracemalloc.is_tracing() else None
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        _local.stack.pop()
+        record = {
+            "span": self.name,
+            "timestamp": time.time(),
+            "seconds": seconds,
+            "rows": self.rows,
+            "rows_per_second": self.rows / seconds if self.rows is not None and seconds > 0 else None,
+            "error": exc_type.__name__ if exc_type is not None else None,
+        }
+        if self._rss0 is not None:
+            record["rss_delta_mb"] = (_rss_bytes() - self._rss0) / 1024 ** 2
+        if self._mem0 is not None:
+            record["traced_delta_mb"] = (tracemalloc.get_traced_memory()[0] - self._mem0) / 1024 ** 2
+        record.update(self.attrs)
+        for sink in _state["sinks"]:
+            sink.record(record)
+        return False
+
+
+def span(name: str, rows: int = None, **attrs):
+    """
+    Context manager measuring a stage of work (wall time, rows/sec and, optionally, memory deltas).
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage. Nested spans are reported as "outer/inner".
+    rows: int
+        Number of rows processed by the stage, if known in advance.
+    attrs:
+        Extra fields added to the record (e.g. model_id).
+
+    Returns
+    -------
+    Span
+        The span, or a shared no-op object when instrumentation is disabled.
+    """
+    if not _state["enabled"]:
+        return _NOOP
+    return Span(name, rows, **attrs)
+
+
+def enable(*sinks, memory: bool = False) -> None:
+    """
+    Turn on instrumentation and send every finished span to the given sinks.
+
+    Parameters
+    ----------
+    sinks:
+        LoggingSink, JsonLinesSink, PrometheusSink or any object with a record(dict) method.
+        Defaults to a LoggingSink.
+    memory: bool
+        Also record RSS and tracemalloc deltas. Starts tracemalloc if it is not running yet, which slows down allocations.
+    """
+    _state["sinks"] = list(sinks) or [LoggingSink()]
+    _state["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state["started_tracemalloc"] = True
+    _state["enabled"] = True
+
+
+def disable() -> None:
+    """
+    Turn off instrumentation and flush the sinks.
+    Stops tracemalloc only if enable() started it.
+    """
+    _state["enabled"] = False
+    for sink in _state["sinks"]:
+        if hasattr(sink, "close"):
+            sink.close()
+    _state["sinks"] = []
+    if _state["started_tracemalloc"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state["started_tracemalloc"] = False
+    _state["memory"] = False
+
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+
+class LoggingSink:
+    """
+    Log every span with the standard logging module.
+    """
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("eosframes")
+        self.level = level
+
+    def record(self, record: dict):
+        message = "{0}: {1:.4f}s".format(record["span"], record["seconds"])
+        if record.get("rows_per_second") is not None:
+            message += ", {0} rows ({1:,.0f} rows/s)".format(record["rows"], record["rows_per_second"])
+        if record.get("rss_delta_mb") is not None:
+            message += ", RSS {0:+.1f} MB".format(record["rss_delta_mb"])
+        if record.get("traced_delta_mb") is not None:
+            message += ", traced {0:+.1f} MB".format(record["traced_delta_mb"])
+        self.logger.log(self.level, message)
+
+
+class JsonLinesSink:
+    """
+    Append every span as one JSON object per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+
+    def record(self, record: dict):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusSink:
+    """
+    Aggregate spans into counters written in the Prometheus text format,
+    e.g. for the node_exporter textfile collector.
+    The file is rewritten at most every `interval` seconds (never if None) while spans are recorded, and on close().
+    """
+
+    def __init__(self, path: str, prefix: str = "eosframes", interval: float = 10.0):
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._written = time.monotonic()
+
+    def record(self, record: dict):
+        with self._lock:
+            totals = self._totals.setdefault(record["span"], {"calls": 0, "seconds": 0.0, "rows": 0, "errors": 0})
+            totals["calls"] += 1
+            totals["seconds"] += record["seconds"]
+            totals["rows"] += record["rows"] or 0
+            totals["errors"] += record["error"] is not None
+            if self.interval is not None and time.monotonic() - self._written >= self.interval:
+                self._write()
+
+    def close(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        lines = []
+        for metric, help_text in [
+            ("calls", "Number of finished spans"),
+            ("seconds", "Total wall time of the spans in seconds"),
+            ("rows", "Total rows processed by the spans"),
+            ("errors", "Number of spans that raised an exception"),
+        ]:
+            name = "{0}_span_{1}_total".format(self.prefix, metric)
+            lines += ["# HELP {0} {1}".format(name, help_text), "# TYPE {0} counter".format(name)]
+            for span_name, totals in sorted(self._totals.items()):
+                lines += ['{0}{{span="{1}"}} {2}'.format(name, span_name, totals[metric])]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # scrapers never see a partially written file
+        os.replace(tmp_path, self.path)
+        self._written = time.monotonic()
@@ -0,0 +1,170 @@
+import operator
+import warnings
+import numpy as np
+import pandas as pd
+
+# A predicate is a (column, operator, value) tuple, e.g. ("score", ">", 0.9) or ("key", "in", keys).
+# A list of predicates matches the rows where all of them hold.
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": None,
+}
+
+
+def validate_where(where) -> list:
+    """
+    Check a list of predicates and return it as a list of (column, operator, value) tuples.
+
+    Parameters
+    ----------
+    where: list or tuple
+        A single (column, operator, value) predicate or a list of them
+
+    Returns
+    -------
+    list
+        List of predicates
+    """
+    if where is None:
+        return []
+    if isinstance(where, tuple):
+        where = [where]
+    predicates = []
+    for predicate in where:
+        if len(predicate) != 3:
+            raise Exception("Predicate {0} must be a (column, operator, value) tuple".format(predicate))
+        column, op, value = predicate
+        if op not in OPERATORS:
+            raise Exception("Unknown operator {0}. Valid operators are {1}".format(op, list(OPERATORS)))
+        if op == "in":
+            value = list(value)
+        predicates += [(column, op, value)]
+    return predicates
+
+
+def block_stats(values: np.ndarray, dtypes: list = None) -> dict:
+    """
+    Minimum, maximum and NaN count of every column of a block of rows.
+    Columns without values have NaN minimum and maximum.
+
+    The minimum and maximum are widened outward by one unit in the last place of the dtype of the column,
+    so that a block is never skipped for a row that row_mask would keep: float32 values are compared
+    in float32, and values written as text are parsed back as float64.
+
+    Parameters
+    ----------
+    values: np.ndarray
+        2D array with the rows of the block
+    dtypes: list
+        Data type of every column as stored, by default the dtype of values
+
+    Returns
+    -------
+    dict
+        Arrays "min", "max" and "nan_count", with one entry per column
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    with warnings.catch_warnings():
+        # all-NaN columns are expected
+        warnings.simplefilter("ignore", RuntimeWarning)
+        minimum = np.nanmin(values, axis=0) if len(values) else np.full(values.shape[1], np.nan)
+        maximum = np.nanmax(values, axis=0) if len(values) else np.full(values.shape[1], np.nan)
+    minimum, maximum = minimum.astype(np.float64), maximum.astype(np.float64)
+    dtypes = [values.dtype] * values.shape[1] if dtypes is None else [np.dtype(getattr(d, "numpy_dtype", d)) for d in dtypes]
+    for dtype in set(dtypes):
+        columns = [j for j, d in enumerate(dtypes) if d == dtype]
+        # integers are widened in float64, which holds them exactly up to 2**53
+        dtype = dtype if dtype.kind == "f" else np.dtype(np.float64)
+        minimum[columns] = np.nextafter(minimum[columns].astype(dtype), dtype.type(-np.inf)).astype(np.float64)
+        maximum[columns] = np.nextafter(maximum[columns].astype(dtype), dtype.type(np.inf)).astype(np.float64)
+    return {"min": minimum, "max": maximum, "nan_count": np.isnan(values).sum(axis=0)}
+
+
+def blocks_may_match(where: list, minimum: dict, maximum: dict, n_blocks: int) -> np.ndarray:
+    """
+    Blocks of rows that can contain rows matching all the predicates, given the minimum and maximum
+    of the columns in every block. Columns without statistics never exclude a block.
+
+    Parameters
+    ----------
+    where: list
+        List of predicates
+    minimum: dict
+        Column name -> array with the minimum of the column in every block
+    maximum: dict
+        Column name -> array with the maximum of the column in every block
+    n_blocks: int
+        Number of blocks
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True for the blocks that must be read
+    """
+    keep = np.ones(n_blocks, dtype=bool)
+    for column, op, value in where:
+        if column not in minimum:
+            continue
+        low, high = np.asarray(minimum[column]), np.asarray(maximum[column])
+        if op == "in":
+            if low.dtype.kind in "US":
+                candidates = np.sort(np.asarray([str(v) for v in value], dtype=str))
+            else:
+                candidates = np.sort(np.asarray(value, dtype=np.float64))
+            if len(candidates) == 0:
+                keep[:] = False
+                continue
+            # smallest candidate not below the block minimum must not exceed the block maximum
+            position = np.searchsorted(candidates, low, side="left")
+            inside = position < len(candidates)
+            keep &= inside & (candidates[np.minimum(position, len(candidates) - 1)] <= high)
+        elif op == ">":
+            keep &= high > value
+        elif op == ">=":
+            keep &= high >= value
+        elif op == "<":
+            keep &= low < value
+        elif op == "<=":
+            keep &= low <= value
+        elif op == "==":
+            keep &= (low <= value) & (high >= value)
+        elif op == "!=":
+            keep &= ~((low == value) & (high == value))
+    return keep
+
+
+def row_mask(df: pd.DataFrame, where: list) -> np.ndarray:
+    """
+    Rows of a DataFrame matching all the predicates. NaN values never match.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to filter
+    where: list
+        List of predicates
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True for the matching rows
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in where:
+        if column not in df.columns:
+            raise Exception("Column {0} of the predicate is not in the data".format(column))
+        if op == "in":
+            matched = df[column].isin(value)
+        else:
+            matched = OPERATORS[op](df[column], value)
+            if op == "!=":
+                matched &= df[column].notna()
+        mask &= np.asarray(matched, dtype=bool)
+    return mask
@@ -1,9 +1,70 @@
+import os
 import re
+import numpy as np
 import pandas as pd
-import requests
 
 
-def chunker(df: pd.DataFrame, chunksize: int = 10000):
+# share of the available memory used by the batches of one loop when no budget is given
+DEFAULT_MEMORY_FRACTION = 0.25
+# budget when the available memory cannot be measured
+DEFAULT_MEMORY_BUDGET = 512 * 1024 ** 2
+# bytes per row besides the feature values: key and input strings, index
+ROW_OVERHEAD_BYTES = 128
+MAX_BATCH_ROWS = 1000000
+
+
+def available_memory() -> int:
+    """
+    Memory available to new allocations in bytes, or None if it cannot be measured.
+    """
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def plan_batch_size(n_columns: int, dtype: any = np.float64, memory_budget=None, copies: int = 4, max_rows: int = MAX_BATCH_ROWS) -> int:
+    """
+    Number of rows per batch so that a batch fits in a memory budget, given the width of the data.
+
+    Parameters
+    ----------
+    n_columns: int
+        Number of feature columns
+    dtype: data type
+        Data type of the values while they are processed (default float64)
+    memory_budget: int or str
+        Memory for the batches in bytes, or a size such as "2G". By default a quarter of the available memory
+    copies: int
+        Number of batch-sized arrays alive at once, e.g. the input, intermediate results and the output (default 4)
+    max_rows: int
+        Upper bound of the batch size
+
+    Returns
+    -------
+    int
+        Rows per batch, at least 1
+    """
+    if memory_budget is None:
+        available = available_memory()
+        memory_budget = int(available * DEFAULT_MEMORY_FRACTION) if available else DEFAULT_MEMORY_BUDGET
+    elif isinstance(memory_budget, str):
+        memory_budget = parse_memory_size(memory_budget)
+    row_bytes = (max(int(n_columns), 1) * np.dtype(dtype).itemsize + ROW_OVERHEAD_BYTES) * max(int(copies), 1)
+    return int(min(max(memory_budget // row_bytes, 1), max_rows))
+
+
+def chunker(df: pd.DataFrame, chunksize: int = None):
     """
     Generator that yields chunks of the input DataFrame.
 
@@ -12,13 +73,15 @@ def chunker(df: pd.DataFrame, chunksize: int = 10000):
     df: pd.DataFrame
         The DataFrame to be chunked.
     chunksize: int
-        The number of rows per chunk (default=10000).
+        The number of rows per chunk. By default planned from the number of columns and the available memory (see plan_batch_size).
 
     Yields
     ------
     pd.DataFrame
         A chunk of the original DataFrame.
     """
+    if chunksize is None:
+        chunksize = plan_batch_size(df.shape[1])
     for start in range(0, len(df), chunksize):
         yield df.iloc[start:start + chunksize]
 
@@ -70,7 +133,7 @@ def is_model_id_valid(model_id: str) -> bool:
     return True
 
 
-def get_run_columns(model_id: str) -> pd.DataFrame:
+def get_run_columns(model_id: str, cache_dir: str = None) -> pd.DataFrame:
     """
     Fetch run_columns.csv from a given repository under ersilia-os.
 
@@ -78,16 +141,65 @@ def get_run_columns(model_id: str) -> pd.DataFrame:
     ----------
     model_id : str
         Repository name inside the ersilia-os org (e.g. "eos4e40").
+    cache_dir : str
+        Optional directory where the file is cached as <model_id>_run_columns.csv.
+        A cached file is read instead of fetching it again.
 
     Returns
     -------
     pd.DataFrame
         The CSV contents as a pandas DataFrame.
     """
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, "{0}_run_columns.csv".format(model_id))
+        if os.path.exists(cache_path):
+            return pd.read_csv(cache_path)
     repo = model_id
     branch = "main"
     url = f"https://raw.githubusercontent.com/ersilia-os/{repo}/{branch}/model/framework/columns/run_columns.csv"
-    return pd.read_csv(url)
+    dc = pd.read_csv(url)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        dc.to_csv(cache_path, index=False)
+    return dc
+
+
+# run_columns.csv type -> datatype in default.VALID_DATATYPES
+RUN_COLUMN_TYPES = {
+    "float": np.float32,
+    "integer": np.int8,
+    "string": str,
+}
+
+
+def get_column_schema(run_columns) -> dict:
+    """
+    Build a column schema (column name -> datatype) from the run_columns metadata of a model.
+    The "key" and "input" columns are always strings.
+
+    Parameters
+    ----------
+    run_columns : pd.DataFrame or str
+        The run_columns table, as returned by get_run_columns, or the path to a run_columns.csv file.
+
+    Returns
+    -------
+    dict
+        Mapping of column names to np.float32, np.int8 or str.
+    """
+    if isinstance(run_columns, str):
+        if not os.path.exists(run_columns):
+            raise Exception("File {0} does not exist".format(run_columns))
+        run_columns = pd.read_csv(run_columns)
+    if "name" not in run_columns.columns or "type" not in run_columns.columns:
+        raise Exception("The run_columns table must contain the columns 'name' and 'type'")
+    schema = {"key": str, "input": str}
+    for name, type_ in zip(run_columns["name"], run_columns["type"]):
+        type_ = str(type_).strip().lower()
+        if type_ not in RUN_COLUMN_TYPES:
+            raise Exception("Column {0} has an unknown type {1}. Valid types are {2}".format(name, type_, list(RUN_COLUMN_TYPES)))
+        schema[name] = RUN_COLUMN_TYPES[type_]
+    return schema
 
 
 def get_model_slug(model_id: str) -> str:
@@ -108,6 +220,8 @@ def get_model_slug(model_id: str) -> str:
     repo = model_id
     branch = "main"
     url = f"https://raw.githubusercontent.com/ersilia-os/{repo}/{branch}/README.md"
+    import requests
+
     response = requests.get(url)
     response.raise_for_status()
     text = response.text
@@ -136,6 +250,8 @@ def get_model_title(model_id: str) -> str:
     repo = model_id
     branch = "main"
     url = f"https://raw.githubusercontent.com/ersilia-os/{repo}/{branch}/README.md"
+    import requests
+
     response = requests.get(url)
     response.raise_for_status()
     text = response.text
@@ -170,4 +286,24 @@ def get_colors(n: int) -> list:
         return google_sheets_colors[:n]
     else:
         # Repeat colors if n exceeds the default palette size
-        return (google_sheets_colors * (n // len(google_sheets_colors) + 1))[:n]
\ No newline at end of file
+        return (google_sheets_colors * (n // len(google_sheets_colors) + 1))[:n]
+
+def parse_memory_size(text: str) -> int:
+    """
+    Parse a human readable memory size into a number of bytes.
+
+    Parameters
+    ----------
+    text: str
+        Memory size such as "512M", "4G" or "1073741824" (plain numbers are bytes).
+
+    Returns
+    -------
+    int
+        Number of bytes.
+    """
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    text = str(text).strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
@@ -1,8 +1,13 @@
 import os
-import h5py
+import json
+import numpy as np
 import pandas as pd
 
-from ..utils.utils import chunker, get_model_id_from_path, is_model_id_valid, get_colors, get_model_slug, get_model_title, get_run_columns
+from ..default import CHUNKS_MANIFEST_FILE, CHUNK_EXTENSIONS
+from ..frame.frame import as_pandas
+from ..utils.utils import DEFAULT_MEMORY_BUDGET, chunker, plan_batch_size, get_model_id_from_path, is_model_id_valid, get_colors, get_model_slug, get_model_title, get_run_columns
+from ..utils.instrument import span
+from ..utils.predicates import block_stats
 
 
 def write_csv(df: pd.DataFrame, csv_path: str) -> None:
@@ -12,7 +17,7 @@ def write_csv(df: pd.DataFrame, csv_path: str) -> None:
     Parameters
     ----------
     df: pd.DataFrame
-        DataFrame to save
+        DataFrame or ErsiliaFrame to save
     file_path: str
         Path to the CSV file to create
     
@@ -20,6 +25,7 @@ def write_csv(df: pd.DataFrame, csv_path: str) -> None:
     -------
     None
     """
+    df = as_pandas(df)
     if os.path.exists(csv_path):
         raise Exception("File {0} exists. Please remove it before saving".format(csv_path))
     if not csv_path.endswith(".csv"):
@@ -33,26 +39,184 @@ def write_csv(df: pd.DataFrame, csv_path: str) -> None:
     if model_id_0 != model_id_1:
         raise Exception("Model_id from file name ({0}) does not match model_id from DataFrame ({1})".format(model_id_0, model_id_1))
     df = df.reset_index(drop=True)
-    df.to_csv(csv_path, index=False)
+    with span("write_csv", rows=len(df), model_id=model_id_0):
+        df.to_csv(csv_path, index=False)
 
 
-def write_h5(df: pd.DataFrame, h5_path: str, dtype: any) -> None:
+def _encode_strings(values: pd.Series, strings: str):
+    """
+    Strings of a column ready for h5py, with the matching HDF5 datatype.
+    Variable-length datasets take an object array. Fixed-width datasets take a UTF-8 byte array
+    encoded in bulk by numpy, which is much faster to write and read back.
+    """
+    import h5py
+
+    if strings == "variable":
+        return values.astype(str).to_numpy(dtype=object), h5py.string_dtype(encoding="utf-8")
+    text = values.astype(str).to_numpy(dtype="U")
+    # ASCII strings (keys and nearly all SMILES) are encoded with a single numpy cast,
+    # only the others go through the UTF-8 encoder
+    non_ascii = (text.view(np.uint32).reshape(len(text), text.dtype.itemsize // 4) > 127).any(axis=1)
+    encoded = np.char.encode(text[non_ascii], "utf-8") if non_ascii.any() else None
+    if encoded is not None:
+        text[non_ascii] = ""
+    width = max(1, text.dtype.itemsize // 4, encoded.dtype.itemsize if encoded is not None else 0)
+    dt = h5py.string_dtype(encoding="utf-8", length=width)
+    data = text.astype(dt)
+    if encoded is not None:
+        data[non_ascii] = encoded
+    return data, dt
+
+
+def _binary_columns(df: pd.DataFrame, columns: list, chunksize: int = None) -> list:
+    """
+    Feature columns whose values are all 0 or 1, checked in row chunks to bound the memory used.
+    """
+    if not columns or df.shape[0] == 0:
+        return []
+    binary = np.ones(len(columns), dtype=bool)
+    for chunk in chunker(df[columns], chunksize or plan_batch_size(len(columns), copies=3)):
+        values = chunk.to_numpy()
+        binary &= ((values == 0) | (values == 1)).all(axis=0)
+        if not binary.any():
+            return []
+    return [c for c, b in zip(columns, binary) if b]
+
+
+# quantization codes are in [-CODE_OFFSET, CODE_OFFSET]
+CODE_OFFSET = 127
+N_CODES = 2 * CODE_OFFSET + 1
+# int8 code of missing values in quantized files, outside the range of the quantization codes
+MISSING_CODE = -128
+
+
+def _code_values(values: np.ndarray, codes: np.ndarray, chunksize: int = None) -> np.ndarray:
+    """
+    Dequantization table of shape (features, N_CODES): the mean original value of the rows
+    that received every code, in each column. Codes are monotonic in the original values, so codes
+    that no observed row received (e.g. those of imputed values) are interpolated from their neighbours.
+    Columns without observed values are NaN.
+    """
+    n_features = values.shape[1]
+    offsets = np.arange(n_features, dtype=np.int64) * N_CODES + CODE_OFFSET
+    sums = np.zeros(n_features * N_CODES)
+    counts = np.zeros(n_features * N_CODES)
+    # int64 codes, mask and selected values
+    chunksize = chunksize or plan_batch_size(n_features, np.int64, copies=4)
+    for start in range(0, values.shape[0], chunksize):
+        v = values[start:start + chunksize]
+        c = codes[start:start + chunksize].astype(np.int64) + offsets
+        observed = ~np.isnan(v)
+        sums += np.bincount(c[observed], weights=v[observed], minlength=n_features * N_CODES)
+        counts += np.bincount(c[observed], minlength=n_features * N_CODES)
+    table = np.full(n_features * N_CODES, np.nan)
+    np.divide(sums, counts, out=table, where=counts > 0)
+    table = table.reshape(n_features, N_CODES)
+    grid = np.arange(N_CODES)
+    for j in np.flatnonzero(np.isnan(table).any(axis=1)):
+        seen = ~np.isnan(table[j])
+        if seen.any():
+            table[j] = np.interp(grid, grid[seen], table[j, seen])
+    return table
+
+
+# rows of the sorted keys covered by every entry of the in-memory fence array of the key index
+KEY_INDEX_BLOCK = 256
+
+
+def _write_key_index(f, keys: pd.Series) -> None:
+    """
+    Write a key index to an open HDF5 file: the keys sorted as fixed-width UTF-8 bytes, the row of every
+    sorted key, and every KEY_INDEX_BLOCK-th sorted key as fences, so that a lookup reads the fences
+    and one block of keys per searched key. Empty frames get empty keys, rows and fences.
+    """
+    data, dt = _encode_strings(keys, "fixed")
+    order = np.argsort(data, kind="stable")
+    data = data[order]
+    group = f.create_group("key_index")
+    group.attrs["block_size"] = KEY_INDEX_BLOCK
+    group.create_dataset("keys", data=data, dtype=dt)
+    group.create_dataset("rows", data=order.astype(np.int64))
+    group.create_dataset("fences", data=data[::KEY_INDEX_BLOCK], dtype=dt)
+
+
+# rows per block of the statistics used to skip blocks when reading with predicates
+STATS_BLOCK_ROWS = 100000
+
+
+def _write_block_stats(f, values: np.ndarray, dtype, keys: pd.Series = None) -> None:
+    """
+    Write the minimum, maximum and NaN count of every feature, and the key range, of every block of STATS_BLOCK_ROWS rows.
+    """
+    n_rows, n_features = values.shape
+    n_blocks = (n_rows + STATS_BLOCK_ROWS - 1) // STATS_BLOCK_ROWS
+    minimum = np.empty((n_blocks, n_features), dtype=np.float64)
+    maximum = np.empty((n_blocks, n_features), dtype=np.float64)
+    nan_count = np.empty((n_blocks, n_features), dtype=np.int64)
+    rows = []
+    key_min, key_max = [], []
+    for b in range(n_blocks):
+        start, stop = b * STATS_BLOCK_ROWS, min((b + 1) * STATS_BLOCK_ROWS, n_rows)
+        # statistics of the values as stored
+        stats = block_stats(np.asarray(values[start:stop], dtype=dtype))
+        minimum[b], maximum[b], nan_count[b] = stats["min"], stats["max"], stats["nan_count"]
+        rows += [stop - start]
+        if keys is not None:
+            block_keys = keys.iloc[start:stop].astype(str)
+            key_min += [block_keys.min()]
+            key_max += [block_keys.max()]
+    _write_stats_group(f, minimum, maximum, nan_count, rows, key_min if keys is not None else None, key_max)
+
+
+def _write_stats_group(f, minimum: np.ndarray, maximum: np.ndarray, nan_count: np.ndarray, rows: list, key_min: list = None, key_max: list = None) -> None:
+    import h5py
+
+    group = f.create_group("stats")
+    group.attrs["block_size"] = STATS_BLOCK_ROWS
+    group.create_dataset("min", data=minimum, dtype=np.float64)
+    group.create_dataset("max", data=maximum, dtype=np.float64)
+    group.create_dataset("nan_count", data=nan_count, dtype=np.int64)
+    group.create_dataset("rows", data=np.array(rows, dtype=np.int64))
+    if key_min is not None:
+        dt = h5py.string_dtype(encoding="utf-8")
+        group.create_dataset("key_min", data=key_min, dtype=dt)
+        group.create_dataset("key_max", data=key_max, dtype=dt)
+
+
+def write_h5(df: pd.DataFrame, h5_path: str, dtype: any, strings: str = "variable", pack_binary: bool = False, quantizer=None, key_index: bool = False, stats: bool = True) -> None:
     """
     Save DataFrame as HDF5 file in Ersilia
     
     ---
     Parameters
     df: pd.DataFrame
-        DataFrame to save
+        DataFrame or ErsiliaFrame to save
     h5_path: str
         Path to the HDF5 file to create
     dtype: data type
         Data type for the feature values
+    strings: str
+        Storage of the key and input strings: "variable" for variable-length UTF-8 strings (default),
+        or "fixed" for fixed-width UTF-8 strings padded to the longest value, which avoids
+        per-string Python objects when reading with read_h5(..., strings="pyarrow" or "category")
+    pack_binary: bool
+        Store the feature columns whose values are all 0/1 (e.g. fingerprints) as bits with np.packbits,
+        8 per byte, in a "bits" dataset next to "values". read_h5 unpacks them, read_bits returns them packed.
+    quantizer: Quantize
+        Optional fitted Quantize transformer. The features are then stored as its int8 codes (dtype must be int8),
+        together with a "code_values" table with the mean original value of every code in every column,
+        so that read.dequantize can reconstruct approximate values. Only the features of the quantizer are stored.
+    key_index: bool
+        Also write a sorted index of the keys, so that read.lookup can fetch rows by key without reading the whole file
+    stats: bool
+        Write the minimum, maximum and NaN count of the features and the key range of every block of rows (default),
+        so that read_h5(..., where=...) skips the blocks that cannot match. Not written for quantized files.
 
     ---
     Returns
     None
     """
+    df = as_pandas(df)
     if os.path.exists(h5_path):
         raise Exception("File {0} exists. Please remove it before saving".format(h5_path))
     model_id_0 = get_model_id_from_path(h5_path)
@@ -63,23 +227,270 @@ def write_h5(df: pd.DataFrame, h5_path: str, dtype: any) -> None:
         raise Exception("DataFrame does not have a model_id attribute")
     if model_id_0 != model_id_1:
         raise Exception("Model_id from file name ({0}) does not match model_id from DataFrame ({1})".format(model_id_0, model_id_1))
+    if strings not in ("variable", "fixed"):
+        raise Exception("Unknown string storage {0}. Use 'variable' or 'fixed'".format(strings))
+    if quantizer is not None:
+        if np.dtype(dtype) != np.int8:
+            raise Exception("Quantized files store int8 codes. Use dtype=np.int8 instead of {0}".format(dtype))
+        if pack_binary:
+            raise Exception("Binary features cannot be packed in quantized files")
+        if not getattr(quantizer, "_is_fitted", False):
+            raise Exception("The quantizer is not fitted")
+    import h5py
+
     df = df.reset_index(drop=True)
-    with h5py.File(h5_path, "w") as f:
+    with span("write_h5", rows=len(df), model_id=model_id_0), h5py.File(h5_path, "w") as f:
         if "key" in df.columns:
-            keys = df["key"].astype(str).tolist()
-            dt = h5py.string_dtype(encoding='utf-8')
+            keys, dt = _encode_strings(df["key"], strings)
             f.create_dataset("key", data=keys, dtype=dt)
-        inputs = df["input"].astype(str).tolist()
-        dt = h5py.string_dtype(encoding='utf-8')
+        inputs, dt = _encode_strings(df["input"], strings)
         f.create_dataset("input", data=inputs, dtype=dt)
+        if key_index:
+            if "key" not in df.columns:
+                raise Exception("DataFrame does not have a 'key' column to index")
+            _write_key_index(f, df["key"])
+        if quantizer is not None:
+            _write_quantized(f, df, quantizer)
+            return
         feature_columns = [c for c in df.columns if c not in set(["key", "input"])]
+        bit_columns = _binary_columns(df, feature_columns) if pack_binary else []
+        value_columns = [c for c in feature_columns if c not in set(bit_columns)]
         dt = h5py.string_dtype(encoding='utf-8')
-        f.create_dataset("features", data=feature_columns, dtype=dt)
-        values = df[feature_columns].values
+        f.create_dataset("features", data=value_columns, dtype=dt)
+        values = df[value_columns].values
         f.create_dataset("values", data=values, dtype=dtype)
+        if stats:
+            _write_block_stats(f, values, dtype, df["key"] if "key" in df.columns else None)
+        if bit_columns:
+            # layout: the bit columns are restored to their original positions among the feature columns
+            positions = {c: i for i, c in enumerate(feature_columns)}
+            f.attrs["layout"] = "packed_bits"
+            f.create_dataset("bit_features", data=bit_columns, dtype=dt)
+            f.create_dataset("bit_positions", data=np.array([positions[c] for c in bit_columns], dtype=np.int32))
+            f.create_dataset("value_positions", data=np.array([positions[c] for c in value_columns], dtype=np.int32))
+            bits = f.create_dataset("bits", shape=(df.shape[0], (len(bit_columns) + 7) // 8), dtype=np.uint8)
+            bits.attrs["n_features"] = len(bit_columns)
+            bits.attrs["bitorder"] = "big"
+            bits.attrs["dtype"] = np.dtype(dtype).str
+            start = 0
+            for chunk in chunker(df[bit_columns], plan_batch_size(len(bit_columns), np.uint8, copies=2)):
+                bits[start:start + len(chunk)] = np.packbits(chunk.to_numpy(dtype=np.uint8), axis=1)
+                start += len(chunk)
+
+
+def _check_model_id(df: pd.DataFrame, path: str) -> str:
+    model_id_0 = get_model_id_from_path(path)
+    if model_id_0 is None:
+        raise Exception("Could not extract model_id from path {0}! The path must contain the model identifier".format(path))
+    model_id_1 = getattr(df, "model_id", None)
+    if model_id_1 is None:
+        raise Exception("DataFrame does not have a model_id attribute")
+    if model_id_0 != model_id_1:
+        raise Exception("Model_id from file name ({0}) does not match model_id from DataFrame ({1})".format(model_id_0, model_id_1))
+    return model_id_0
+
+
+class H5Writer:
+    """
+    Write an Ersilia HDF5 file one batch of rows at a time, e.g. the batches of iter_h5 after a transform.
+    The file has the same layout as write_h5 with variable-length strings, including the block statistics
+    used by read_h5(..., where=...), which are written by close(). Use it as a context manager.
+
+    Parameters
+    ----------
+    h5_path: str
+        Path to the HDF5 file to create
+    dtype: data type
+        Data type for the feature values
+    stats: bool
+        Write the block statistics of the features and keys (default)
+    """
+
+    def __init__(self, h5_path: str, dtype: any, stats: bool = True):
+        if os.path.exists(h5_path):
+            raise Exception("File {0} exists. Please remove it before saving".format(h5_path))
+        if get_model_id_from_path(h5_path) is None:
+            raise Exception("Could not extract model_id from file name {0}! The file name must contain the model identifier".format(h5_path))
+        self.h5_path = h5_path
+        self.dtype = np.dtype(dtype)
+        self.stats = stats
+        self.n_rows = 0
+        self._f = None
+        self._columns = None
+        self._blocks = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a batch (DataFrame or ErsiliaFrame) with the same columns as the first one.
+        """
+        df = as_pandas(df)
+        model_id = _check_model_id(df, self.h5_path)
+        with span("H5Writer.write", rows=len(df), model_id=model_id):
+            feature_columns = [c for c in df.columns if c not in set(["key", "input"])]
+            if self._f is None:
+                self._create(df, feature_columns)
+            elif list(df.columns) != self._columns:
+                raise Exception("Batch columns do not match the columns of the first batch")
+            start, stop = self.n_rows, self.n_rows + len(df)
+            values = df[feature_columns].to_numpy(dtype=self.dtype)
+            names = (["key"] if "key" in df.columns else []) + ["input", "values"]
+            for name in names:
+                self._f[name].resize(stop, axis=0)
+            if "key" in df.columns:
+                self._f["key"][start:stop] = df["key"].astype(str).to_numpy(dtype=object)
+            self._f["input"][start:stop] = df["input"].astype(str).to_numpy(dtype=object)
+            self._f["values"][start:stop] = values
+            if self.stats:
+                self._update_stats(values, df["key"] if "key" in df.columns else None)
+            self.n_rows = stop
+
+    def _create(self, df: pd.DataFrame, feature_columns: list) -> None:
+        import h5py
+
+        self._columns = list(df.columns)
+        self._f = h5py.File(self.h5_path, "w")
+        dt = h5py.string_dtype(encoding="utf-8")
+        if "key" in df.columns:
+            self._f.create_dataset("key", shape=(0,), maxshape=(None,), dtype=dt, chunks=(STATS_BLOCK_ROWS,))
+        self._f.create_dataset("input", shape=(0,), maxshape=(None,), dtype=dt, chunks=(STATS_BLOCK_ROWS,))
+        self._f.create_dataset("features", data=feature_columns, dtype=dt)
+        # chunks of about 1 MB
+        n_features = max(len(feature_columns), 1)
+        chunk_rows = max(1, min(STATS_BLOCK_ROWS, (1 << 20) // (n_features * self.dtype.itemsize)))
+        self._f.create_dataset("values", shape=(0, len(feature_columns)), maxshape=(None, len(feature_columns)), dtype=self.dtype, chunks=(chunk_rows, n_features))
+
+    def _update_stats(self, values: np.ndarray, keys: pd.Series) -> None:
+        """
+        Fold a batch into the statistics of the blocks of STATS_BLOCK_ROWS rows that it overlaps.
+        """
+        offset = 0
+        while offset < len(values):
+            position = self.n_rows + offset
+            if position % STATS_BLOCK_ROWS == 0:
+                self._blocks += [None]
+            size = min(len(values) - offset, STATS_BLOCK_ROWS - position % STATS_BLOCK_ROWS)
+            stats = block_stats(values[offset:offset + size])
+            stats["rows"] = size
+            if keys is not None:
+                block_keys = keys.iloc[offset:offset + size].astype(str)
+                stats["key_min"], stats["key_max"] = block_keys.min(), block_keys.max()
+            previous = self._blocks[-1]
+            if previous is not None:
+                stats["min"] = np.fmin(previous["min"], stats["min"])
+                stats["max"] = np.fmax(previous["max"], stats["max"])
+                stats["nan_count"] = previous["nan_count"] + stats["nan_count"]
+                stats["rows"] += previous["rows"]
+                if keys is not None:
+                    stats["key_min"] = min(previous["key_min"], stats["key_min"])
+                    stats["key_max"] = max(previous["key_max"], stats["key_max"])
+            self._blocks[-1] = stats
+            offset += size
+
+    def close(self) -> None:
+        """
+        Write the block statistics and close the file. Nothing is created if no batch was written.
+        """
+        if self._f is None:
+            return
+        try:
+            if self.stats and self._blocks:
+                has_keys = "key" in self._columns
+                _write_stats_group(
+                    self._f,
+                    np.stack([b["min"] for b in self._blocks]),
+                    np.stack([b["max"] for b in self._blocks]),
+                    np.stack([b["nan_count"] for b in self._blocks]),
+                    [b["rows"] for b in self._blocks],
+                    [b["key_min"] for b in self._blocks] if has_keys else None,
+                    [b["key_max"] for b in self._blocks] if has_keys else None,
+                )
+        finally:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self) -> "H5Writer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _write_quantized(f, df: pd.DataFrame, quantizer) -> None:
+    """
+    Write the int8 codes of the features and the dequantization table to an open HDF5 file.
+    Missing values are written as MISSING_CODE instead of the code of their imputed value.
+    """
+    import h5py
+
+    feature_columns = list(quantizer.feature_cols)
+    codes = quantizer.transform(df).to_numpy().astype(np.int8)
+    values = df.reindex(columns=feature_columns).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    table = _code_values(values, codes)
+    codes[np.isnan(values)] = MISSING_CODE
+    f.attrs["layout"] = "quantized"
+    f.attrs["quantizer_model_id"] = quantizer.model_id
+    if hasattr(quantizer, "fit_timestamp"):
+        f.attrs["fit_timestamp"] = quantizer.fit_timestamp.isoformat()
+    f.create_dataset("features", data=feature_columns, dtype=h5py.string_dtype(encoding='utf-8'))
+    f.create_dataset("values", data=codes, dtype=np.int8)
+    table = f.create_dataset("code_values", data=table, dtype=np.float32)
+    table.attrs["code_offset"] = CODE_OFFSET
+    table.attrs["missing_code"] = MISSING_CODE
+
+
+def _chunk_stats(chunk: pd.DataFrame, file_name: str, columns: list) -> dict:
+    """
+    Manifest entry of a chunk: number of rows, key range and minimum, maximum and NaN count of the numeric features.
+    """
+    stats = block_stats(chunk[columns].to_numpy(dtype=np.float64), chunk[columns].dtypes.tolist())
+    entry = {"file": file_name, "rows": len(chunk)}
+    if "key" in chunk.columns and len(chunk):
+        keys = chunk["key"].astype(str)
+        entry["key_min"], entry["key_max"] = keys.min(), keys.max()
+    # NaN is not valid JSON
+    entry["min"] = [None if np.isnan(v) else float(v) for v in stats["min"]]
+    entry["max"] = [None if np.isnan(v) else float(v) for v in stats["max"]]
+    entry["nan_count"] = [int(v) for v in stats["nan_count"]]
+    return entry
+
+
+# largest chunk of a chunked CSV folder
+MAX_CHUNK_ROWS = 100000
+
+# default compression levels of the chunks: fast levels, since the chunks are mostly read over slow filesystems
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "zstd": 3}
 
 
-def write_chunked_csvs(df: pd.DataFrame, dir_path: str, chunksize: int) -> None:
+def _compression_options(compression: str, level: int = None) -> dict:
+    """
+    pandas to_csv compression options of the chunks, or None for plain CSV files.
+    """
+    if compression is None:
+        return None
+    if compression not in CHUNK_EXTENSIONS:
+        raise Exception("Unknown compression {0}. Use 'gzip' or 'zstd'".format(compression))
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise Exception("zstd compression requires the zstandard package")
+    level = DEFAULT_COMPRESSION_LEVELS[compression] if level is None else level
+    return {"method": compression, "compresslevel" if compression == "gzip" else "level": level}
+
+
+def _plan_chunksize(n_columns: int) -> int:
+    """
+    Rows per chunk file, planned from a fixed memory budget rather than the available memory,
+    so that the same frame is written with the same chunks on every machine.
+    """
+    return plan_batch_size(n_columns, memory_budget=DEFAULT_MEMORY_BUDGET, max_rows=MAX_CHUNK_ROWS)
+
+
+def _chunk_file_name(i: int, compression: str = None) -> str:
+    return "chunk_{0}{1}".format(str(i).zfill(6), CHUNK_EXTENSIONS[compression])
+
+
+def write_chunked_csvs(df: pd.DataFrame, dir_path: str, chunksize: int = None, manifest: bool = True, compression: str = None, compression_level: int = None) -> None:
     """
     This function splits a dataframe into multiple CSV files, each containing a chunk of the original dataframe.
     The CSV files are saved in a specified directory, with filenames indicating their chunk number.
@@ -91,14 +502,27 @@ def write_chunked_csvs(df: pd.DataFrame, dir_path: str, chunksize: int) -> None:
     dir_path: str
         The directory path where the chunked CSV files will be saved.
     chunksize: int
-        The number of rows per chunk.
+        The number of rows per chunk, at most 100000. By default planned from the number of columns and a
+        fixed memory budget (utils.DEFAULT_MEMORY_BUDGET), so that the chunks do not depend on the machine.
+    manifest: bool
+        Write a manifest.json file with the number of rows, key range and minimum, maximum and NaN count of the
+        numeric features of every chunk (default), so that read_chunked_csvs(..., where=...) skips the chunks that cannot match.
+    compression: str
+        Compress every chunk with "gzip" (chunk_000000.csv.gz) or "zstd" (chunk_000000.csv.zst, requires zstandard).
+        Chunks of repeated SMILES and decimal floats shrink several times. Plain CSV files by default.
+    compression_level: int
+        Compression level, higher is smaller and slower (default 6 for gzip, 3 for zstd)
     
     Returns
     -------
     None
     """
-    if chunksize > 100000:
-        raise Exception("Chunksize at Ersilia is currently limited to 100000")
+    df = as_pandas(df)
+    if chunksize is None:
+        chunksize = _plan_chunksize(df.shape[1])
+    if chunksize > MAX_CHUNK_ROWS:
+        raise Exception("Chunksize at Ersilia is currently limited to {0}".format(MAX_CHUNK_ROWS))
+    options = _compression_options(compression, compression_level)
     model_id_0 = get_model_id_from_path(dir_path)
     if model_id_0 is None:
         raise Exception("Could not extract model_id from directory {0}! The directory must contain the model identifier".format(dir_path))
@@ -115,9 +539,91 @@ def write_chunked_csvs(df: pd.DataFrame, dir_path: str, chunksize: int) -> None:
     num_chunks = df.shape[0] / chunksize + 1
     if num_chunks > 999999:
         raise Exception("Too many chunks ({0}). Maximum number of chunks is 999999. Increase the chunksize if you want to process your full daataset".format(num_chunks))
-    for i, chunk in enumerate(chunker(df, chunksize)):
-        file_name = "chunk_{0}.csv".format(str(i).zfill(6))
-        chunk.to_csv(os.path.join(dir_path, file_name), index=False)
+    numeric_columns = [c for c in df.select_dtypes(include="number").columns if c not in set(["key", "input"])]
+    entries = []
+    with span("write_chunked_csvs", rows=len(df), model_id=model_id_0):
+        for i, chunk in enumerate(chunker(df, chunksize)):
+            file_name = _chunk_file_name(i, compression)
+            chunk.to_csv(os.path.join(dir_path, file_name), index=False, compression=options)
+            if manifest:
+                entries += [_chunk_stats(chunk, file_name, numeric_columns)]
+        if manifest:
+            with open(os.path.join(dir_path, CHUNKS_MANIFEST_FILE), "w") as f:
+                json.dump({"model_id": model_id_0, "columns": numeric_columns, "compression": compression, "chunks": entries}, f)
+
+
+class ChunkedCsvWriter:
+    """
+    Write a folder of chunked CSV files, as write_chunked_csvs, one batch of rows at a time.
+    Batches larger than chunksize are split. The manifest is written by close(). Use it as a context manager.
+
+    Parameters
+    ----------
+    dir_path: str
+        The directory path where the chunked CSV files will be saved. It must not exist.
+    chunksize: int
+        Maximum number of rows per chunk, at most 100000. By default planned from the number of columns of the
+        first batch, as in write_chunked_csvs
+    manifest: bool
+        Write the manifest.json file with the statistics of every chunk (default)
+    compression: str
+        Compress every chunk with "gzip" or "zstd", as in write_chunked_csvs
+    compression_level: int
+        Compression level (default 6 for gzip, 3 for zstd)
+    """
+
+    def __init__(self, dir_path: str, chunksize: int = None, manifest: bool = True, compression: str = None, compression_level: int = None):
+        if chunksize is not None and chunksize > MAX_CHUNK_ROWS:
+            raise Exception("Chunksize at Ersilia is currently limited to {0}".format(MAX_CHUNK_ROWS))
+        self._options = _compression_options(compression, compression_level)
+        self.compression = compression
+        if get_model_id_from_path(dir_path) is None:
+            raise Exception("Could not extract model_id from directory {0}! The directory must contain the model identifier".format(dir_path))
+        dir_path = os.path.abspath(dir_path)
+        if os.path.exists(dir_path):
+            raise Exception("Folder {0} exists. Please remove the folder before saving files in there".format(dir_path))
+        os.mkdir(dir_path)
+        self.dir_path = dir_path
+        self.chunksize = chunksize
+        self.manifest = manifest
+        self.n_chunks = 0
+        self._model_id = None
+        self._numeric_columns = None
+        self._entries = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a batch (DataFrame or ErsiliaFrame) as one or more chunk files.
+        """
+        df = as_pandas(df)
+        self._model_id = _check_model_id(df, self.dir_path)
+        if self.chunksize is None:
+            self.chunksize = _plan_chunksize(df.shape[1])
+        if self._numeric_columns is None:
+            self._numeric_columns = [c for c in df.select_dtypes(include="number").columns if c not in set(["key", "input"])]
+        with span("ChunkedCsvWriter.write", rows=len(df), model_id=self._model_id):
+            for chunk in chunker(df.reset_index(drop=True), self.chunksize):
+                if self.n_chunks > 999999:
+                    raise Exception("Too many chunks. Maximum number of chunks is 999999. Increase the chunksize")
+                file_name = _chunk_file_name(self.n_chunks, self.compression)
+                chunk.to_csv(os.path.join(self.dir_path, file_name), index=False, compression=self._options)
+                if self.manifest:
+                    self._entries += [_chunk_stats(chunk, file_name, self._numeric_columns)]
+                self.n_chunks += 1
+
+    def close(self) -> None:
+        """
+        Write the manifest.
+        """
+        if self.manifest and self._model_id is not None:
+            with open(os.path.join(self.dir_path, CHUNKS_MANIFEST_FILE), "w") as f:
+                json.dump({"model_id": self._model_id, "columns": self._numeric_columns, "compression": self.compression, "chunks": self._entries}, f)
+
+    def __enter__(self) -> "ChunkedCsvWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
 
 def write_xlsx(df: pd.DataFrame, xlsx_path: str) -> None:
@@ -127,7 +633,7 @@ def write_xlsx(df: pd.DataFrame, xlsx_path: str) -> None:
     Parameters
     ----------
     df: pd.DataFrame
-        DataFrame to save
+        DataFrame or ErsiliaFrame to save
     xlsx_path: str
         Path to the XLSX file to create
     
@@ -135,6 +641,7 @@ def write_xlsx(df: pd.DataFrame, xlsx_path: str) -> None:
     -------
     None
     """
+    df = as_pandas(df)
     if not xlsx_path.endswith(".xlsx"):
         raise Exception("File {0} must have a .xlsx extension".format(xlsx_path))
     if os.path.exists(xlsx_path):
@@ -0,0 +1,41 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+MODEL_ID = "eos0tst"
+
+
+def make_frame(n_rows: int = 2_000, n_cols: int = 30, model_id: str = MODEL_ID, seed: int = 0, missing: float = 0.0, decimals: int = 2) -> pd.DataFrame:
+    """
+    Synthetic Ersilia output: key, input and a mix of float32 binary, small integer and continuous features.
+    Shared by the tests and the benchmarks.
+
+    Continuous features are rounded to the given decimals, so that they have ties where float32 and float64
+    results can differ (None keeps them unrounded). A fraction `missing` of their values is NaN.
+    The keys and compounds do not depend on the seed, so that frames of different models can be stacked.
+    """
+    rng = np.random.default_rng(seed)
+    compounds = np.array(["C" * (5 + i) + "O" for i in range(40)], dtype=object)
+    data = {
+        "key": pd.Series(np.arange(n_rows)).map("KEY{0:011d}".format),
+        "input": compounds[np.arange(n_rows) % len(compounds)],
+    }
+    for j in range(n_cols):
+        kind = j % 3
+        if kind == 0:
+            values = rng.integers(0, 2, n_rows).astype(np.float32)
+        elif kind == 1:
+            values = rng.integers(0, 8, n_rows).astype(np.float32)
+        else:
+            values = rng.normal(0, 1, n_rows)
+            if decimals is not None:
+                values = np.round(values, decimals)
+            values = values.astype(np.float32)
+        if missing and kind == 2:
+            values[rng.random(n_rows) < missing] = np.nan
+        data["feature_{0:04d}".format(j)] = values
+    df = pd.DataFrame(data)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        df.model_id = model_id
+    return df
@@ -0,0 +1,19 @@
+import warnings
+import pytest
+
+from _frames import make_frame
+
+# exploratory scripts that run on import and need local data files; not tests
+collect_ignore = ["test.py", "test2.py", "test_18.py", "test_pipeline.py", "test_quantize.py", "test_scale_z.py", "zimin_test8"]
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame()
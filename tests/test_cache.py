@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from eosframes.transformers.cache import TransformCache
+from eosframes.transformers.scale import Scale
+
+from _frames import MODEL_ID, make_frame
+
+
+@pytest.fixture
+def scaler(frame):
+    scaler = Scale(model_id=MODEL_ID)
+    scaler.fit(frame)
+    return scaler
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TransformCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def _rows(df, rows):
+    subset = df.iloc[rows]
+    subset.model_id = MODEL_ID
+    return subset
+
+
+class Counting:
+    """
+    Transform function of a scaler that records the number of rows it computes.
+    """
+
+    def __init__(self, scaler):
+        self.scaler = scaler
+        self.calls = []
+
+    def __call__(self, df):
+        self.calls.append(len(df))
+        return self.scaler.transform(df)
+
+
+def test_full_hit(scaler, cache, frame):
+    compute = Counting(scaler)
+    first = cache.transform(scaler, frame, compute)
+    second = cache.transform(scaler, frame, compute)
+    assert compute.calls == [len(frame)]
+    assert cache.hits == len(frame) and cache.misses == len(frame)
+    assert second.index.equals(frame.index)
+    assert np.array_equal(second.to_numpy(), first.to_numpy(), equal_nan=True)
+    assert np.array_equal(scaler.transform(frame, cache=cache).to_numpy(), scaler.transform(frame).to_numpy(), equal_nan=True)
+
+
+def test_partial_hit_in_row_order(scaler, cache, frame):
+    compute = Counting(scaler)
+    cache.transform(scaler, _rows(frame, slice(0, 500)), compute)
+    rows = np.random.default_rng(0).permutation(1000)
+    df = _rows(frame, rows)
+    result = cache.transform(scaler, df, compute)
+    assert compute.calls == [500, 500]
+    assert list(result.index) == list(df.index)
+    assert np.array_equal(result.to_numpy(), scaler.transform(df).to_numpy(), equal_nan=True)
+
+
+def test_refit_invalidates(scaler, cache, frame):
+    compute = Counting(scaler)
+    cache.transform(scaler, frame, compute)
+    scaler.fit(_rows(frame, slice(0, 1000)))
+    result = cache.transform(scaler, frame, compute)
+    assert compute.calls == [len(frame), len(frame)]
+    assert np.array_equal(result.to_numpy(), scaler.transform(frame).to_numpy(), equal_nan=True)
+
+
+def test_eviction_under_max_bytes(scaler, tmp_path, frame):
+    row_bytes = len(scaler.feature_cols) * 4
+    cache = TransformCache(str(tmp_path / "cache.sqlite"), max_bytes=row_bytes * 1500)
+    compute = Counting(scaler)
+    old, new = _rows(frame, slice(0, 1000)), _rows(frame, slice(1000, 2000))
+    cache.transform(scaler, old, compute)
+    cache.transform(scaler, new, compute)
+    size = cache._conn.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+    assert size <= cache.max_bytes
+    # the least recently used rows were evicted, the new ones are still cached
+    cache.transform(scaler, new, compute)
+    cache.transform(scaler, old, compute)
+    assert compute.calls == [1000, 1000, 1000]
+    cache.close()
+
+
+def test_namespace_keeps_its_dtype(scaler, cache, frame):
+    cache.transform(scaler, _rows(frame, slice(0, 1000)), scaler.transform)
+    wide = frame.astype({c: np.float64 for c in scaler.feature_cols})
+    wide.model_id = MODEL_ID
+    cache.transform(scaler, wide, scaler.transform)
+    result = cache.transform(scaler, frame, scaler.transform)
+    assert result.dtypes.eq(np.float32).all()
+    assert np.allclose(result.to_numpy(), scaler.transform(frame).to_numpy(), atol=1e-6, equal_nan=True)
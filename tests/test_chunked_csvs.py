@@ -0,0 +1,23 @@
+import os
+
+import eosframes.utils.utils as utils
+from eosframes.write.write import ChunkedCsvWriter, write_chunked_csvs
+
+from _frames import MODEL_ID, make_frame
+
+
+def test_chunks_do_not_depend_on_available_memory(tmp_path, monkeypatch):
+    df = make_frame(n_rows=3000, n_cols=500)
+    layouts = []
+    for available in (64 * 1024 ** 2, 64 * 1024 ** 3):
+        monkeypatch.setattr(utils, "available_memory", lambda: available)
+        for write in (write_chunked_csvs, _write_batches):
+            path = tmp_path / "{0}-{1}-{2}".format(MODEL_ID, write.__name__, available)
+            write(df, str(path))
+            layouts += [sorted(os.listdir(path))]
+    assert all(layout == layouts[0] for layout in layouts)
+
+
+def _write_batches(df, path):
+    with ChunkedCsvWriter(path) as writer:
+        writer.write(df)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from eosframes.pipeline.convert import convert
+from eosframes.read.read import read_any
+from eosframes.write.write import write_h5
+
+from _frames import MODEL_ID, make_frame
+
+
+def _read(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return read_any(path)
+
+
+def _assert_same(result: pd.DataFrame, df: pd.DataFrame):
+    assert list(result.columns) == list(df.columns)
+    assert result["key"].tolist() == df["key"].tolist()
+    assert result["input"].tolist() == df["input"].tolist()
+    features = df.columns[2:]
+    np.testing.assert_allclose(result[features].to_numpy(np.float64), df[features].to_numpy(np.float64), rtol=1e-6, equal_nan=True)
+
+
+@pytest.mark.parametrize("route", [
+    ["h5", "chunks", "h5"],
+    ["h5", "csv", "h5"],
+    ["h5", "parquet", "h5"],
+    ["h5", "chunks", "csv", "parquet", "chunks", "h5"],
+])
+def test_round_trip(tmp_path, route):
+    if "parquet" in route:
+        pytest.importorskip("pyarrow")
+    df = make_frame(n_rows=1000, n_cols=12, missing=0.05)
+    suffix = {"h5": ".h5", "csv": ".csv", "parquet": ".parquet", "chunks": ""}
+    path = str(tmp_path / "0" / (MODEL_ID + ".h5"))
+    (tmp_path / "0").mkdir()
+    write_h5(df, path, np.float32)
+    for step, fmt in enumerate(route[1:], 1):
+        (tmp_path / str(step)).mkdir()
+        destination = str(tmp_path / str(step) / (MODEL_ID + suffix[fmt]))
+        # small batches, so that every conversion streams several of them
+        convert(path, destination, batch_size=128)
+        _assert_same(_read(destination), df)
+        path = destination
+
+
+def test_mismatched_model_id(tmp_path):
+    source = str(tmp_path / (MODEL_ID + ".h5"))
+    write_h5(make_frame(n_rows=10, n_cols=3), source, np.float32)
+    with pytest.raises(Exception, match="does not match"):
+        convert(source, str(tmp_path / "eos9zzz.csv"))
+
+
+def test_existing_destination(tmp_path):
+    source = str(tmp_path / (MODEL_ID + ".h5"))
+    write_h5(make_frame(n_rows=10, n_cols=3), source, np.float32)
+    destination = tmp_path / "out"
+    destination.mkdir()
+    (destination / (MODEL_ID + ".csv")).write_text("")
+    with pytest.raises(Exception, match="exists"):
+        convert(source, str(destination / (MODEL_ID + ".csv")))
@@ -0,0 +1,51 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import numpy as np
+import pytest
+
+from eosframes.transformers.fit_models import fit_models
+from eosframes.transformers.scale import Scale
+from eosframes.write.write import write_h5
+
+from _frames import MODEL_ID, make_frame
+
+
+def test_fit_models_reports_every_model(tmp_path):
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+    write_h5(make_frame(n_rows=300, n_cols=6), path, np.float32)
+    finished = []
+    report = fit_models(
+        {MODEL_ID: path, "eos0bad": str(tmp_path / "eos0bad.h5")},
+        str(tmp_path / "models"),
+        n_workers=2,
+        progress=lambda r: finished.append(r["model_id"]),
+    )
+    assert report["model_id"].tolist() == [MODEL_ID, "eos0bad"]
+    assert report["status"].tolist() == ["ok", "failed"]
+    assert "does not exist" in report["error"].iloc[1]
+    assert sorted(finished) == sorted([MODEL_ID, "eos0bad"])
+    Scale.load(MODEL_ID, model_dir=str(tmp_path / "models" / MODEL_ID / "scale"))
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_fit_models_survives_a_dead_worker(tmp_path):
+    # reading from a FIFO blocks the worker until it is killed
+    fifo = str(tmp_path / "{0}.csv".format(MODEL_ID))
+    os.mkfifo(fifo)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(report=fit_models({MODEL_ID: fifo}, str(tmp_path / "models"))))
+    thread.start()
+    deadline = time.time() + 60
+    while not multiprocessing.active_children() and time.time() < deadline:
+        time.sleep(0.1)
+    time.sleep(1.0)
+    for child in multiprocessing.active_children():
+        os.kill(child.pid, signal.SIGKILL)
+    thread.join(60)
+    assert not thread.is_alive()
+    report = result["report"]
+    assert report["status"].tolist() == ["failed"]
+    assert report["error"].iloc[0].startswith("BrokenProcessPool")
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from eosframes.read.read import lookup, read_h5
+from eosframes.write.write import write_h5
+
+from _frames import MODEL_ID, make_frame
+
+
+@pytest.mark.parametrize("strings", ["variable", "fixed"])
+@pytest.mark.parametrize("n_rows", [0, 50])
+def test_write_h5_round_trip(tmp_path, strings, n_rows):
+    df = make_frame(n_rows=n_rows, n_cols=6)
+    df.loc[df.index[:1], "input"] = "CCØ"
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+    write_h5(df, path, np.float32, strings=strings)
+    result = read_h5(path)
+    assert result.shape == df.shape
+    assert result["key"].tolist() == df["key"].tolist()
+    assert result["input"].tolist() == df["input"].tolist()
+    assert np.array_equal(result.iloc[:, 2:].to_numpy(), df.iloc[:, 2:].to_numpy())
+
+
+@pytest.mark.parametrize("n_rows", [0, 1000])
+def test_lookup_with_key_index(tmp_path, n_rows):
+    df = make_frame(n_rows=n_rows, n_cols=6)
+    path = str(tmp_path / "{0}.h5".format(MODEL_ID))
+    write_h5(df, path, np.float32, key_index=True)
+    keys = df["key"].iloc[[999, 0, 256, 511]].tolist() if n_rows else []
+    result = lookup(path, keys + ["MISSING"])
+    assert list(result.columns) == list(df.columns)
+    assert result["key"].tolist() == keys
+    expected = df.set_index("key").loc[keys]
+    assert np.array_equal(result.iloc[:, 2:].to_numpy(), expected.iloc[:, 1:].to_numpy())
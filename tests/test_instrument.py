@@ -0,0 +1,76 @@
+import os
+import tracemalloc
+
+from eosframes.utils import instrument
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    def record(self, record: dict):
+        self.records.append(record)
+
+
+def test_spans_reach_the_sinks():
+    sink = ListSink()
+    instrument.enable(sink)
+    try:
+        with instrument.span("outer", rows=10, model_id="eos0tst"):
+            with instrument.span("inner") as s:
+                s.rows = 5
+    finally:
+        instrument.disable()
+    assert [r["span"] for r in sink.records] == ["outer/inner", "outer"]
+    assert sink.records[1]["rows"] == 10 and sink.records[1]["model_id"] == "eos0tst"
+    assert sink.records[0]["rows"] == 5
+    assert instrument.span("off") is instrument._NOOP
+
+
+def test_disable_keeps_tracemalloc_started_elsewhere():
+    tracemalloc.start()
+    try:
+        instrument.enable(ListSink(), memory=True)
+        instrument.disable()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_disable_stops_tracemalloc_it_started():
+    assert not tracemalloc.is_tracing()
+    sink = ListSink()
+    instrument.enable(sink, memory=True)
+    assert tracemalloc.is_tracing()
+    with instrument.span("stage"):
+        pass
+    instrument.disable()
+    assert not tracemalloc.is_tracing()
+    assert "traced_delta_mb" in sink.records[0]
+
+
+def test_prometheus_sink_writes_on_close(tmp_path):
+    path = str(tmp_path / "eosframes.prom")
+    sink = instrument.PrometheusSink(path, interval=None)
+    instrument.enable(sink)
+    try:
+        for _ in range(3):
+            with instrument.span("read", rows=100):
+                pass
+        # nothing is written while spans are recorded
+        assert not os.path.exists(path)
+    finally:
+        instrument.disable()
+    with open(path) as f:
+        text = f.read()
+    assert 'eosframes_span_calls_total{span="read"} 3' in text
+    assert 'eosframes_span_rows_total{span="read"} 300' in text
+
+
+def test_prometheus_sink_writes_every_interval(tmp_path):
+    path = str(tmp_path / "eosframes.prom")
+    sink = instrument.PrometheusSink(path, interval=0)
+    sink.record({"span": "read", "seconds": 0.5, "rows": 10, "error": None})
+    with open(path) as f:
+        assert 'eosframes_span_calls_total{span="read"} 1' in f.read()
+    sink.close()
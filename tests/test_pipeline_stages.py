@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+
+from eosframes.pipeline.pipeline import run_pipeline
+
+from _frames import make_frame
+
+
+def _batches(n_batches: int = 20, rows: int = 50):
+    df = make_frame(n_rows=n_batches * rows, n_cols=3)
+    return [df.iloc[i * rows:(i + 1) * rows] for i in range(n_batches)]
+
+
+def test_outputs_in_input_order():
+    batches = _batches()
+    written = []
+
+    def transform(df):
+        # uneven work per batch
+        time.sleep(0.002 * (len(written) % 3))
+        return df[["key", "feature_0000"]]
+
+    report = run_pipeline(iter(batches), transform, written.append, prefetch=2)
+    assert [b["key"].iloc[0] for b in written] == [b["key"].iloc[0] for b in batches]
+    assert report.batches == len(batches)
+    assert report.rows == sum(len(b) for b in batches)
+    assert report.bottleneck in ("read", "transform", "write")
+
+
+def _failing_reader(batches, at: int):
+    for i, batch in enumerate(batches):
+        if i == at:
+            raise ValueError("read failed")
+        yield batch
+
+
+def _fail_at(at: int, message: str):
+    calls = [0]
+
+    def fn(df):
+        calls[0] += 1
+        if calls[0] == at:
+            raise ValueError(message)
+        return df
+
+    return fn
+
+
+@pytest.mark.parametrize("stage", ["read", "transform", "write"])
+def test_errors_of_every_stage_are_raised(stage):
+    batches = _batches(n_batches=200)
+    source = _failing_reader(batches, 3) if stage == "read" else iter(batches)
+    transform = _fail_at(3, "transform failed") if stage == "transform" else None
+    write = _fail_at(3, "write failed") if stage == "write" else None
+    threads = threading.active_count()
+    with pytest.raises(ValueError, match="{0} failed".format(stage)):
+        run_pipeline(source, transform, write, prefetch=1)
+    # the background stages stop instead of waiting for the failed one
+    assert threading.active_count() == threads
+
+
+def test_prefetch_must_be_positive():
+    with pytest.raises(Exception, match="prefetch"):
+        run_pipeline(iter([]), prefetch=0)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+
+from eosframes.transformers.build_typed_transformer import build_typed_transformer, quantile_levels
+from eosframes.transformers.quantile_kernel import column_quantiles, fit_column_transformer
+
+LEVELS = [0.0, 0.01, 0.25, 0.333, 0.5, 0.75, 0.999, 1.0]
+
+
+def _matrix(n_rows: int = 1001, seed: int = 0) -> np.ndarray:
+    """
+    Continuous, tied, integer and constant columns with 10% missing values, an empty column and one without missing values.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.normal(0, 1, n_rows),
+        np.round(rng.normal(0, 1, n_rows), 1),
+        rng.integers(0, 5, n_rows).astype(np.float64),
+        np.full(n_rows, 3.0),
+    ])
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return np.column_stack([X, np.full(n_rows, np.nan), rng.normal(0, 1, n_rows)])
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_quantiles_match_nanquantile(n_jobs):
+    X = _matrix()
+    quantiles = column_quantiles(X, LEVELS, impute_median=True, n_jobs=n_jobs)
+    with np.errstate(all="ignore"), pytest.warns(RuntimeWarning):
+        expected = np.nanquantile(X, LEVELS, axis=0)
+        median = np.nanmedian(X, axis=0)
+    assert np.array_equal(quantiles.quantiles, expected, equal_nan=True)
+    assert np.array_equal(quantiles.median, median, equal_nan=True)
+    assert np.array_equal(quantiles.n_missing, np.isnan(X).sum(axis=0))
+
+    imputed = np.where(np.isnan(X), median, X)
+    with pytest.warns(RuntimeWarning):
+        expected = np.nanquantile(imputed, LEVELS, axis=0)
+    assert np.allclose(quantiles.imputed, expected, rtol=0, atol=1e-12, equal_nan=True)
+
+
+def test_fit_column_transformer_matches_sklearn():
+    rng = np.random.default_rng(1)
+    n_rows = 3000
+    df = pd.DataFrame({
+        "binary": rng.integers(0, 2, n_rows).astype(np.float64),
+        "count": rng.integers(0, 50, n_rows),
+        "ratio": rng.random(n_rows),
+        "continuous": np.round(rng.normal(0, 2, n_rows), 2),
+    })
+    ct = build_typed_transformer(df)
+    quantiles = column_quantiles(df, quantile_levels(n_rows))
+    fitted = fit_column_transformer(clone(ct), df, quantiles)
+    expected = clone(ct).fit(df)
+    assert all(len(cols) == 1 for _, _, cols in expected.transformers_)
+    assert np.allclose(fitted.transform(df), expected.transform(df), rtol=0, atol=1e-9)
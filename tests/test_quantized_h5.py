@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from eosframes.read.read import dequantize, lookup, read_any, read_h5
+from eosframes.transformers.quantize import Quantize
+from eosframes.write.write import write_h5
+
+from _frames import MODEL_ID, make_frame
+
+
+@pytest.fixture(scope="module")
+def quantized(tmp_path_factory):
+    df = make_frame(missing=0.05)
+    quantizer = Quantize(model_id=MODEL_ID)
+    quantizer.fit(df)
+    path = str(tmp_path_factory.mktemp("h5") / "{0}.h5".format(MODEL_ID))
+    write_h5(df, path, dtype=np.int8, quantizer=quantizer, key_index=True)
+    return df, quantizer, path
+
+
+def test_readers_refuse_quantized_files(quantized):
+    _, _, path = quantized
+    for reader in (read_h5, read_any):
+        with pytest.raises(Exception, match="Use dequantize"):
+            reader(path)
+
+
+def test_lookup_dequantizes(quantized):
+    _, quantizer, path = quantized
+    expected = pd.concat(dequantize(path)).set_index("key")
+    keys = expected.index[[11, 3, 1500, 7]].tolist() + ["MISSING"]
+    result = lookup(path, keys)
+    assert result["key"].tolist() == keys[:-1]
+    assert result[quantizer.feature_cols].dtypes.eq(np.float32).all()
+    assert np.array_equal(result[quantizer.feature_cols].to_numpy(), expected.loc[keys[:-1], quantizer.feature_cols].to_numpy(), equal_nan=True)
+
+
+def test_dequantize_keeps_missing_values(quantized):
+    df, quantizer, path = quantized
+    result = np.concatenate([batch[quantizer.feature_cols].to_numpy() for batch in dequantize(path, batch_size=700)])
+    original = df[quantizer.feature_cols].to_numpy()
+    assert np.isnan(original).any()
+    assert np.array_equal(np.isnan(result), np.isnan(original))
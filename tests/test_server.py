@@ -0,0 +1,34 @@
+import asyncio
+import json
+import os
+import numpy as np
+
+from eosframes.serve.server import TransformServer
+from eosframes.transformers.scale import Scale
+
+from _frames import MODEL_ID
+
+
+def _request(server, path, payload):
+    return asyncio.run(server._handle_request("POST", path, json.dumps(payload).encode()))
+
+
+def test_rejects_model_ids_outside_model_dir(tmp_path):
+    server = TransformServer(str(tmp_path / "models"))
+    for path in ["/transform/../scale", "/transform/..%2Fscale/scale", "/transform/notamodel/scale"]:
+        status, _ = _request(server, path, {"columns": [], "data": []})
+        assert status == 404
+    assert server._batchers == {}
+
+
+def test_transforms_with_a_fitted_model(tmp_path, frame):
+    scaler = Scale(model_id=MODEL_ID)
+    expected = scaler.fit(frame)
+    scaler.save(dir_name=os.path.join(tmp_path, MODEL_ID, "scale"), local=True, upload=False)
+    server = TransformServer(str(tmp_path))
+    rows = frame[scaler.feature_cols].iloc[:5].values.tolist()
+    status, result = _request(server, "/transform/{0}/scale".format(MODEL_ID), {"columns": scaler.feature_cols, "data": rows})
+    assert status == 200
+    assert result["columns"] == scaler.feature_cols
+    # JSON rows arrive as float64, the fitted frame is float32
+    assert np.allclose(result["data"], expected.iloc[:5].to_numpy(), atol=1e-5)
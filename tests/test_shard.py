@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from eosframes.transformers.scale import Scale
+from eosframes.transformers.quantize import Quantize
+from eosframes.transformers.shard import batched_transform
+
+from _frames import MODEL_ID, make_frame
+
+
+@pytest.mark.parametrize("cls", [Scale, Quantize])
+def test_sharded_transform_matches_serial(cls):
+    df = make_frame(missing=0.05)
+    transformer = cls(model_id=MODEL_ID)
+    transformer.fit(df)
+    serial = transformer.transform(df).to_numpy()
+    transformer.n_jobs = 2
+    sharded = transformer.transform(df).to_numpy()
+    assert serial.dtype == sharded.dtype
+    assert np.array_equal(serial, sharded, equal_nan=True)
+
+
+@pytest.mark.parametrize("cls", [Scale, Quantize])
+def test_sharded_fit_matches_serial(cls):
+    df = make_frame(missing=0.05)
+    serial = cls(model_id=MODEL_ID).fit(df).to_numpy()
+    sharded = cls(model_id=MODEL_ID, n_jobs=2).fit(df).to_numpy()
+    assert np.array_equal(serial, sharded, equal_nan=True)
+
+
+def test_batched_transform_matches_transform(frame):
+    scaler = Scale(model_id=MODEL_ID)
+    scaler.fit(frame)
+    X = frame[scaler.feature_cols]
+    assert np.array_equal(batched_transform(scaler.pipeline_, X, batch_rows=300), scaler.pipeline_.transform(X), equal_nan=True)
+
+
+@pytest.mark.parametrize("cls", [Scale, Quantize])
+def test_column_subset_matches_full(cls, frame):
+    transformer = cls(model_id=MODEL_ID)
+    transformer.fit(frame)
+    columns = transformer.feature_cols[::-4]
+    full = transformer.transform(frame)
+    subset = transformer.transform(frame[columns], columns=columns)
+    assert list(subset.columns) == columns
+    assert np.array_equal(subset.to_numpy(), full[columns].to_numpy(), equal_nan=True)
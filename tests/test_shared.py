@@ -0,0 +1,32 @@
+import os
+import numpy as np
+import pytest
+
+from eosframes.transformers.scale import Scale
+from eosframes.transformers.shared import attach_parameters, publish_parameters, unpublish_parameters
+
+
+@pytest.fixture(scope="module")
+def scaler(frame):
+    scaler = Scale(model_id=frame.model_id)
+    scaler.fit(frame)
+    return scaler
+
+
+def test_attach_to_shared_memory(scaler, frame):
+    name = publish_parameters(scaler, name="eos0tst-scale-{0}".format(os.getpid()))
+    try:
+        attached = attach_parameters(name=name)
+        assert np.array_equal(attached.transform(frame).to_numpy(), scaler.transform(frame).to_numpy(), equal_nan=True)
+        del attached
+    finally:
+        unpublish_parameters(name=name)
+
+
+def test_attach_to_file(scaler, frame, tmp_path):
+    path = publish_parameters(scaler, path=str(tmp_path / "eos0tst-scale.params"))
+    attached = attach_parameters(path=path)
+    assert np.array_equal(attached.transform(frame).to_numpy(), scaler.transform(frame).to_numpy(), equal_nan=True)
+    del attached
+    unpublish_parameters(path=path)
+    assert not os.path.exists(path)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from eosframes.transformers.scale import Scale
+
+from _frames import MODEL_ID
+
+
+def _frame(n_rows: int, seed: int, shift: float, missing: float) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    values = rng.normal(shift, 1, (n_rows, 8)).astype(np.float32)
+    values[rng.random(values.shape) < missing] = np.nan
+    df = pd.DataFrame(values, columns=["feature_{0:04d}".format(j) for j in range(8)])
+    df.model_id = MODEL_ID
+    return df
+
+
+@pytest.mark.parametrize("missing", [0.0, 0.2])
+def test_update_approximates_refit(missing):
+    # the new rows are shifted, so imputing them at the medians of the first rows would bias the center
+    old, new = _frame(3000, 1, 0.0, missing), _frame(3000, 2, 1.0, missing)
+    full = pd.concat([old, new], ignore_index=True)
+    full.model_id = MODEL_ID
+    updated = Scale(model_id=MODEL_ID)
+    updated.fit(old)
+    updated.update(new)
+    refit = Scale(model_id=MODEL_ID)
+    refit.fit(full)
+
+    assert updated.num_rows == refit.num_rows
+    assert np.array_equal(updated.fit_stats_.missing, full.isna().sum().to_numpy())
+    a = updated.pipeline_.named_transformers_["continuous_rs"].steps[-1][1]
+    b = refit.pipeline_.named_transformers_["continuous_rs"].steps[-1][1]
+    assert np.allclose(a.center_, b.center_, atol=0.01)
+    assert np.allclose(a.scale_, b.scale_, atol=0.01)
+    assert np.allclose(updated.transform(full).to_numpy(), refit.transform(full).to_numpy(), atol=0.01, equal_nan=True)
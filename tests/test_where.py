@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from eosframes.read.read import read_chunked_csvs, read_h5
+from eosframes.write.write import H5Writer, write_chunked_csvs, write_h5
+
+from _frames import MODEL_ID, make_frame
+
+# float32 values whose float64 widening differs from the float64 literal of the predicate
+# (row_mask compares float32 columns in float32, and CSV text is parsed back as float64)
+PREDICATES = [
+    [("score", ">=", 0.7)],
+    [("score", "<=", 0.7)],
+    [("score", "==", 0.7)],
+    [("score", ">", 0.69999999)],
+    [("score", "in", [0.7])],
+]
+
+
+@pytest.fixture(scope="module")
+def df():
+    df = make_frame(n_rows=40, n_cols=3)
+    score = np.full(len(df), 0.1, dtype=np.float32)
+    score[-5:] = 0.7
+    df["score"] = score
+    df.model_id = MODEL_ID
+    return df
+
+
+def _write_batches(df, path, stats):
+    with H5Writer(path, np.float32, stats=stats) as writer:
+        for start in range(0, len(df), 15):
+            batch = df.iloc[start:start + 15]
+            batch.model_id = MODEL_ID
+            writer.write(batch)
+
+
+@pytest.mark.parametrize("where", PREDICATES)
+@pytest.mark.parametrize("write", [write_h5, _write_batches])
+def test_h5_block_stats_keep_matching_rows(tmp_path, df, where, write):
+    results = []
+    for stats in (True, False):
+        path = str(tmp_path / "{0}-{1}.h5".format(MODEL_ID, stats))
+        if write is write_h5:
+            write_h5(df, path, np.float32, stats=stats)
+        else:
+            write(df, path, stats)
+        results += [read_h5(path, where=where)]
+    assert results[0]["key"].tolist() == results[1]["key"].tolist()
+
+
+@pytest.mark.parametrize("where", PREDICATES)
+def test_chunk_stats_keep_matching_rows(tmp_path, df, where):
+    path = str(tmp_path / MODEL_ID)
+    write_chunked_csvs(df, path, chunksize=20)
+    expected = read_chunked_csvs(path)
+    expected = expected[expected["score"].isin([0.7]) if where[0][1] == "in" else expected.eval("score {0} {1}".format(*where[0][1:]))]
+    assert len(expected) > 0
+    assert read_chunked_csvs(path, where=where)["key"].tolist() == expected["key"].tolist()